@@ -0,0 +1,168 @@
+"""
+Разбор ответов Gateway: прежний путь httpx.Response.json() + ручная выборка
+ключей из dict против GatewayService._decode (msgspec, сразу из байтов
+в типизированные объекты) для ответов user_data, full_user_data и due_to.
+
+    python -m benchmarks.decode_gateway
+    python -m benchmarks.decode_gateway --number 200000 --json
+
+Отчет: микросекунды на разбор одного ответа и ускорение.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+
+os.environ.setdefault('BOT_TOKEN', '42:BENCHMARK')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+sys.path[:0] = [str(ROOT), str(ROOT / 'src')]
+
+import httpx  # noqa: E402
+
+from src.models import UserRecord, ProfileRecord, FullUserData, DueTo  # noqa: E402
+from src.services.gateway import GatewayService  # noqa: E402
+from src.services.subscription_cache import Subscription  # noqa: E402
+
+USER = {
+    'user_id': 1_000_001, 'username': 'bench_user', 'first_name': 'Bench',
+    'language': 'english', 'fluency': 2, 'topics': ['music', 'travel', 'movies'],
+    'camefrom': 'friends', 'lang_code': 'en', 'is_active': True,
+    'due_to': (datetime.now() + timedelta(days=30)).isoformat(),
+    'created_at': datetime.now().isoformat(), 'notified_at': None,
+}
+PROFILE = {
+    'user_id': 1_000_001, 'nickname': 'benchnick', 'email': 'bench@example.com',
+    'gender': 'other', 'intro': 'I like long walks and short benchmarks ' * 4,
+    'birthday': '2000-01-01T00:00:00', 'dating': False, 'status': 'rookie',
+}
+DUE_TO = {'until': USER['due_to'], 'is_active': 'true'}
+
+
+def response(payload: Any) -> httpx.Response:
+    return httpx.Response(
+        200,
+        content=json.dumps(payload).encode(),
+        request=httpx.Request('GET', 'http://gateway/api/users'),
+    )
+
+
+# Прежний разбор, как он был в access_data и approved
+def legacy_user(resp: httpx.Response) -> dict:
+    user_info = resp.json()
+    return {
+        "user_id": user_info["user_id"],
+        "username": user_info["username"],
+        "first_name": user_info["first_name"],
+        "language": user_info["language"],
+        "fluency": user_info["fluency"],
+        "topics": ', '.join(user_info["topics"]),
+        "camefrom": user_info["camefrom"],
+        "lang_code": user_info["lang_code"],
+        "is_active": user_info["is_active"],
+        "due_to": user_info.get('due_to', None)
+    }
+
+
+def legacy_full(resp: httpx.Response) -> tuple[dict, dict]:
+    full_info = resp.json() or {}
+    return full_info.get('users') or {}, full_info.get('profiles') or {}
+
+
+def legacy_due_to(resp: httpx.Response) -> Subscription:
+    data = resp.json()
+    return Subscription(
+        until=data.get('until') if data else None,
+        is_active=bool(data) and str(data.get('is_active', False)).lower() == 'true'
+    )
+
+
+def typed_user(resp: httpx.Response) -> dict:
+    user_info = GatewayService._decode(resp, UserRecord)
+    return {
+        "user_id": user_info.user_id,
+        "username": user_info.username,
+        "first_name": user_info.first_name,
+        "language": user_info.language,
+        "fluency": user_info.fluency,
+        "topics": ', '.join(user_info.topics),
+        "camefrom": user_info.camefrom,
+        "lang_code": user_info.lang_code,
+        "is_active": user_info.is_active,
+        "due_to": user_info.due_to
+    }
+
+
+def typed_full(resp: httpx.Response) -> tuple[UserRecord, ProfileRecord]:
+    full_info = GatewayService._decode(resp, FullUserData)
+    return full_info.user, full_info.profile
+
+
+def typed_due_to(resp: httpx.Response) -> Subscription:
+    return Subscription.from_due_to(GatewayService._decode(resp, DueTo))
+
+
+CASES: dict[str, tuple[httpx.Response, Callable, Callable]] = {
+    'user_data': (response(USER), legacy_user, typed_user),
+    'full_user_data': (
+        response({'users': USER, 'profiles': PROFILE}), legacy_full, typed_full
+    ),
+    'due_to': (response(DUE_TO), legacy_due_to, typed_due_to),
+}
+
+
+def measure(func: Callable, resp: httpx.Response, number: int, repeat: int) -> float:
+    """Лучшее время одного вызова в микросекундах"""
+    best = min(timeit.repeat(lambda: func(resp), number=number, repeat=repeat))
+    return best / number * 1e6
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    report = {}
+    for name, (resp, legacy, typed) in CASES.items():
+        if name != 'full_user_data':
+            # Оба пути должны давать одинаковый результат
+            assert legacy(resp) == typed(resp), name
+
+        json_us = measure(legacy, resp, args.number, args.repeat)
+        typed_us = measure(typed, resp, args.number, args.repeat)
+        report[name] = {
+            'bytes': len(resp.content),
+            'json_us': round(json_us, 3),
+            'msgspec_us': round(typed_us, 3),
+            'speedup': round(json_us / typed_us, 2),
+        }
+    return report
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(f"{'payload':<16}{'bytes':>7}{'json, us':>11}{'msgspec, us':>14}{'speedup':>10}")
+    for name, row in report.items():
+        print(
+            f"{name:<16}{row['bytes']:>7}{row['json_us']:>11}"
+            f"{row['msgspec_us']:>14}{row['speedup']:>9}x"
+        )
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Gateway response decoding benchmark')
+    parser.add_argument('--number', type=int, default=50_000, help='calls per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='measurements, the best is taken')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Подмены внешнего мира для нагрузочных прогонов: сессия бота без сети,
+локальный stub Gateway и счетчик обращений к Redis.
+"""
+import asyncio
+import json
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, AsyncGenerator, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import web
+from redis.asyncio import connection as redis_connection
+
+
+class FakeSession(BaseSession):
+    """
+    Сессия бота, которая не ходит в Telegram: отвечает правдоподобным
+    результатом и записывает вызванные методы. Ответ проходит через
+    check_response, поэтому разбор моделей aiogram тоже измеряется.
+    """
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.calls = Counter()
+        self._message_id = 0
+
+    def _message(self, method: TelegramMethod) -> dict:
+        self._message_id += 1
+        chat_id = getattr(method, 'chat_id', None) or 1
+        message = {
+            'message_id': getattr(method, 'message_id', None) or self._message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': getattr(method, 'text', None) or '',
+        }
+        if method.__api_method__ == 'sendPhoto':
+            message['photo'] = [{
+                'file_id': 'bench-photo', 'file_unique_id': 'bench', 'width': 1, 'height': 1
+            }]
+        return message
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[TelegramType], timeout: Optional[int] = None
+    ) -> TelegramType:
+        self.calls[method.__api_method__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        result: Any = True if method.__returning__ is bool else self._message(method)
+        response = self.check_response(
+            bot=bot, method=method, status_code=200,
+            content=json.dumps({'ok': True, 'result': result}),
+        )
+        return response.result
+
+    async def stream_content(self, url: str, *args, **kwargs) -> AsyncGenerator[bytes, None]:
+        yield b''
+
+    async def close(self) -> None:
+        pass
+
+
+class StubGateway:
+    """Gateway в памяти на локальном aiohttp сервере, считает запросы по путям"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.users: dict[int, dict] = {}
+        self.profiles: dict[int, dict] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+    def seed(self, user_id: int, lang_code: str = 'en', with_profile: bool = True) -> None:
+        """Добавляет уже зарегистрированного пользователя"""
+        self.users[user_id] = {
+            'user_id': user_id, 'username': f'user{user_id}', 'first_name': 'Bench',
+            'language': 'english', 'fluency': 1, 'topics': ['music', 'travel'],
+            'camefrom': 'friends', 'lang_code': lang_code, 'is_active': True,
+            'due_to': (datetime.now() + timedelta(days=30)).isoformat(),
+        }
+        if with_profile:
+            self.profiles[user_id] = {
+                'user_id': user_id, 'nickname': f'nick{user_id}', 'email': 'bench@example.com',
+                'gender': 'other', 'intro': 'hello', 'birthday': '2000-01-01T00:00:00',
+                'dating': False, 'status': 'rookie',
+            }
+
+    @web.middleware
+    async def _count(self, request: web.Request, handler):
+        self.calls[f'{request.method} {request.path}'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    async def users_handler(self, request: web.Request) -> web.Response:
+        user_id = int(request.query['user_id'])
+        target = request.query.get('target_field')
+        user = self.users.get(user_id)
+
+        if target is None:
+            return web.json_response(user, status=200 if user else 404)
+        if target == 'users':
+            return web.json_response(user or {})
+        if target == 'profiles':
+            return web.json_response(self.profiles.get(user_id) or {'error': 'not found'})
+        return web.json_response({'users': user or {}, 'profiles': self.profiles.get(user_id) or {}})
+
+    async def add_user_handler(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        self.seed(data['user_id'], data.get('lang_code', 'en'), with_profile=False)
+        return web.json_response({'status': 'ok'})
+
+    async def due_to_handler(self, request: web.Request) -> web.Response:
+        user = self.users.get(int(request.query['user_id']))
+        if not user:
+            return web.json_response(None, status=404)
+        return web.json_response({'until': user['due_to'], 'is_active': 'true'})
+
+    async def nickname_handler(self, request: web.Request) -> web.Response:
+        nickname = request.query['nickname']
+        taken = any(p['nickname'] == nickname for p in self.profiles.values())
+        return web.json_response({'exists': taken})
+
+    async def yookassa_handler(self, request: web.Request) -> web.Response:
+        return web.json_response('https://example.com/pay')
+
+    async def update_profile_handler(self, request: web.Request) -> web.Response:
+        return web.json_response({'status': 'ok'})
+
+    async def start(self) -> str:
+        app = web.Application(middlewares=[self._count])
+        app.router.add_get('/api/users', self.users_handler)
+        app.router.add_post('/api/users', self.add_user_handler)
+        app.router.add_get('/api/due_to', self.due_to_handler)
+        app.router.add_get('/api/nicknames', self.nickname_handler)
+        app.router.add_get('/api/yookassa_link', self.yookassa_handler)
+        app.router.add_put('/api/update_profile', self.update_profile_handler)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host='127.0.0.1', port=0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f'http://127.0.0.1:{self.port}'
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class RedisRoundTrips:
+    """Считает отправки команд в Redis (пайплайн - один round-trip)"""
+
+    def __init__(self):
+        self.count = 0
+        self._original = None
+
+    def install(self) -> None:
+        self._original = original = redis_connection.AbstractConnection.send_packed_command
+        counter = self
+
+        async def send_packed_command(conn, *args, **kwargs):
+            counter.count += 1
+            return await original(conn, *args, **kwargs)
+
+        redis_connection.AbstractConnection.send_packed_command = send_packed_command
+
+    def uninstall(self) -> None:
+        if self._original is not None:
+            redis_connection.AbstractConnection.send_packed_command = self._original
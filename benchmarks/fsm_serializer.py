@@ -0,0 +1,114 @@
+"""
+Размер и скорость сериализации данных FSM: прежний JSON против msgpack,
+с zstd и без, на типичном наборе данных пользователя после
+DataStorage.set_user_info.
+
+    python -m benchmarks.fsm_serializer
+    python -m benchmarks.fsm_serializer --threshold 128 --json
+
+Отчет: байт на ключ и микросекунды на запись/чтение для каждого варианта.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+
+os.environ.setdefault('BOT_TOKEN', '42:BENCHMARK')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+sys.path[:0] = [str(ROOT), str(ROOT / 'src')]
+
+from src.services.fsm_serializer import FSMSerializer, zstandard  # noqa: E402
+
+DATA = {
+    "user_id": 1_000_001,
+    "username": "bench_user",
+    "first_name": "Bench",
+    "language": "english",
+    "fluency": 2,
+    "topics": "music, travel, movies",
+    "camefrom": "friends",
+    "lang_code": "en",
+    "is_active": True,
+    "due_to": (datetime.now() + timedelta(days=30)).isoformat(),
+    "age": 26,
+    "birthday": "2000-01-01T00:00:00",
+    "nickname": "benchnick",
+    "email": "bench@example.com",
+    "gender": "other",
+    "dating": False,
+    "intro": "Привет! Учу английский, люблю путешествия и кино",
+    "status": "rookie",
+}
+
+
+def variants(threshold: int, level: int) -> dict[str, FSMSerializer]:
+    result = {
+        'json': FSMSerializer('json'),
+        'msgpack': FSMSerializer('msgpack'),
+    }
+    if zstandard is not None:
+        result['json+zstd'] = FSMSerializer('json', threshold, level)
+        result['msgpack+zstd'] = FSMSerializer('msgpack', threshold, level)
+    return result
+
+
+def measure(func, number: int, repeat: int) -> float:
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    return best / number * 1e6
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    report = {}
+    baseline = None
+    for name, serializer in variants(args.threshold, args.level).items():
+        raw = serializer.dumps(DATA)
+        # Любой вариант читает и свои, и прежние JSON ключи
+        assert serializer.loads(raw) == DATA
+        assert serializer.loads(json.dumps(DATA).encode()) == DATA
+
+        baseline = baseline or len(raw)
+        report[name] = {
+            'bytes': len(raw),
+            'ratio': round(len(raw) / baseline, 3),
+            'dumps_us': round(measure(lambda: serializer.dumps(DATA), args.number, args.repeat), 3),
+            'loads_us': round(measure(lambda: serializer.loads(raw), args.number, args.repeat), 3),
+        }
+    return report
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(f"{'format':<14}{'bytes':>7}{'ratio':>8}{'dumps, us':>12}{'loads, us':>12}")
+    for name, row in report.items():
+        print(
+            f"{name:<14}{row['bytes']:>7}{row['ratio']:>8}"
+            f"{row['dumps_us']:>12}{row['loads_us']:>12}"
+        )
+    if zstandard is None:
+        print('zstd variants skipped: pip install zstandard')
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='FSM data serialization benchmark')
+    parser.add_argument('--threshold', type=int, default=256, help='zstd threshold, bytes')
+    parser.add_argument('--level', type=int, default=3, help='zstd level')
+    parser.add_argument('--number', type=int, default=20_000, help='calls per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='measurements, the best is taken')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""
+Нагрузочный прогон Dispatcher целиком: настоящие main_router, QuizMiddleware
+и RateLimitMiddleware, сгенерированные обновления от тысяч пользователей,
+фейковая сессия бота, локальный stub Gateway и Redis (fakeredis или локальный).
+
+    python -m benchmarks.load_dispatcher --users 2000 --concurrency 200
+    python -m benchmarks.load_dispatcher --redis-url redis://localhost:6379/15 --json
+
+Отчет: обновления в секунду, p50/p99 времени обработки обновления,
+запросы к Gateway, round-trip'ы в Redis и вызовы Bot API на одно обновление.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+from collections import Counter
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Конфигурация читается при импорте src, поэтому окружение задается заранее
+os.environ.setdefault('BOT_TOKEN', '42:BENCHMARK')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+os.environ.setdefault('GATEWAY_HOST', '127.0.0.1')
+os.environ.setdefault('GATEWAY_PORT', '0')
+sys.path[:0] = [str(ROOT), str(ROOT / 'src')]
+
+from aiogram import Bot  # noqa: E402
+from aiogram.types import Update  # noqa: E402
+
+from benchmarks.fakes import FakeSession, StubGateway, RedisRoundTrips  # noqa: E402
+
+Step = tuple[str, str]
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class UpdateFactory:
+    """Собирает обновления Telegram так, как их присылает Bot API"""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._ids = itertools.count(1)
+
+    def _user(self, user_id: int, lang_code: str) -> dict:
+        return {
+            'id': user_id, 'is_bot': False, 'first_name': 'Bench',
+            'username': f'user{user_id}', 'language_code': lang_code,
+        }
+
+    def message(self, user_id: int, lang_code: str, text: str) -> Update:
+        update_id = next(self._ids)
+        return Update.model_validate({
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id, 'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': self._user(user_id, lang_code),
+                'text': text,
+            },
+        }, context={'bot': self.bot})
+
+    def callback(self, user_id: int, lang_code: str, data: str) -> Update:
+        update_id = next(self._ids)
+        return Update.model_validate({
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id), 'chat_instance': 'bench', 'data': data,
+                'from': self._user(user_id, lang_code),
+                'message': {
+                    'message_id': update_id, 'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'from': {'id': self.bot.id, 'is_bot': True, 'first_name': 'bot'},
+                    'text': 'menu',
+                },
+            },
+        }, context={'bot': self.bot})
+
+    def build(self, user_id: int, lang_code: str, step: Step) -> Update:
+        kind, payload = step
+        if kind == 'msg':
+            return self.message(user_id, lang_code, payload)
+        return self.callback(user_id, lang_code, payload)
+
+
+def new_user_script(rng: random.Random) -> list[Step]:
+    """Регистрация, главное меню, смена языка и свободный текст"""
+    from src.i18n import catalog
+
+    topics = rng.sample(list(catalog.section('en', 'questionary.topics')), 2)
+    fluency = rng.choice(list(catalog.section('en', 'questionary.fluency_levels')))
+    return [
+        ('msg', '/start'),
+        ('cb', rng.choice(['camefrom_friends', 'camefrom_search', 'camefrom_other'])),
+        ('cb', rng.choice(['lang_english', 'lang_german', 'lang_spanish'])),
+        ('cb', f'fluency_{fluency}'),
+        ('cb', f'topic_{topics[0]}'),
+        ('cb', f'topic_{topics[1]}'),
+        ('cb', 'topic_endselection'),
+        ('cb', 'start_trial'),
+        ('cb', 'action_confirm'),
+        ('msg', '/menu'),
+        ('cb', 'edit_profile'),
+        ('cb', 'profile_change:language'),
+        ('cb', 'chlang_german'),
+        ('msg', 'hello'),
+    ]
+
+
+def returning_user_script(rng: random.Random) -> list[Step]:
+    """Уже зарегистрированный пользователь листает меню и профиль"""
+    return [
+        ('msg', '/start'),
+        ('msg', '/menu'),
+        ('cb', 'start_main_page'),
+        ('cb', 'edit_profile'),
+        ('cb', rng.choice(['profile_change:topics', 'profile_change:intro'])),
+        ('cb', 'go_back'),
+        ('msg', 'hello'),
+    ]
+
+
+async def setup_redis(redis_url: Optional[str]):
+    from src.services.redis import redis_service
+
+    if redis_url:
+        from redis.asyncio import Redis
+        client = Redis.from_url(redis_url)
+        await client.flushdb()
+    else:
+        try:
+            import fakeredis.aioredis
+        except ImportError:
+            raise SystemExit('pip install fakeredis lupa, or pass --redis-url')
+        client = fakeredis.aioredis.FakeRedis()
+
+    redis_service.redis_client = client
+    redis_service.initialized = True
+    return client
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    rng = random.Random(args.seed)
+
+    image = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
+    image.write(b'\x89PNG bench')
+    image.close()
+
+    from src.config import config
+    config.bot.abs_img_path = image.name
+
+    stub = StubGateway(latency=args.gateway_latency / 1000)
+    gateway_url = await stub.start()
+    redis = await setup_redis(args.redis_url)
+
+    from src.main import create_dispatcher
+    from src.services.gateway import gateway_service
+    from src.services.send_scheduler import send_scheduler
+
+    gateway_service.gateway_url = gateway_url
+    disp = await create_dispatcher()
+
+    session = FakeSession(latency=args.telegram_latency / 1000)
+    bot = Bot(token=config.bot.token, session=session)
+    if args.scheduler:
+        session.middleware(send_scheduler)
+    factory = UpdateFactory(bot)
+
+    # Пользователи: часть уже зарегистрирована в Gateway
+    users = []
+    for user_id in range(1_000_000, 1_000_000 + args.users):
+        lang_code = rng.choice(['en', 'ru', 'de', 'es', 'zh'])
+        if rng.random() < args.returning:
+            stub.seed(user_id, lang_code)
+            users.append((user_id, lang_code, returning_user_script(rng)))
+        else:
+            users.append((user_id, lang_code, new_user_script(rng)))
+
+    latencies: list[float] = []
+    errors = Counter()
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def play(user_id: int, lang_code: str, script: list[Step]) -> None:
+        async with slots:
+            for step in script:
+                update = factory.build(user_id, lang_code, step)
+                started = time.perf_counter()
+                try:
+                    await disp.feed_update(bot, update)
+                except Exception as e:
+                    errors[f'{step[1]}: {type(e).__name__}: {e}'[:120]] += 1
+                latencies.append(time.perf_counter() - started)
+
+    # Прогрев: первые обращения к каталогу, клавиатурам и пулам соединений
+    warmup = users[:min(10, len(users))]
+    await asyncio.gather(*(play(*user) for user in warmup))
+    latencies.clear()
+    stub.calls.clear()
+    session.calls.clear()
+
+    round_trips = RedisRoundTrips()
+    round_trips.install()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(play(*user) for user in users[len(warmup):]))
+    finally:
+        elapsed = time.perf_counter() - started
+        round_trips.uninstall()
+        await gateway_service.close()
+        await stub.stop()
+        await redis.aclose()
+        os.unlink(image.name)
+
+    updates = len(latencies)
+    gateway_calls = stub.calls.total()
+    return {
+        'users': len(users) - len(warmup),
+        'updates': updates,
+        'errors': errors.total(),
+        'error_kinds': dict(errors.most_common(10)),
+        'seconds': round(elapsed, 3),
+        'updates_per_sec': round(updates / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            'p50': round(percentile(latencies, 0.50) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'max': round(max(latencies, default=0.0) * 1000, 3),
+        },
+        'gateway_calls_per_update': round(gateway_calls / updates, 3) if updates else 0.0,
+        'redis_round_trips_per_update': round(round_trips.count / updates, 3) if updates else 0.0,
+        'bot_api_calls_per_update': round(session.calls.total() / updates, 3) if updates else 0.0,
+        'gateway_calls': dict(stub.calls.most_common()),
+        'bot_api_calls': dict(session.calls.most_common()),
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    latency = report['latency_ms']
+    print(f"users:                 {report['users']}")
+    print(f"updates:               {report['updates']} ({report['errors']} errors)")
+    print(f"wall time:             {report['seconds']} s")
+    print(f"updates/sec:           {report['updates_per_sec']}")
+    print(f"latency p50/p99/max:   {latency['p50']} / {latency['p99']} / {latency['max']} ms")
+    print(f"gateway calls/update:  {report['gateway_calls_per_update']}")
+    print(f"redis round-trips/upd: {report['redis_round_trips_per_update']}")
+    print(f"bot api calls/update:  {report['bot_api_calls_per_update']}")
+    for kind, count in report['error_kinds'].items():
+        print(f'    {count:>8}  {kind}')
+    print('gateway calls:')
+    for path, count in report['gateway_calls'].items():
+        print(f'    {count:>8}  {path}')
+    print('bot api calls:')
+    for method, count in report['bot_api_calls'].items():
+        print(f'    {count:>8}  {method}')
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Dispatcher load test')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=200, help='simultaneously active users')
+    parser.add_argument('--returning', type=float, default=0.5, help='share of registered users')
+    parser.add_argument('--gateway-latency', type=float, default=0.0, help='stub gateway delay, ms')
+    parser.add_argument('--telegram-latency', type=float, default=0.0, help='fake Bot API delay, ms')
+    parser.add_argument('--redis-url', help='use a real Redis (the database is flushed!)')
+    parser.add_argument('--scheduler', action='store_true', help='route sends through SendScheduler')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
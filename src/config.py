@@ -13,14 +13,136 @@ class BotConfig:
     admin_id: int = os.getenv("ADMIN_ID")
     abs_img_path: str = os.getenv("ABS_IMG_PATH")
 
+    # Способ получения обновлений: polling | webhook
+    mode: str = os.getenv("BOT_MODE", "polling").lower()
+    host: str = os.getenv("TG_BOT_HOST", "0.0.0.0")
+    port: int = int(os.getenv("TG_BOT_PORT", 8080))
+
+    # Количество процессов-обработчиков обновлений (1 - без шардирования)
+    workers: int = int(os.getenv("BOT_WORKERS", 1))
+    # Сколько обновлений воркер обрабатывает одновременно
+    worker_concurrency: int = int(os.getenv("BOT_WORKER_CONCURRENCY", 100))
+    # Сколько взятых из очереди обновлений может ждать обработки в памяти
+    worker_backlog: int = int(os.getenv("BOT_WORKER_BACKLOG", 1000))
+
+    # Настройки webhook (используются при BOT_MODE=webhook)
+    webhook_url: str = os.getenv("WEBHOOK_URL")
+    webhook_path: str = os.getenv("WEBHOOK_PATH", "/webhook")
+    webhook_secret: str = os.getenv("WEBHOOK_SECRET")
+    webhook_max_connections: int = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 40))
+    # Бюджет времени на обработку одного обновления (секунды)
+    update_deadline: float = float(os.getenv("UPDATE_DEADLINE", 15))
+
 @dataclass
 class GatewayConfig:
     host: str = os.getenv('GATEWAY_HOST')
     port: int = os.getenv('GATEWAY_PORT')
 
+    # Параметры общего пула соединений
+    max_connections: int = int(os.getenv('GATEWAY_MAX_CONNECTIONS', 100))
+    max_keepalive_connections: int = int(os.getenv('GATEWAY_MAX_KEEPALIVE_CONNECTIONS', 20))
+    keepalive_expiry: float = float(os.getenv('GATEWAY_KEEPALIVE_EXPIRY', 30.0))
+
+    # Таймауты (в секундах)
+    connect_timeout: float = float(os.getenv('GATEWAY_CONNECT_TIMEOUT', 3.0))
+    read_timeout: float = float(os.getenv('GATEWAY_READ_TIMEOUT', 10.0))
+    write_timeout: float = float(os.getenv('GATEWAY_WRITE_TIMEOUT', 10.0))
+    pool_timeout: float = float(os.getenv('GATEWAY_POOL_TIMEOUT', 5.0))
+    # Общий таймаут запроса: GET (чтение) и POST/PUT (запись)
+    get_timeout: float = float(os.getenv('GATEWAY_GET_TIMEOUT', 3.0))
+    write_request_timeout: float = float(os.getenv('GATEWAY_WRITE_REQUEST_TIMEOUT', 10.0))
+    # Повторы идемпотентных GET с экспоненциальной задержкой и jitter
+    retries: int = int(os.getenv('GATEWAY_RETRIES', 2))
+    retry_backoff: float = float(os.getenv('GATEWAY_RETRY_BACKOFF', 0.1))
+    # Circuit breaker: сколько ошибок подряд размыкают цепь и на сколько секунд
+    breaker_failures: int = int(os.getenv('GATEWAY_BREAKER_FAILURES', 5))
+    breaker_reset: float = float(os.getenv('GATEWAY_BREAKER_RESET', 10.0))
+
+    # Gateway умеет отдавать users и profiles одним запросом
+    combined_user_data: bool = os.getenv('GATEWAY_COMBINED_USER_DATA', 'false').lower() == 'true'
+
+    # GET методы, одинаковые одновременные вызовы которых объединяются в один
+    coalesce_methods: str = os.getenv(
+        'GATEWAY_COALESCE_METHODS',
+        'due_to,user_data,full_user_data,check_user_exists,nickname_exists'
+    )
+
 @dataclass
 class RedisConfig:
     url: str = os.getenv("REDIS_URL")
+    # Снимок FSM на обновление: одно чтение и одна запись в Redis
+    fsm_snapshot: bool = os.getenv("FSM_SNAPSHOT", "true").lower() == "true"
+    # Блокировка пользователя на время снимка. memory - в пределах процесса:
+    # хватает одного процесса и BOT_WORKERS (обновления пользователя всегда
+    # попадают в один воркер). redis - для нескольких реплик за webhook
+    fsm_isolation: str = os.getenv("FSM_ISOLATION", "memory").lower()
+    # Формат данных FSM: json | msgpack (читаются оба, ключи переходят при записи)
+    fsm_serializer: str = os.getenv("FSM_SERIALIZER", "json").lower()
+    # Данные FSM больше порога (байт) сжимаются zstd, 0 - без сжатия
+    fsm_compress_threshold: int = int(os.getenv("FSM_COMPRESS_THRESHOLD", 0))
+    fsm_compress_level: int = int(os.getenv("FSM_COMPRESS_LEVEL", 3))
+
+@dataclass
+class RateLimitConfig:
+    # memory - счетчики в процессе, redis - общие для всех процессов
+    backend: str = os.getenv('RATE_LIMIT_BACKEND', 'memory').lower()
+    limit: int = int(os.getenv('RATE_LIMIT', 5))
+    interval: float = float(os.getenv('RATE_LIMIT_INTERVAL', 30))
+
+@dataclass
+class SendConfig:
+    # Общий бюджет исходящих сообщений (Telegram: ~30 в секунду на бота)
+    rate: float = float(os.getenv('SEND_RATE', 30))
+    # Лимит на один чат (Telegram: ~1 в секунду, в группах 20 в минуту)
+    chat_rate: float = float(os.getenv('SEND_CHAT_RATE', 1))
+    chat_burst: int = int(os.getenv('SEND_CHAT_BURST', 3))
+    # Сколько раз повторять запрос после 429 Too Many Requests
+    max_retries: int = int(os.getenv('SEND_MAX_RETRIES', 3))
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    # /metrics всегда на отдельном порту: публичный webhook его не отдает
+    host: str = os.getenv('METRICS_HOST', '0.0.0.0')
+    port: int = int(os.getenv('METRICS_PORT', 9090))
+    # Мониторинг задержек event loop (см. src/utils/loop_monitor.py)
+    loop_monitor: bool = os.getenv('LOOP_MONITOR_ENABLED', 'false').lower() == 'true'
+    loop_interval: float = float(os.getenv('LOOP_MONITOR_INTERVAL', 0.25))
+    # Блокировка дольше порога логируется вместе со стеком
+    loop_threshold: float = float(os.getenv('LOOP_MONITOR_THRESHOLD', 0.1))
+
+@dataclass
+class CacheConfig:
+    # Кэш статуса подписки (фильтр approved)
+    subscription_maxsize: int = int(os.getenv('SUBSCRIPTION_CACHE_MAXSIZE', 10_000))
+    subscription_local_ttl: float = float(os.getenv('SUBSCRIPTION_CACHE_LOCAL_TTL', 60))
+    subscription_ttl: int = int(os.getenv('SUBSCRIPTION_CACHE_TTL', 3600))
+    # Для просроченных и незарегистрированных - короче,
+    # чтобы оплата через внешнюю ссылку подхватывалась быстро
+    subscription_negative_ttl: int = int(os.getenv('SUBSCRIPTION_CACHE_NEGATIVE_TTL', 30))
+    # Последний известный статус - запасной ответ, пока GateWay недоступен
+    subscription_stale_ttl: int = int(os.getenv('SUBSCRIPTION_CACHE_STALE_TTL', 7 * 24 * 3600))
+    # Занятые никнеймы (validate_name): отклоняются без запроса в GateWay
+    nickname_maxsize: int = int(os.getenv('NICKNAME_CACHE_MAXSIZE', 50_000))
+    nickname_taken_ttl: float = float(os.getenv('NICKNAME_CACHE_TAKEN_TTL', 24 * 3600))
+    # Данные пользователя (users + profiles) в Redis hash
+    profile_ttl: int = int(os.getenv('PROFILE_CACHE_TTL', 3600))
+    # и их локальная копия: TTL ограничивает отставание, если канал инвалидации упал
+    profile_maxsize: int = int(os.getenv('PROFILE_CACHE_MAXSIZE', 10_000))
+    profile_local_ttl: float = float(os.getenv('PROFILE_CACHE_LOCAL_TTL', 30))
+    # Сообщения quiz: Telegram дает удалять сообщения бота не старше 48 часов
+    quiz_messages_ttl: int = int(os.getenv('QUIZ_MESSAGES_TTL', 48 * 3600))
+
+@dataclass
+class OutboxConfig:
+    # Отложенная запись изменений профиля в GateWay (src/services/profile_outbox.py)
+    batch_size: int = int(os.getenv('PROFILE_OUTBOX_BATCH', 100))
+    # Сколько секунд ждать новые записи за одно чтение stream
+    block: float = float(os.getenv('PROFILE_OUTBOX_BLOCK', 1))
+    max_attempts: int = int(os.getenv('PROFILE_OUTBOX_MAX_ATTEMPTS', 10))
+    retry_backoff: float = float(os.getenv('PROFILE_OUTBOX_RETRY_BACKOFF', 1))
+    retry_max_delay: float = float(os.getenv('PROFILE_OUTBOX_RETRY_MAX_DELAY', 300))
+    maxlen: int = int(os.getenv('PROFILE_OUTBOX_MAXLEN', 100_000))
 
 @dataclass
 class Config:
@@ -33,11 +155,21 @@ class Config:
     bot: "BotConfig" = None
     gateway: "GatewayConfig" = None
     redis: "RedisConfig" = None
+    cache: "CacheConfig" = None
+    rate_limit: "RateLimitConfig" = None
+    send: "SendConfig" = None
+    metrics: "MetricsConfig" = None
+    outbox: "OutboxConfig" = None
 
     def __post_init__(self):
         if not self.bot: self.bot = BotConfig()
         if not self.gateway: self.gateway = GatewayConfig()
         if not self.redis: self.redis = RedisConfig()
+        if not self.cache: self.cache = CacheConfig()
+        if not self.rate_limit: self.rate_limit = RateLimitConfig()
+        if not self.send: self.send = SendConfig()
+        if not self.metrics: self.metrics = MetricsConfig()
+        if not self.outbox: self.outbox = OutboxConfig()
 
 
 config = Config()
\ No newline at end of file
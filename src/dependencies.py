@@ -1,11 +1,25 @@
 from typing import TYPE_CHECKING
 
+from src.services.broadcast import notify_broadcast
 from src.services.gateway import gateway_service
+from src.services.media_registry import media_registry
+from src.services.nickname_cache import nickname_cache
+from src.services.profile_cache import profile_cache
+from src.services.profile_outbox import profile_outbox
 from src.services.redis import redis_service
+from src.services.send_scheduler import send_scheduler
+from src.services.subscription_cache import subscription_cache
 
 if TYPE_CHECKING:
+    from src.services.broadcast import BroadcastEngine
     from src.services.gateway import GatewayService
+    from src.services.media_registry import MediaRegistry
+    from src.services.nickname_cache import NicknameCache
+    from src.services.profile_cache import ProfileCache
+    from src.services.profile_outbox import ProfileOutbox
     from src.services.redis import RedisService
+    from src.services.send_scheduler import SendScheduler
+    from src.services.subscription_cache import SubscriptionCache
 
 async def get_gateway() -> "GatewayService":
     return gateway_service
@@ -13,4 +27,25 @@ async def get_gateway() -> "GatewayService":
 async def get_redis() -> "RedisService":
     if not redis_service.initialized:
         await redis_service.connect()
-    return redis_service
\ No newline at end of file
+    return redis_service
+
+async def get_subscription_cache() -> "SubscriptionCache":
+    return subscription_cache
+
+async def get_media_registry() -> "MediaRegistry":
+    return media_registry
+
+async def get_profile_cache() -> "ProfileCache":
+    return profile_cache
+
+async def get_profile_outbox() -> "ProfileOutbox":
+    return profile_outbox
+
+async def get_nickname_cache() -> "NicknameCache":
+    return nickname_cache
+
+async def get_send_scheduler() -> "SendScheduler":
+    return send_scheduler
+
+async def get_broadcast() -> "BroadcastEngine":
+    return notify_broadcast
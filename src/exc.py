@@ -42,4 +42,24 @@ class InvalidCharactersError(Exception):
 
 
 class FailToCreateToken(Exception):
-    """ Ошибка при создании токена """
\ No newline at end of file
+    """ Ошибка при создании токена """
+
+
+class GatewayUnavailable(Exception):
+    """ GateWay не отвечает: открыт circuit breaker """
+    pass
+
+
+class DeadlineExceeded(Exception):
+    """ Время на обработку обновления истекло """
+    pass
+
+
+class GatewayResponseError(Exception):
+    """ Ответ GateWay не соответствует ожидаемой схеме """
+    pass
+
+
+class ProfileUpdateError(Exception):
+    """ Изменение профиля нельзя записать в GateWay (неполная запись) """
+    pass
@@ -1,57 +1,72 @@
-from datetime import datetime
-from typing import TYPE_CHECKING, Union
+from typing import TYPE_CHECKING, Optional, Union
 
 import httpx
 from aiogram.fsm.context import FSMContext
 
-from src.dependencies import get_gateway
-from src.config import config
+from src.dependencies import get_gateway, get_profile_cache, get_subscription_cache
+from src.exc import DeadlineExceeded, GatewayResponseError, GatewayUnavailable
+from src.services.subscription_cache import Subscription
 from src.logconf import opt_logger as log
 
 if TYPE_CHECKING:
     from aiogram.types import CallbackQuery, Message
+    from src.models import DueTo
 
 logger = log.setup_logger("approved")
 
 
+async def get_subscription(user_id: int) -> Optional[Subscription]:
+    """
+    Возвращает статус подписки из кэша, а при промахе - из GateWay.
+    Если GateWay недоступен - последний известный статус или None
+    """
+
+    cache = await get_subscription_cache()
+    subscription = await cache.get(user_id)
+    if subscription is not None:
+        return subscription
+
+    gateway = await get_gateway()
+    try:
+        async with gateway:
+            # Отправляет запрос в GateWay -> DueTo или None, если пользователя нет
+            due_to: Optional["DueTo"] = await gateway.get('due_to', user_id)
+    except (
+        GatewayUnavailable, DeadlineExceeded, GatewayResponseError, httpx.HTTPError, TimeoutError
+    ) as e:
+        logger.warning("Gateway unavailable, stale subscription for user %s: %s", user_id, e)
+        return await cache.get_stale(user_id)
+
+    subscription = Subscription.from_due_to(due_to)
+    # Незарегистрированный пользователь (404) тоже кэшируется, но на negative_ttl:
+    # иначе каждое его сообщение уходило бы в GateWay. Регистрация сбрасывает запись
+    await cache.set(user_id, subscription)
+
+    if due_to is not None:
+        # Свежий статус сразу попадает в профиль, который читают обработчики
+        profile_cache = await get_profile_cache()
+        await profile_cache.update(
+            user_id, due_to=subscription.until, is_active=subscription.is_active
+        )
+
+    return subscription
+
+
 async def approved(callback: Union["CallbackQuery", "Message"], state: FSMContext = None):
-    """Проверяет, не истекла ли подписка пользователя"""
+    """
+    Проверяет, не истекла ли подписка пользователя.
+    state остается в сигнатуре для совместимости: статус подписки
+    теперь хранится в ProfileCache, а не в данных FSM
+    """
 
     user_id = callback.from_user.id
-    gateway = await get_gateway()
+    subscription = await get_subscription(user_id)
+    if subscription is None:
+        # Статус неизвестен и GateWay не отвечает: не блокируем пользователя,
+        # а состояние оставляем как есть
+        return True
 
-    async with gateway:
-        # Отправляет запрос в GateWay -> dict[]
-        response: "httpx.Response" = await gateway.get('due_to', user_id)
-        # Получает тело ответа и статус код
-        data, status_code = response.json(), response.status_code
-
-        # Извлекает данные из ответа и конвертирует
-        due_to = data.get('until') if data else None
-        is_active = True if data and str(data.get('is_active', False)).lower() == 'true' else False
-
-        # При передаче FSM обновляет состояние памяти с новым due_to
-        if state: await state.update_data(due_to=due_to, is_active=is_active)
-
-        if not due_to: return True # Пользователь еще не зарегистрирован
-
-        # При подходящем статусе ответа выполняет проверки:
-        if due_to and status_code == 200:
-            # Переводит строку в объект datetime
-            due_date = datetime.fromisoformat(due_to)
-            # Приводим к naive datetime если нужно
-            if due_date.tzinfo is not None:
-                due_date = due_date.replace(tzinfo=None)
-
-            # Наконец сверяет время пользователя из БД с текущим,
-            # чтобы определить, может ли пользователь продолжать
-            # пользоваться функциями бота
-            if due_date > datetime.now(
-                    tz=config.tzinfo
-                ).replace(tzinfo=None):
-
-                # Подтверждает, что
-                # пользовательское время не просрочено
-                return True
-
-        return False
\ No newline at end of file
+    # Наконец сверяет время пользователя из БД с текущим,
+    # чтобы определить, может ли пользователь продолжать
+    # пользоваться функциями бота
+    return subscription.is_valid()
@@ -0,0 +1,6 @@
+__all__ = (
+    'Catalog',
+    'catalog',
+)
+
+from .catalog import Catalog, catalog
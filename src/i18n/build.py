@@ -0,0 +1,200 @@
+"""
+Компиляция каталога переводов из src/translations.py.
+
+    python -m src.i18n.build           # собрать src/i18n/compiled/
+    python -m src.i18n.build --check   # проверить, что сборка актуальна
+
+Сборка падает, если:
+    - в языке fallback нет ключа, который есть в другом языке;
+    - набор полей шаблона {…} отличается от языка fallback;
+    - код обращается к ключу, которого нет в каталоге.
+"""
+import argparse
+import hashlib
+import json
+import re
+import string
+import sys
+from pathlib import Path
+from typing import Any
+
+from src.i18n.catalog import COMPILED_DIR, SHARED
+
+SOURCE = Path(__file__).parent.parent / 'translations.py'
+CODE_ROOT = Path(__file__).parent.parent
+
+LANGUAGES = ('en', 'ru', 'de', 'es', 'zh')
+FALLBACK = 'en'
+SECTIONS = (
+    'MESSAGES', 'QUESTIONARY', 'BUTTONS', 'WEEKLY_QUIZ', 'TRANSCRIPTIONS',
+    'NOTIFICATIONS', 'EMOJI_SHOP', 'EMOJI_TRANSCRIPTIONS', 'ERROR_MESSAGES',
+)
+
+# Ключи вида 'en0', 'ru1' в QUESTIONARY['where_youcamefrom']
+INDEXED_LANG_KEY = re.compile(rf'^({"|".join(LANGUAGES)})(\d+)$')
+
+# Литеральные ключи в вызовах catalog.get/format/section(lang, "...")
+CODE_KEY = re.compile(r'catalog\.(get|format|section)\(\s*[^,()]+,\s*f?["\']([^"\']+)["\']')
+SHARED_KEY = re.compile(r'catalog\.shared\(\s*f?["\']([^"\']+)["\']')
+
+
+class CatalogBuildError(Exception):
+    """ Ошибка сборки каталога переводов """
+    pass
+
+
+def _put(table: dict, path: tuple[str, ...], value: Any) -> None:
+    if isinstance(value, dict):
+        for key, sub_value in value.items():
+            _put(table, path + (str(key),), sub_value)
+    else:
+        table['.'.join(path)] = value
+
+
+def _flatten(node: Any, path: tuple[str, ...], tables: dict[str, dict]) -> None:
+    if isinstance(node, dict) and node:
+        keys = [key for key in node if isinstance(key, str)]
+
+        # Уровень языков: {'en': ..., 'ru': ...}
+        if len(keys) == len(node) and all(key in LANGUAGES for key in keys):
+            for lang, value in node.items():
+                _put(tables[lang], path, value)
+            return
+
+        # Уровень языков с индексом: {'en0': ..., 'ru0': ...}
+        matches = [INDEXED_LANG_KEY.match(key) for key in keys]
+        if len(keys) == len(node) and all(matches):
+            for match, value in zip(matches, node.values()):
+                lang, index = match.groups()
+                _put(tables[lang], path + (index,), value)
+            return
+
+        for key, value in node.items():
+            _flatten(value, path + (str(key),), tables)
+        return
+
+    # Значение без языка - общее для всех
+    tables[SHARED]['.'.join(path)] = node
+
+
+def _fields(template: str) -> tuple[str, ...]:
+    return tuple(sorted({
+        field for _, field, _, _ in string.Formatter().parse(template) if field
+    }))
+
+
+def compile_tables() -> dict[str, dict]:
+    namespace: dict[str, Any] = {}
+    exec(compile(SOURCE.read_text(encoding='utf-8'), str(SOURCE), 'exec'), namespace)
+
+    tables = {lang: {} for lang in (*LANGUAGES, SHARED)}
+    for section in SECTIONS:
+        _flatten(namespace[section], (section.lower(),), tables)
+    return tables
+
+
+def validate(tables: dict[str, dict]) -> dict[str, tuple[str, ...]]:
+    errors, templates = [], {}
+    fallback = tables[FALLBACK]
+
+    for key, value in fallback.items():
+        if isinstance(value, str):
+            try:
+                fields = _fields(value)
+            except ValueError as e:
+                errors.append(f'{FALLBACK}:{key}: broken template ({e})')
+                continue
+            if fields:
+                templates[key] = fields
+
+    for lang in LANGUAGES:
+        for key, value in tables[lang].items():
+            if key not in fallback:
+                errors.append(f'{lang}:{key}: missing in fallback language {FALLBACK!r}')
+                continue
+            if type(value) is not type(fallback[key]):
+                errors.append(f'{lang}:{key}: type differs from {FALLBACK!r}')
+                continue
+            if isinstance(value, str):
+                try:
+                    fields = _fields(value)
+                except ValueError as e:
+                    errors.append(f'{lang}:{key}: broken template ({e})')
+                    continue
+                if fields != templates.get(key, ()):
+                    errors.append(f'{lang}:{key}: fields {fields} != {templates.get(key, ())}')
+
+    # Ключи, к которым обращается код
+    for path in sorted(CODE_ROOT.rglob('*.py')):
+        text = path.read_text(encoding='utf-8')
+        used = [(m.group(2), m.group(1) == 'section', fallback) for m in CODE_KEY.finditer(text)]
+        used += [(m.group(1), True, tables[SHARED]) for m in SHARED_KEY.finditer(text)]
+
+        for key, is_section, table in used:
+            # Для f-строк проверяется постоянная часть до первого {
+            prefix, dynamic = key.split('{', 1)[0], '{' in key
+            if dynamic or is_section:
+                prefix = prefix.rstrip('.') + '.'
+                found = any(k.startswith(prefix) for k in table)
+            else:
+                found = key in table
+            if not found:
+                errors.append(f'{path.relative_to(CODE_ROOT.parent)}: unknown key {key!r}')
+
+    if errors:
+        raise CatalogBuildError('\n'.join(errors))
+
+    return templates
+
+
+def render(tables: dict[str, dict], templates: dict) -> dict[str, str]:
+    files = {
+        f'{lang}.json': json.dumps(table, ensure_ascii=False, separators=(',', ':'))
+        for lang, table in tables.items()
+    }
+    files['manifest.json'] = json.dumps({
+        'source_sha256': hashlib.sha256(SOURCE.read_bytes()).hexdigest(),
+        'languages': list(LANGUAGES),
+        'fallback': FALLBACK,
+        'templates': templates,
+    }, ensure_ascii=False, indent=2, sort_keys=True)
+    return {name: content + '\n' for name, content in files.items()}
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Compile translations catalog')
+    parser.add_argument('--check', action='store_true', help='fail if compiled files are stale')
+    args = parser.parse_args(argv)
+
+    tables = compile_tables()
+    try:
+        templates = validate(tables)
+    except CatalogBuildError as e:
+        print(f'Catalog build failed:\n{e}', file=sys.stderr)
+        return 1
+
+    files = render(tables, templates)
+
+    if args.check:
+        stale = [
+            name for name, content in files.items()
+            if not (COMPILED_DIR / name).exists()
+            or (COMPILED_DIR / name).read_text(encoding='utf-8') != content
+        ]
+        if stale:
+            print(f'Compiled catalog is stale: {", ".join(stale)}', file=sys.stderr)
+            return 1
+        return 0
+
+    COMPILED_DIR.mkdir(exist_ok=True)
+    for name, content in files.items():
+        (COMPILED_DIR / name).write_text(content, encoding='utf-8')
+
+    for lang in LANGUAGES:
+        missing = len(tables[FALLBACK].keys() - tables[lang].keys())
+        print(f'{lang}: {len(tables[lang])} keys ({missing} fall back to {FALLBACK})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
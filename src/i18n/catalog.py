@@ -0,0 +1,126 @@
+import json
+import string
+import sys
+from pathlib import Path
+from typing import Optional, Union
+
+COMPILED_DIR = Path(__file__).parent / 'compiled'
+SHARED = 'shared'
+
+# Разобранный шаблон: (текст, поле, формат, преобразование), как у string.Formatter
+Parts = tuple[tuple[str, Optional[str], str, Optional[str]], ...]
+CONVERSIONS = {'s': str, 'r': repr, 'a': ascii}
+
+
+def parse_template(template: str) -> Optional[Parts]:
+    """
+    Разбирает шаблон str.format один раз. None - шаблон со сложными
+    полями ({a.b}, {a[0]}, вложенный формат), их подставляет str.format
+    """
+    parts = tuple(string.Formatter().parse(template))
+    for _, field, spec, _ in parts:
+        if field is not None and (not field.isidentifier() or '{' in spec):
+            return None
+    return parts
+
+
+def render_template(parts: Parts, values: dict) -> str:
+    chunks = []
+    for literal, field, spec, conversion in parts:
+        chunks.append(literal)
+        if field is not None:
+            value = values[field]
+            if conversion:
+                value = CONVERSIONS[conversion](value)
+            chunks.append(format(value, spec))
+    return ''.join(chunks)
+
+
+class Catalog:
+    """
+    Скомпилированный каталог переводов (см. src/i18n/build.py).
+
+    Таблица каждого языка - плоский словарь 'раздел.ключ' -> текст,
+    который загружается с диска только при первом обращении к языку.
+    Если текста нет в языке пользователя, берется язык fallback.
+    """
+
+    def __init__(self, path: Path = COMPILED_DIR, fallback: Optional[str] = None):
+        self.path = path
+        self._fallback = fallback
+        self._manifest: Optional[dict] = None
+        self._tables: dict[str, dict[str, Union[str, list[str]]]] = {}
+        self._sections: dict[tuple[str, str], dict[str, str]] = {}
+        self._parsed: dict[tuple[str, str], Optional[Parts]] = {}
+
+    @property
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            self._manifest = json.loads((self.path / 'manifest.json').read_text(encoding='utf-8'))
+        return self._manifest
+
+    @property
+    def languages(self) -> tuple[str, ...]:
+        return tuple(self.manifest['languages'])
+
+    @property
+    def fallback(self) -> str:
+        return self._fallback or self.manifest['fallback']
+
+    @property
+    def templates(self) -> dict[str, list[str]]:
+        """Поля шаблонов str.format, разобранные на этапе сборки"""
+        return self.manifest['templates']
+
+    def _table(self, lang: str) -> dict:
+        table = self._tables.get(lang)
+        if table is None:
+            if lang != SHARED and lang not in self.languages:
+                # Язык, для которого нет перевода
+                table = self._table(self.fallback)
+            else:
+                raw = json.loads((self.path / f'{lang}.json').read_text(encoding='utf-8'))
+                table = {sys.intern(key): value for key, value in raw.items()}
+            self._tables[lang] = table
+        return table
+
+    def get(self, lang: str, key: str) -> Union[str, list[str]]:
+        """Текст по ключу с откатом на язык fallback"""
+        value = self._table(lang).get(key)
+        if value is None:
+            value = self._table(self.fallback)[key]
+        return value
+
+    def format(self, lang: str, key: str, **kwargs) -> str:
+        """Подставляет значения в шаблон, разобранный при первом обращении"""
+        cache_key = (lang, key)
+        try:
+            parts = self._parsed[cache_key]
+        except KeyError:
+            parts = self._parsed[cache_key] = parse_template(self.get(lang, key))
+        if parts is None:
+            return self.get(lang, key).format(**kwargs)
+        return render_template(parts, kwargs)
+
+    def section(self, lang: str, prefix: str) -> dict[str, str]:
+        """Упорядоченные дочерние ключи раздела, e.g. 'questionary.topics'"""
+        cache_key = (lang, prefix)
+        section = self._sections.get(cache_key)
+        if section is None:
+            start = prefix + '.'
+            section = {
+                key[len(start):]: value
+                for key, value in self._table(lang).items()
+                if key.startswith(start)
+            }
+            if not section and lang != self.fallback:
+                section = self.section(self.fallback, prefix)
+            self._sections[cache_key] = section
+        return section
+
+    def shared(self, prefix: str) -> dict[str, str]:
+        """Данные, не зависящие от языка (например, эмодзи магазина)"""
+        return self.section(SHARED, prefix)
+
+
+catalog = Catalog()
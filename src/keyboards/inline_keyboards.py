@@ -1,32 +1,62 @@
+from functools import lru_cache, wraps
+from typing import Iterable, Optional
+
 from aiogram.types import InlineKeyboardButton, WebAppInfo
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from src.config import config
-from src.translations import QUESTIONARY, BUTTONS, WEEKLY_QUIZ
+from src.i18n import catalog
+
+LANG_CODES = ("en", "ru", "de", "es", "zh")
+
+
+def cached_keyboard(maxsize: Optional[int] = None):
+    """
+    Строит клавиатуру один раз на набор аргументов и версию бота
+    и дальше возвращает тот же объект разметки. Объект общий для всех
+    обработчиков, а InlineKeyboardMarkup изменяемый: менять его нельзя,
+    для своего варианта клавиатуры нужен новый InlineKeyboardBuilder
+    """
+    def decorator(func):
+        @lru_cache(maxsize=maxsize)
+        def build(version, *args, **kwargs):
+            return func(*args, **kwargs)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return build(config.version, *args, **kwargs)
+
+        wrapper.cache_info = build.cache_info
+        wrapper.cache_clear = build.cache_clear
+        return wrapper
 
+    return decorator
 
+
+@cached_keyboard()
 def get_go_back_keyboard(lang_code):
     builder = InlineKeyboardBuilder()
     go_back_button = InlineKeyboardButton(
-        text=BUTTONS["go_back"][lang_code],
+        text=catalog.get(lang_code, "buttons.go_back"),
         callback_data="go_back",
     )
     builder.add(go_back_button)
     return builder.as_markup()
 
+@cached_keyboard()
 def show_where_from_keyboard(lang_code):
     # иначе запускаем опрос «откуда вы о нас узнали»
     builder = InlineKeyboardBuilder()
     friends_button = InlineKeyboardButton(
-        text=QUESTIONARY["where_youcamefrom"][f"{lang_code}0"],
+        text=catalog.get(lang_code, "questionary.where_youcamefrom.0"),
         callback_data="camefrom_friends",
     )
     search_button = InlineKeyboardButton(
-        text=QUESTIONARY["where_youcamefrom"][f"{lang_code}1"],
+        text=catalog.get(lang_code, "questionary.where_youcamefrom.1"),
         callback_data="camefrom_search",
     )
     through_ad_button = InlineKeyboardButton(
-        text=QUESTIONARY["where_youcamefrom"][f"{lang_code}2"],
+        text=catalog.get(lang_code, "questionary.where_youcamefrom.2"),
         callback_data="camefrom_other",
     )
     builder.add(friends_button, search_button, through_ad_button)
@@ -34,6 +64,7 @@ def show_where_from_keyboard(lang_code):
     return builder.as_markup()
 
 
+@cached_keyboard()
 def show_language_keyboard(new=False):
     builder = InlineKeyboardBuilder()
     russian_button = InlineKeyboardButton(
@@ -63,18 +94,25 @@ def show_language_keyboard(new=False):
     return builder.as_markup()
 
 
+@cached_keyboard()
 def show_fluency_keyboard(lang_code, new=False):
     builder = InlineKeyboardBuilder()
-    for key, value in QUESTIONARY["fluency_levels"][lang_code].items():
+    for key, value in catalog.section(lang_code, "questionary.fluency_levels").items():
         builder.row(InlineKeyboardButton(
             text=value, callback_data=f"chfluency_{key}" if new else f"fluency_{key}"
         ))
 
     return builder.as_markup()
 
-def show_topic_keyboard(lang_code, selected_options: list, new=False):
+def show_topic_keyboard(lang_code, selected_options: Iterable[str], new=False):
+    # Порядок выбора не важен, поэтому ключ кэша - множество
+    return _build_topic_keyboard(lang_code, frozenset(selected_options), new)
+
+
+@cached_keyboard(maxsize=512)
+def _build_topic_keyboard(lang_code, selected_options: frozenset, new=False):
     builder = InlineKeyboardBuilder()
-    for key, value in QUESTIONARY["topics"][lang_code].items():
+    for key, value in catalog.section(lang_code, "questionary.topics").items():
         builder.row(InlineKeyboardButton(
             text=value if not key in selected_options else value + " ✅",
             callback_data=f"chtopic_{key}" if new else f"topic_{key}")
@@ -83,28 +121,30 @@ def show_topic_keyboard(lang_code, selected_options: list, new=False):
     return builder.as_markup()
 
 
-
+@cached_keyboard()
 def payment_keyboard(lang_code):
     builder = InlineKeyboardBuilder()
     start_trial = InlineKeyboardButton(
-        text=BUTTONS["start_trial"][lang_code],
+        text=catalog.get(lang_code, "buttons.start_trial"),
         callback_data="start_trial",
     )
     builder.add(start_trial)
     return builder.as_markup()
 
 
+@cached_keyboard()
 def confirm_choice_keyboard(lang_code):
     # Обновляем текст с подтверждением выбора
     builder = InlineKeyboardBuilder()
     confirm_button = InlineKeyboardButton(
-        text=BUTTONS["confirm"][lang_code],
+        text=catalog.get(lang_code, "buttons.confirm"),
         callback_data="action_confirm",
     )
     builder.add(confirm_button)
     return builder.as_markup()
 
 
+@cached_keyboard()
 def get_on_main_menu_keyboard(lang_code):
     # Формируем URL с user_id для Web App
     web_app_url = f"https://dict.lllang.site/?v={config.version}"
@@ -112,27 +152,27 @@ def get_on_main_menu_keyboard(lang_code):
 
     builder = InlineKeyboardBuilder()
     profile_button = InlineKeyboardButton(
-        text=BUTTONS["profile"][lang_code],
+        text=catalog.get(lang_code, "buttons.profile"),
         callback_data="profile",
     )
     dict_button = InlineKeyboardButton(
-        text=BUTTONS["dictionary"][lang_code],
+        text=catalog.get(lang_code, "buttons.dictionary"),
         web_app=WebAppInfo(url=web_app_url),
     )
     find_partner_button = InlineKeyboardButton(
-        text=BUTTONS["find_partner"][lang_code],
+        text=catalog.get(lang_code, "buttons.find_partner"),
         web_app=WebAppInfo(url=find_partner_url)
     )
     subscription_details = InlineKeyboardButton(
-        text=BUTTONS["sub_details"][lang_code],
+        text=catalog.get(lang_code, "buttons.sub_details"),
         callback_data="sub_details",
     )
     about_bot_button = InlineKeyboardButton(
-        text=BUTTONS["about_bot"][lang_code],
+        text=catalog.get(lang_code, "buttons.about_bot"),
         callback_data="about",
     )
     support_button = InlineKeyboardButton(
-        text=BUTTONS["support"][lang_code],
+        text=catalog.get(lang_code, "buttons.support"),
         url="https://t.me/user_bot6426",
     )
     builder.row(profile_button)
@@ -141,15 +181,16 @@ def get_on_main_menu_keyboard(lang_code):
     builder.row(about_bot_button, support_button)
     return builder.as_markup()
 
+@cached_keyboard()
 def about_me_keyboard(lcode):
     lang_code =  lcode if lcode in ['en', 'ru'] else 'en'
     builder = InlineKeyboardBuilder()
     community_button = InlineKeyboardButton(
-        text=BUTTONS["community"][lcode],
+        text=catalog.get(lcode, "buttons.community"),
         url=f"https://t.me/language_nerds_{lang_code}"
     )
     go_back_button = InlineKeyboardButton(
-        text=BUTTONS["go_back"][lcode],
+        text=catalog.get(lcode, "buttons.go_back"),
         callback_data="go_back",
     )
     builder.row(community_button)
@@ -167,10 +208,11 @@ def show_word_options_keyboard(word_data):
     return builder.as_markup()
 
 
+@cached_keyboard()
 def get_finish_button(lang_code):
     builder = InlineKeyboardBuilder()
     finish_button = InlineKeyboardButton(
-        text=WEEKLY_QUIZ["finish_button"][lang_code],
+        text=catalog.get(lang_code, "weekly_quiz.finish_button"),
         callback_data="end_quiz",
     )
     builder.add(finish_button)
@@ -180,20 +222,21 @@ def get_finish_button(lang_code):
 def begin_daily_quiz_keyboard(lang_code, report_id, show_info: bool = True):
     builder = InlineKeyboardBuilder()
     learning_info_button = InlineKeyboardButton(
-        text=WEEKLY_QUIZ["learning_info"][lang_code], callback_data=f"how_it_works:{report_id}"
+        text=catalog.get(lang_code, "weekly_quiz.learning_info"), callback_data=f"how_it_works:{report_id}"
     )
     begin_quiz_button = InlineKeyboardButton(
-        text=WEEKLY_QUIZ["begin"][lang_code], callback_data=f"start_report:{report_id}"
+        text=catalog.get(lang_code, "weekly_quiz.begin"), callback_data=f"start_report:{report_id}"
     )
     if show_info:
         builder.row(learning_info_button)
     builder.row(begin_quiz_button)
     return builder.as_markup()
 
+@cached_keyboard()
 def thought_time_keyboard(lang_code):
     builder = InlineKeyboardBuilder()
     thought_time_button = InlineKeyboardButton(
-        text=WEEKLY_QUIZ["thought_time"][lang_code], callback_data="thougth_time"
+        text=catalog.get(lang_code, "weekly_quiz.thought_time"), callback_data="thougth_time"
     )
     builder.row(thought_time_button)
     return builder.as_markup()
@@ -201,27 +244,28 @@ def thought_time_keyboard(lang_code):
 def get_payment_keyboard(lang_code, url):
     builder = InlineKeyboardBuilder()
     payment_button = InlineKeyboardButton(
-        text=BUTTONS["payment"][lang_code], url=url
+        text=catalog.get(lang_code, "buttons.payment"), url=url
     )
     builder.add(payment_button)
     return builder.as_markup()
 
+@cached_keyboard()
 def get_subscription_keyboard(lang_code: str, is_active: bool, paused: bool = False):
     builder = InlineKeyboardBuilder()
     cancel_subscription_button = InlineKeyboardButton(
-        text=BUTTONS["cancel_sub"][lang_code],
+        text=catalog.get(lang_code, "buttons.cancel_sub"),
         callback_data="cancel_subscription"
     )
     resume_subscription_button = InlineKeyboardButton(
-        text=BUTTONS["resume_sub"][lang_code],
+        text=catalog.get(lang_code, "buttons.resume_sub"),
         callback_data="resume_subscription"
     )
     activate_subscription_button = InlineKeyboardButton(
-        text=BUTTONS["activate_sub"][lang_code],
+        text=catalog.get(lang_code, "buttons.activate_sub"),
         callback_data="activate_subscription"
     )
     go_back_button = InlineKeyboardButton(
-        text=BUTTONS["go_back"][lang_code],
+        text=catalog.get(lang_code, "buttons.go_back"),
         callback_data="go_back",
     )
 
@@ -236,18 +280,19 @@ def get_subscription_keyboard(lang_code: str, is_active: bool, paused: bool = Fa
     return builder.as_markup()
 
 
+@cached_keyboard()
 def get_profile_keyboard(lang_code):
     builder = InlineKeyboardBuilder()
     edit_profile_button = InlineKeyboardButton(
-        text=BUTTONS["edit_profile"][lang_code],
+        text=catalog.get(lang_code, "buttons.edit_profile"),
         callback_data="edit_profile"
     )
     shop_button = InlineKeyboardButton(
-        text=BUTTONS["shop"][lang_code],
+        text=catalog.get(lang_code, "buttons.shop"),
         callback_data="shop:0",
     )
     go_back_button = InlineKeyboardButton(
-        text=BUTTONS["go_back"][lang_code],
+        text=catalog.get(lang_code, "buttons.go_back"),
         callback_data="go_back",
     )
     builder.row(edit_profile_button)
@@ -255,54 +300,58 @@ def get_profile_keyboard(lang_code):
     builder.row(go_back_button)
     return builder.as_markup()
 
+@cached_keyboard()
 def choose_nickname_keyboard(lang_code):
     builder = InlineKeyboardBuilder()
     cancel_button = InlineKeyboardButton(
-        text=BUTTONS["cancel"][lang_code],
+        text=catalog.get(lang_code, "buttons.cancel"),
         callback_data="go_back"
     )
     builder.row(cancel_button)
     return builder.as_markup()
 
+@cached_keyboard()
 def choose_intro_keyboard(lang_code):
     builder = InlineKeyboardBuilder()
     cancel_button = InlineKeyboardButton(
-        text=BUTTONS["cancel"][lang_code],
+        text=catalog.get(lang_code, "buttons.cancel"),
         callback_data="go_back"
     )
     builder.row(cancel_button)
     return builder.as_markup()
 
+@cached_keyboard()
 def get_menu_keyboard(lang_code):
     builder = InlineKeyboardBuilder()
     menu_button = InlineKeyboardButton(
-        text=BUTTONS["menu"][lang_code],
+        text=catalog.get(lang_code, "buttons.menu"),
         callback_data="start_main_page"
     )
     builder.row(menu_button)
     return builder.as_markup()
 
 
+@cached_keyboard()
 def get_edit_options(lang_code):
     builder = InlineKeyboardBuilder()
     change_nickname_button = InlineKeyboardButton(
-        text=BUTTONS["edit_nickname"][lang_code],
+        text=catalog.get(lang_code, "buttons.edit_nickname"),
         callback_data="profile_change:nickname"
     )
     change_lang_button = InlineKeyboardButton(
-        text=BUTTONS["edit_lang"][lang_code],
+        text=catalog.get(lang_code, "buttons.edit_lang"),
         callback_data="profile_change:language"
     )
     change_topic_button = InlineKeyboardButton(
-        text=BUTTONS["edit_topic"][lang_code],
+        text=catalog.get(lang_code, "buttons.edit_topic"),
         callback_data="profile_change:topics"
     )
     change_intro_button = InlineKeyboardButton(
-        text=BUTTONS["edit_intro"][lang_code],
+        text=catalog.get(lang_code, "buttons.edit_intro"),
         callback_data="profile_change:intro"
     )
     go_back = InlineKeyboardButton(
-        text=BUTTONS["go_back"][lang_code],
+        text=catalog.get(lang_code, "buttons.go_back"),
         callback_data="go_back"
     )
     builder.row(change_nickname_button, change_lang_button)
@@ -311,20 +360,21 @@ def get_edit_options(lang_code):
     return builder.as_markup()
 
 
+@cached_keyboard(maxsize=128)
 def get_shop_keyboard(lang_code, indx):
     builder = InlineKeyboardBuilder()
     make_payment = InlineKeyboardButton(
-        text=BUTTONS["make_payment"][lang_code] if indx != 9 else "Приведи друга",
+        text=catalog.get(lang_code, "buttons.make_payment") if indx != 9 else "Приведи друга",
         callback_data=f"go_back"
     )
     next_button = InlineKeyboardButton(
-        text=BUTTONS["next"][lang_code], callback_data=f"shop:{indx+1 if not indx==9 else 0}"
+        text=catalog.get(lang_code, "buttons.next"), callback_data=f"shop:{indx+1 if not indx==9 else 0}"
     )
     prev_button = InlineKeyboardButton(
-        text=BUTTONS["prev"][lang_code], callback_data=f"shop:{indx-1 if not indx==0 else 9}"
+        text=catalog.get(lang_code, "buttons.prev"), callback_data=f"shop:{indx-1 if not indx==0 else 9}"
     )
     exit_button = InlineKeyboardButton(
-        text=BUTTONS["exit"][lang_code], callback_data="go_back"
+        text=catalog.get(lang_code, "buttons.exit"), callback_data="go_back"
     )
     builder.row(make_payment)
     builder.row(prev_button, next_button)
@@ -332,14 +382,52 @@ def get_shop_keyboard(lang_code, indx):
     return builder.as_markup()
 
 
+@cached_keyboard()
 def get_search_keyboard(lang_code):
     builder = InlineKeyboardBuilder()
     queue_info_button = InlineKeyboardButton(
-        text=BUTTONS["queue_info"][lang_code], callback_data="queue_info"
+        text=catalog.get(lang_code, "buttons.queue_info"), callback_data="queue_info"
     )
     cancel_button = InlineKeyboardButton(
-        text=BUTTONS["cancel"][lang_code], callback_data="cancel"
+        text=catalog.get(lang_code, "buttons.cancel"), callback_data="cancel"
     )
     builder.add(queue_info_button, cancel_button)
     builder.adjust(1)
     return builder.as_markup()
+
+
+def prebuild_keyboards(lang_codes: Iterable[str] = LANG_CODES) -> None:
+    """Заранее строит клавиатуры, которые не зависят от пользователя"""
+    # Аргументы передаются так же, как в обработчиках,
+    # чтобы ключи кэша совпадали
+    builders = [
+        lambda _: show_language_keyboard(),
+        lambda _: show_language_keyboard(new=True),
+        get_go_back_keyboard,
+        show_where_from_keyboard,
+        show_fluency_keyboard,
+        lambda lc: show_fluency_keyboard(lc, True),
+        lambda lc: show_topic_keyboard(lc, set()),
+        lambda lc: show_topic_keyboard(lc, selected_options=[], new=True),
+        payment_keyboard,
+        confirm_choice_keyboard,
+        get_on_main_menu_keyboard,
+        about_me_keyboard,
+        get_profile_keyboard,
+        get_menu_keyboard,
+        get_edit_options,
+        choose_nickname_keyboard,
+        choose_intro_keyboard,
+        lambda lc: get_subscription_keyboard(lc, True),
+        lambda lc: get_subscription_keyboard(lc, False),
+        lambda lc: get_subscription_keyboard(lc, False, True),
+    ]
+
+    for lang_code in lang_codes:
+        for build in builders:
+            try:
+                build(lang_code)
+            except KeyError:
+                # Для языка нет перевода - клавиатура
+                # не будет построена и при обращении
+                continue
@@ -5,14 +5,28 @@ from typing import Optional
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums.parse_mode import ParseMode
-from aiogram.fsm.storage.redis import RedisStorage
-from dependencies import get_redis
+from aiogram.fsm.storage.base import BaseEventIsolation
+from aiogram.fsm.storage.memory import SimpleEventIsolation
+from aiogram.fsm.storage.redis import RedisEventIsolation
+from dependencies import get_redis, get_gateway, get_broadcast, get_profile_cache, \
+    get_profile_outbox, get_nickname_cache, get_subscription_cache
 
 from src.config import config
+from src.keyboards.inline_keyboards import prebuild_keyboards
 from src.logconf import opt_logger as log
+from src.middlewares.deadline_middleware import DeadlineMiddleware
+from src.middlewares.fsm_snapshot_middleware import FSMSnapshotMiddleware
 from src.middlewares.quiz_middleware import QuizMiddleware
 from src.middlewares.rate_limit_middleware import RateLimitMiddleware
 from src.routers import router as main_router
+from src.services.fsm_serializer import create_fsm_serializer
+from src.services.fsm_storage import BotRedisStorage
+from src.services.metrics import setup_metrics, start_metrics_server
+from src.services.rate_limiter import create_rate_limiter
+from src.services.send_scheduler import send_scheduler
+from src.server.webhook import run_webhook
+from src.utils.loop_monitor import start_loop_monitor
+from src.server.workers import run_sharded
 
 logger = log.setup_logger("main")
 
@@ -25,35 +39,82 @@ async def init_resources() -> None:
     global rate_limit_middleware, quiz_middleware
     """Запуск глобальных ресурсов """
     # Создаю менеджера сообщений
-    rate_limit_middleware = RateLimitMiddleware()
+    limiter = create_rate_limiter()
+    rate_limit_middleware = RateLimitMiddleware(
+        limit=limiter.limit,
+        time_interval=limiter.time_interval,
+        limiter=limiter,
+    )
     quiz_middleware = QuizMiddleware()
+    # Собираю неизменяемые клавиатуры заранее
+    prebuild_keyboards()
 
 
-# noinspection PyUnresolvedReferences
-async def run():
-    """Запуск бота и веб-сервера в одном event loop"""
-
-    # Инициализация бота
+def create_bot() -> Bot:
+    """Инициализация бота"""
     bot = Bot(
         token=config.bot.token,
         default=DefaultBotProperties(
             parse_mode=ParseMode.HTML
         )
     )
+    # Все исходящие сообщения проходят через общий планировщик
+    bot.session.middleware(send_scheduler)
+    return bot
+
+
+# noinspection PyUnresolvedReferences
+async def create_dispatcher() -> Dispatcher:
+    """Создает диспетчер со всеми ресурсами, middleware и роутерами"""
+
+    # Общий пул соединений с Gateway на все время работы
+    gateway = await get_gateway()
+    gateway.connect()
 
     redis = await get_redis()
-    storage = RedisStorage(
-        await redis.get_redis_client(),
+    redis_client = await redis.get_redis_client()
+    storage = BotRedisStorage(
+        redis_client,
+        serializer=create_fsm_serializer(),
         state_ttl=timedelta(minutes=10),
         data_ttl=timedelta(minutes=60)
     )
 
+    events_isolation: Optional[BaseEventIsolation] = None
+    if config.redis.fsm_snapshot:
+        # Снимок держит данные пользователя все время обработки: без блокировки
+        # два параллельных обновления перезапишут изменения друг друга
+        if config.redis.fsm_isolation == 'redis':
+            events_isolation = RedisEventIsolation(redis_client, key_builder=storage.key_builder)
+        else:
+            events_isolation = SimpleEventIsolation()
+
     # Инициализация диспетчера
-    disp = Dispatcher(storage=storage)
+    disp = Dispatcher(storage=storage, events_isolation=events_isolation)
+
+    # Метрики идут сразу за встроенными Errors/UserContext middleware, чтобы
+    # учитывать время остальных: FSMContextMiddleware, который Dispatcher
+    # добавляет сам, переставляется за ними, и загрузка и запись FSM
+    # тоже попадают в UPDATE_LATENCY
+    disp.update.outer_middleware.unregister(disp.fsm)
+    if config.metrics.enabled:
+        setup_metrics(disp, gateway=gateway, send_scheduler=send_scheduler)
+
+    if config.redis.fsm_snapshot:
+        # Встроенный FSMContextMiddleware заменяется версией со снимком
+        disp.fsm = FSMSnapshotMiddleware(
+            storage=storage,
+            events_isolation=disp.fsm.events_isolation,
+            strategy=disp.fsm.strategy,
+        )
+    disp.update.outer_middleware(disp.fsm)
 
     # Инициализация Middlewares
     await init_resources()
 
+    # Бюджет времени на каждое обновление
+    disp.update.outer_middleware(DeadlineMiddleware())
+
     #  Регистрация middleware -> Messages
     disp.message.middleware(quiz_middleware)
     disp.message.middleware(rate_limit_middleware)
@@ -63,12 +124,62 @@ async def run():
     # Добавление роутеров
     disp.include_router(main_router)
 
+    # Продолжаем рассылку, прерванную перезапуском
+    broadcast = await get_broadcast()
+    disp.startup.register(broadcast.resume)
+    # Профили, измененные другими воркерами, сбрасываются из локального кэша
+    profile_cache = await get_profile_cache()
+    disp.startup.register(profile_cache.start)
+    disp.shutdown.register(profile_cache.stop)
+    # Статус подписки, измененный на другом экземпляре, тоже сбрасывается
+    subscription_cache = await get_subscription_cache()
+    disp.startup.register(subscription_cache.start)
+    disp.shutdown.register(subscription_cache.stop)
+    # Освобожденные никнеймы забываются на всех экземплярах
+    nickname_cache = await get_nickname_cache()
+    disp.startup.register(nickname_cache.start)
+    disp.shutdown.register(nickname_cache.stop)
+    # Изменения профиля уходят в GateWay из очереди в фоне
+    profile_outbox = await get_profile_outbox()
+    disp.startup.register(profile_outbox.start)
+    disp.shutdown.register(profile_outbox.stop)
+    # Очередь исходящих запросов останавливается последней
+    disp.shutdown.register(send_scheduler.stop)
+    return disp
+
+
+async def run():
+    """Запуск бота и веб-сервера в одном event loop"""
+
+    if config.bot.workers > 1:
+        # Прием обновлений здесь, обработка - в процессах-воркерах
+        logger.info("Starting main tg-src-service (%s workers)…", config.bot.workers)
+        return await run_sharded()
+
+    bot = create_bot()
+    disp = await create_dispatcher()
+    # /metrics - только на отдельном порту, не на публичном webhook
+    metrics_runner = await start_metrics_server()
+    loop_monitor = start_loop_monitor()
+
     try:
-        logger.info("Starting main tg-src-service (polling)…")
-        await disp.start_polling(bot)
+        if config.bot.mode == "webhook":
+            logger.info("Starting main tg-src-service (webhook)…")
+            await run_webhook(disp, bot)
+        else:
+            logger.info("Starting main tg-src-service (polling)…")
+            # Webhook мог остаться от запуска в другом режиме
+            await bot.delete_webhook()
+            await disp.start_polling(bot)
 
     finally:
         # Корректное завершение
+        if loop_monitor is not None:
+            loop_monitor.stop()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        gateway = await get_gateway()
+        await gateway.close()
         await bot.close()
 
 
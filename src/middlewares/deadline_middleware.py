@@ -0,0 +1,28 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from src.config import config
+from src.utils.deadline import deadline
+
+
+class DeadlineMiddleware(BaseMiddleware):
+    """Задает бюджет времени на обработку обновления.
+
+    Бюджет хранится в contextvar, поэтому его видят все вызовы
+    ниже по стеку, в том числе запросы к GateWay: их таймауты
+    сокращаются до оставшегося времени.
+    """
+
+    def __init__(self, seconds: float = config.bot.update_deadline):
+        self.seconds = seconds
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        with deadline(self.seconds):
+            return await handler(event, data)
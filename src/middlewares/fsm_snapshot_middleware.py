@@ -0,0 +1,41 @@
+from typing import Any, Awaitable, Callable, cast
+
+from aiogram import Bot
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.types import TelegramObject
+
+from src.services.fsm_storage import BotRedisStorage
+
+
+class FSMSnapshotMiddleware(FSMContextMiddleware):
+    """FSMContextMiddleware, который держит снимок FSM на время обновления.
+
+    Состояние и данные пользователя читаются из Redis одним пайплайном
+    до обработчика, все get_data / update_data / set_state работают
+    с памятью, а изменения уходят в Redis одной транзакцией после него:
+    два round-trip'а на обновление вместо одного на каждый вызов.
+
+    Снимок живет все время обработки, поэтому диспетчеру нужна настоящая
+    events_isolation (см. FSM_ISOLATION): с DisabledEventIsolation
+    два обновления одного пользователя перезапишут данные друг друга.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not isinstance(self.storage, BotRedisStorage):
+            return await super().__call__(handler, event, data)
+
+        bot: Bot = cast(Bot, data["bot"])
+        context = self.resolve_event_context(bot, data)
+        data["fsm_storage"] = self.storage
+        if context:
+            # Снимок загружается после блокировки, как и состояние в aiogram
+            async with self.events_isolation.lock(key=context.key):
+                async with self.storage.snapshot(context.key):
+                    data.update({"state": context, "raw_state": await context.get_state()})
+                    return await handler(event, data)
+        return await handler(event, data)
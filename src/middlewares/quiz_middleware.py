@@ -1,16 +1,34 @@
+import asyncio
 import logging
-from collections import defaultdict
 
+from aiogram import Bot
 from aiogram.types import CallbackQuery
+from redis.exceptions import RedisError
+
+from src.config import config
+from src.services.redis import redis_service
 
 logger = logging.getLogger(name='message_mgr')
 
 
 class QuizMiddleware:
-    """Middleware для управления сообщениями quiz"""
+    """Middleware для управления сообщениями quiz
+
+    Id сообщений хранятся в Redis множестве на чат с TTL, поэтому
+    переживают перезапуск и не копятся в памяти процесса.
+    """
+
+    key_prefix = 'quiz:messages'
+    # Максимум id в одном вызове deleteMessages
+    delete_batch = 100
 
-    def __init__(self):
-        self.quiz_messages = defaultdict(list)
+    def __init__(self, ttl: int = config.cache.quiz_messages_ttl):
+        self.ttl = ttl
+        # Ссылки на фоновые задачи очистки, чтобы их не собрал GC
+        self._cleanups: set[asyncio.Task] = set()
+
+    def _key(self, chat_id: int) -> str:
+        return f'{self.key_prefix}:{chat_id}'
 
     async def __call__(self, handler, event, data):
         # Обрабатываем входящие сообщения и callback-запросы
@@ -27,24 +45,47 @@ class QuizMiddleware:
         start_keys = ["start_report:", "quiz:"]
         end_keys = ['action_confirm', 'end_quiz']
 
-        # Если это начало quiz, помечаем чат как активный
+        # Если это начало quiz, запоминаем сообщение
         if any(callback_data.startswith(key) for key in start_keys):
-            if callback_query.message.message_id not in self.quiz_messages[chat_id]:
-                self.quiz_messages[chat_id].append(callback_query.message.message_id)
+            await self.track_message(chat_id, callback_query.message.message_id)
 
-        # Если quiz завершается, удаляем все сообщения
+        # Если quiz завершается, удаляем все сообщения в фоне
         elif callback_data in end_keys:
-            await self.cleanup_quiz_messages(chat_id, callback_query.bot)
+            task = asyncio.create_task(
+                self.cleanup_quiz_messages(chat_id, callback_query.bot)
+            )
+            self._cleanups.add(task)
+            task.add_done_callback(self._cleanups.discard)
+
+    async def track_message(self, chat_id: int, message_id: int):
+        """Добавляет сообщение в множество quiz чата и продлевает TTL"""
+        try:
+            redis = await redis_service.get_redis_client()
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.sadd(self._key(chat_id), message_id)
+                pipe.expire(self._key(chat_id), self.ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Не удалось сохранить сообщение quiz {message_id}: {e}")
 
-    async def cleanup_quiz_messages(self, chat_id: int, bot):
-        """Удаляет все сообщения quiz в указанном чате"""
-        message_ids = self.quiz_messages.get(chat_id, [])
+    async def cleanup_quiz_messages(self, chat_id: int, bot: Bot):
+        """Удаляет все сообщения quiz в указанном чате пачками по 100"""
+        try:
+            redis = await redis_service.get_redis_client()
+            # Забираем и удаляем множество атомарно, чтобы
+            # параллельная очистка не удаляла те же сообщения
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.smembers(self._key(chat_id))
+                pipe.delete(self._key(chat_id))
+                members, _ = await pipe.execute()
+        except RedisError as e:
+            logger.error(f"Не удалось получить сообщения quiz чата {chat_id}: {e}")
+            return
 
-        for mid in message_ids:
+        message_ids = sorted(int(mid) for mid in members)
+        for i in range(0, len(message_ids), self.delete_batch):
+            chunk = message_ids[i:i + self.delete_batch]
             try:
-                await bot.delete_message(chat_id, mid)
+                await bot.delete_messages(chat_id, chunk)
             except Exception as e:
-                logger.error(f"Ошибка при удалении сообщения {mid}: {e}")
-
-        # Очищаем список сообщений для чата
-        self.quiz_messages[chat_id] = []
\ No newline at end of file
+                logger.error(f"Ошибка при удалении сообщений {chunk}: {e}")
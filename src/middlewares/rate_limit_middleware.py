@@ -1,12 +1,12 @@
-from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Callable, Any, Awaitable
+from typing import Callable, Any, Awaitable, Optional
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
-from src.utils.async_timed_queue import AsyncTimedQueue
+from src.services.metrics import RATE_LIMITED
+from src.services.rate_limiter import RateLimiter, MemoryRateLimiter
 from src.logconf import opt_logger as log
 
 logger = log.setup_logger('rate_limit_middleware')
@@ -32,24 +32,13 @@ class RateLimitMiddleware(BaseMiddleware):
         self,
         limit: int = 5,
         time_interval: timedelta = timedelta(seconds=30),
+        limiter: Optional[RateLimiter] = None,
     ):
         self.rate_limit = limit
         self.time_interval = time_interval
 
-        # Создаем словарь для хранения очередей
-
-        # При обращении к отсутствующему ключу
-        # (например, self.processed_messages[123])
-        # вызывается лямбда-функция.
-
-        # Она создает новый экземпляр AsyncTimedQueue,
-        # передавая в конструктор параметр time_interval (объект timedelta).
-
-        self.processed_messages = defaultdict[
-            int, AsyncTimedQueue[datetime]
-        ](  # типизация словаря
-            lambda: AsyncTimedQueue(time_interval)  # Фабрика значений (экземпляры)
-        )
+        # Счетчики сообщений: в памяти процесса или общие в Redis
+        self.limiter = limiter or MemoryRateLimiter(limit, time_interval)
 
     async def __call__(
         self,
@@ -59,20 +48,14 @@ class RateLimitMiddleware(BaseMiddleware):
     ) -> Any:
 
         user_id = event.from_user.id
-        current_dt = datetime.now()
-        processed_messages = self.processed_messages[user_id]
-        count: int = await processed_messages.get_len()
+        count, first_message_time = await self.limiter.hit(user_id)
         if count > self.rate_limit:
             logger.info("Skip user %s message", user_id)
-            return
-
-        await processed_messages.push(current_dt)
-        count = await processed_messages.get_len()
-        if count > self.rate_limit:
-            logger.info("Skip user %s message (new)", user_id)
+            RATE_LIMITED.labels('dropped').inc()
             return
         if count == self.rate_limit:
             logger.info("Sending last message to user %s before rate limit", user_id)
+            RATE_LIMITED.labels('warned').inc()
             await event.reply(
                 text="You're sending too many messages. Please cool down for a while",
             )
@@ -81,7 +64,7 @@ class RateLimitMiddleware(BaseMiddleware):
         data.update(
             rate_limit_info=RateLimitInfo(
                 message_count=count,
-                last_message_time=await processed_messages.peek(),
+                last_message_time=first_message_time,
             ),
         )
 
@@ -1,7 +1,16 @@
 __all__ = [
     'User',
     'Payment',
-    'Profile'
+    'Profile',
+    'UserRecord',
+    'ProfileRecord',
+    'FullUserData',
+    'DueTo',
+    'NicknameCheck',
+    'NotificationPage',
 ]
 
-from .bot_models import User, Payment, Profile
\ No newline at end of file
+from .bot_models import User, Payment, Profile
+from .gateway_models import (
+    UserRecord, ProfileRecord, FullUserData, DueTo, NicknameCheck, NotificationPage
+)
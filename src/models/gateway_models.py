@@ -0,0 +1,125 @@
+from datetime import datetime
+from functools import cache
+from typing import Any, Optional, TypeVar, Union
+
+import msgspec
+
+from src.exc import GatewayResponseError
+
+T = TypeVar('T')
+
+
+class UserRecord(msgspec.Struct, frozen=True):
+    """ Запись таблицы users, как ее отдает GET /api/users """
+
+    username: Optional[str]
+    first_name: str
+    language: str
+    fluency: int
+    topics: list[str]
+    camefrom: str
+    lang_code: str
+    is_active: bool = False
+    due_to: Optional[str] = None
+    # user_id известен вызывающему коду, в теле ответа его может не быть
+    user_id: Optional[int] = None
+
+
+class ProfileRecord(msgspec.Struct, frozen=True):
+    """ Запись таблицы profiles """
+
+    nickname: str
+    # Незаполненные поля профиля GateWay отдает как null
+    email: Optional[str] = None
+    gender: Optional[str] = None
+    intro: Optional[str] = None
+    # Дата или дата со временем в ISO формате, в зависимости от версии GateWay
+    birthday: Optional[str] = None
+    dating: Optional[bool] = False
+    status: Optional[str] = 'rookie'
+    user_id: Optional[int] = None
+
+    @property
+    def birth_date(self) -> Optional[datetime]:
+        if not self.birthday:
+            return None
+        birthday = datetime.fromisoformat(self.birthday)
+        return birthday.replace(tzinfo=None)
+
+    @property
+    def age(self) -> Optional[int]:
+        birth_date = self.birth_date
+        if birth_date is None:
+            return None
+        return (datetime.now() - birth_date).days // 365
+
+
+class FullUserData(msgspec.Struct, frozen=True):
+    """
+    Ответ GET /api/users?target_field=all.
+    Вложенные объекты остаются срезами исходного ответа (msgspec.Raw)
+    и разбираются только при обращении
+    """
+
+    users: msgspec.Raw = msgspec.Raw(b'null')
+    profiles: msgspec.Raw = msgspec.Raw(b'null')
+
+    @property
+    def user(self) -> Optional[UserRecord]:
+        return decode(self.users, UserRecord)
+
+    @property
+    def profile(self) -> Optional[ProfileRecord]:
+        return decode(self.profiles, ProfileRecord)
+
+
+class DueTo(msgspec.Struct, frozen=True):
+    """ Статус подписки из GET /api/due_to """
+
+    until: Optional[str] = None
+    # GateWay отдает флаг строкой 'true' / 'false'
+    is_active: Union[bool, str] = False
+
+    @property
+    def active(self) -> bool:
+        return str(self.is_active).lower() == 'true'
+
+
+class NicknameCheck(msgspec.Struct, frozen=True):
+    """ Ответ GET /api/nicknames """
+
+    exists: bool = False
+
+
+class NotificationUser(msgspec.Struct, frozen=True):
+    user_id: int
+    lang_code: Optional[str] = None
+
+
+class NotificationPage(msgspec.Struct, frozen=True):
+    """ Страница рассылки из GET /api/users/notification """
+
+    users: list[NotificationUser] = []
+    next: Optional[int] = None
+
+
+@cache
+def _decoder(type_: Any) -> msgspec.json.Decoder:
+    return msgspec.json.Decoder(Optional[type_])
+
+
+def decode(content: Union[bytes, msgspec.Raw], type_: type[T]) -> Optional[T]:
+    """
+    Разбирает ответ GateWay сразу из байтов в типизированный объект.
+    Отсутствие записи (null, пустой объект или {'error': ...}) -> None
+    """
+    try:
+        return _decoder(type_).decode(content)
+    except msgspec.ValidationError as e:
+        # Медленный путь только для ответов, не подходящих под схему
+        data = msgspec.json.decode(content)
+        if not data or (isinstance(data, dict) and 'error' in data):
+            return None
+        raise GatewayResponseError(f'{type_.__name__}: {e}') from e
+    except msgspec.DecodeError as e:
+        raise GatewayResponseError(f'{type_.__name__}: {e}') from e
@@ -1,9 +1,9 @@
-# __all__ = ("router",)
-#
-# from aiogram import Router
-# from .notify_users import router as admin_commands_router
-#
-# router = Router(name=__name__)
-# router.include_routers(
-#     admin_commands_router,
-# )
+__all__ = ("router",)
+
+from aiogram import Router
+from .notify_users import router as admin_commands_router
+
+router = Router(name=__name__)
+router.include_routers(
+    admin_commands_router,
+)
@@ -4,8 +4,8 @@ from aiogram.filters import and_f
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
 
-from src.dependencies import get_gateway
-from src.exc import StorageDataException
+from src.dependencies import get_profile_outbox
+from src.exc import StorageDataException, ProfileUpdateError
 from src.filters.approved import approved
 from src.keyboards.inline_keyboards import (
     get_edit_options, choose_nickname_keyboard,
@@ -14,9 +14,8 @@ from src.keyboards.inline_keyboards import (
     get_go_back_keyboard
 )
 from src.logconf import opt_logger as log
-from src.models import User
 from src.routers.callback_handlers.main_menu_cb_handler import go_back_handler
-from src.translations import MESSAGES, TRANSCRIPTIONS
+from src.i18n import catalog
 from src.utils.access_data import data_storage as ds, MultiSelection
 
 logger = log.setup_logger("change_profile_cb_handler")
@@ -33,7 +32,7 @@ async def edit_profile_handler(callback: CallbackQuery, state: FSMContext):
         data = await ds.get_storage_data(user_id, state)
         lang_code = data.get("lang_code")
         await callback.message.edit_caption(
-            caption=MESSAGES["change_profile_options"][lang_code],
+            caption=catalog.get(lang_code, "messages.change_profile_options"),
             reply_markup=get_edit_options(lang_code)
         )
 
@@ -55,10 +54,10 @@ async def profile_change_handler(callback: CallbackQuery, state: FSMContext):
         if users_choice == 'nickname':
             current_nickname = data.get("nickname", False)
             if current_nickname:
-                msg = MESSAGES["current_nickname"][lang_code].format(nickname=current_nickname)
+                msg = catalog.format(lang_code, "messages.current_nickname", nickname=current_nickname)
             else:
                 await callback.message.edit_caption(
-                    caption=MESSAGES["registration_required"][lang_code]
+                    caption=catalog.get(lang_code, "messages.registration_required")
                 )
                 return await callback.message.edit_reply_markup(
                     reply_markup=get_go_back_keyboard(lang_code)
@@ -74,7 +73,7 @@ async def profile_change_handler(callback: CallbackQuery, state: FSMContext):
 
         elif users_choice == "language":
             current_language = data.get("language")
-            msg = MESSAGES["current_lang"][lang_code].format(language=current_language)
+            msg = catalog.format(lang_code, "messages.current_lang", language=current_language)
             await callback.message.edit_caption(caption=msg)
             await callback.message.edit_reply_markup(reply_markup=show_language_keyboard(new=True))
             return await state.set_state(MultiSelection.waiting_language)
@@ -82,9 +81,9 @@ async def profile_change_handler(callback: CallbackQuery, state: FSMContext):
 
         elif users_choice == "topics":
             all_topics = data.get("topics").split(', ')
-            topics = [TRANSCRIPTIONS["topics"][topic][lang_code] for topic in all_topics]
+            topics = [catalog.get(lang_code, f"transcriptions.topics.{topic}") for topic in all_topics]
 
-            msg = MESSAGES["current_topic"][lang_code].format(
+            msg = catalog.format(lang_code, "messages.current_topic",
                 topic=", ".join(topics)
             )
             await state.update_data(new_topics=[])
@@ -99,13 +98,13 @@ async def profile_change_handler(callback: CallbackQuery, state: FSMContext):
         else:
             if not data.get("nickname", False):
                 await callback.message.edit_caption(
-                    caption=MESSAGES["registration_required"][lang_code]
+                    caption=catalog.get(lang_code, "messages.registration_required")
                 )
                 return await callback.message.edit_reply_markup(
                     reply_markup=get_go_back_keyboard(lang_code)
                 )
             current_intro = data.get("about", "")
-            msg = MESSAGES["current_intro"][lang_code].format(intro=current_intro)
+            msg = catalog.format(lang_code, "messages.current_intro", intro=current_intro)
             await callback.message.edit_caption(caption=msg)
             await callback.message.edit_reply_markup(
                 reply_markup=choose_intro_keyboard(lang_code)
@@ -152,29 +151,14 @@ async def change_fluency_handler(callback: CallbackQuery, state: FSMContext):
 
     user_id = callback.from_user.id
     try:
-        gateway = await get_gateway()
-        async with gateway:
-            data = await ds.get_storage_data(user_id, state)
-            new_language = data.get("new_language")
-            users_choice = int(callback.data.split('_', 1)[1])
-            # Возвращает всю информацию о пользователе
-            data = await ds.get_storage_data(user_id, state)
-            topics = data.get('topics')
-            new_topics = topics.split(', ') if ', ' in topics else list(topics)
-            new_user = User(
-                user_id=user_id,
-                username=data.get('username'),
-                camefrom=data.get('camefrom'),
-                first_name=data.get('first_name'),
-                language=new_language,
-                fluency=users_choice,
-                topics=new_topics,
-                lang_code=data.get('lang_code')
-            )
-            await gateway.put(
-                'update_profile',new_data=new_user
-            )
-            await state.update_data(language=new_language, fluency=users_choice)
+        # Возвращает всю информацию о пользователе вместе с new_language из FSM
+        data = await ds.get_storage_data(user_id, state)
+        new_language = data.get("new_language")
+        users_choice = int(callback.data.split('_', 1)[1])
+
+        outbox = await get_profile_outbox()
+        await outbox.enqueue(user_id, 'users', language=new_language, fluency=users_choice)
+        await ds.update_profile(user_id, language=new_language, fluency=users_choice)
 
         await state.set_state(MultiSelection.ended_change)
         return await go_back_handler(callback, state)
@@ -183,6 +167,10 @@ async def change_fluency_handler(callback: CallbackQuery, state: FSMContext):
         logger.error(f"User {user_id} trying to access data but doesn`t exist in DB")
         await callback.message.answer("You`re not registered. Press /start to do so")
 
+    except ProfileUpdateError as e:
+        logger.error(f"User {user_id} profile can`t be saved: {e}")
+        await callback.message.answer(catalog.get(data.get("lang_code"), "error_messages.profile_update_error"))
+
     except Exception as e:
         logger.error(f"Error in change_fluency_handler: {e}")
 
@@ -197,10 +185,10 @@ async def change_topic_handler(callback: CallbackQuery, state: FSMContext):
     # database = await get_db()
     user_id = callback.from_user.id
     users_choice = callback.data.split("_")[1]
-    gateway = await get_gateway()
 
     try:
-        data = await state.get_data()
+        # Возвращает всю информацию о пользователе вместе с new_topics из FSM
+        data = await ds.get_storage_data(user_id, state)
         lang_code = data.get("lang_code")
         new_topics = data.get("new_topics", [])
         if users_choice not in new_topics:
@@ -211,32 +199,17 @@ async def change_topic_handler(callback: CallbackQuery, state: FSMContext):
         if users_choice == "endselection":
             new_topics.remove("endselection")
             if not new_topics: return
-            profile_data = await ds.get_storage_data(user_id, state)
-            if set(profile_data.get("topics").split(", ")) != set(new_topics):
-                # Возвращает всю информацию о пользователе
-                data = await ds.get_storage_data(user_id, state)
-                new_user = User(
-                    user_id=user_id,
-                    username=data.get('username'),
-                    camefrom=data.get('camefrom'),
-                    first_name=data.get('first_name'),
-                    language=data.get('language'),
-                    fluency=data.get('fluency'),
-                    topics=new_topics,
-                    lang_code=data.get('lang_code')
-                )
+            if set(data.get("topics").split(", ")) != set(new_topics):
+                await state.update_data(new_topics=[])
+                outbox = await get_profile_outbox()
+                await outbox.enqueue(user_id, 'users', topics=new_topics)
+                await ds.update_profile(user_id, topics=", ".join(new_topics))
 
-                async with gateway:
-                    await gateway.put(
-                        'update_profile', new_data=new_user
-                    )
-
-                await callback.answer(MESSAGES["topic_changed"][lang_code])
-                await state.update_data(new_topics=[], topics=", ".join(new_topics))
+                await callback.answer(catalog.get(lang_code, "messages.topic_changed"))
                 await state.set_state(MultiSelection.ended_change)
                 return await go_back_handler(callback, state)
 
-            await callback.answer(MESSAGES["fail_to_change"][lang_code])
+            await callback.answer(catalog.get(lang_code, "messages.fail_to_change"))
             return await go_back_handler(callback, state)
 
         await state.update_data(new_topics=new_topics)
@@ -250,5 +223,9 @@ async def change_topic_handler(callback: CallbackQuery, state: FSMContext):
         logger.error(f"User {user_id} trying to access data but doesn`t exist in DB")
         await callback.message.answer("You`re not registered. Press /start to do so")
 
+    except ProfileUpdateError as e:
+        logger.error(f"User {user_id} profile can`t be saved: {e}")
+        await callback.message.answer(catalog.get(data.get("lang_code"), "error_messages.profile_update_error"))
+
     except Exception as e:
         logger.error(f"Error in change_topic handler: {e}")
@@ -1,13 +1,11 @@
-import aiohttp.client_exceptions
 from aiogram import F, Router
 from aiogram.enums import ParseMode
 from aiogram.filters import and_f
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, FSInputFile
-from aiohttp import ClientResponse
+from aiogram.types import CallbackQuery
 
 from src.config import config
-from src.dependencies import get_gateway
+from src.dependencies import get_gateway, get_subscription_cache, get_media_registry
 from src.exc import StorageDataException
 from src.filters.approved import approved
 from src.keyboards.inline_keyboards import (
@@ -18,7 +16,7 @@ from src.keyboards.inline_keyboards import (
     about_me_keyboard
 )
 from src.logconf import opt_logger as log
-from src.translations import MESSAGES, EMOJI_SHOP, TRANSCRIPTIONS, EMOJI_TRANSCRIPTIONS
+from src.i18n import catalog
 from src.utils.access_data import data_storage as ds, MultiSelection
 
 logger = log.setup_logger("main_menu_cb_handler")
@@ -36,24 +34,22 @@ async def start_main_page_handler(callback: CallbackQuery, state: FSMContext):
 
     user_id = callback.from_user.id
 
-    gateway = await get_gateway()
-    async with gateway() as session:
-        profile_exists = await session.get('profile_exists', user_id)
-
     try:
         data = await ds.get_storage_data(user_id, state)
         lang_code = data.get("lang_code")
 
-        msg = f"{MESSAGES['welcome'][lang_code]}"
+        msg = catalog.get(lang_code, "messages.welcome")
 
-        if not profile_exists:
-            msg += MESSAGES["get_to_know"][lang_code]
+        # Никнейм есть только у пользователей с записью profiles (см. set_user_info)
+        if not data.get('nickname'):
+            msg += catalog.get(lang_code, "messages.get_to_know")
         else:
-            msg += MESSAGES["pin_me"][lang_code]
+            msg += catalog.get(lang_code, "messages.pin_me")
 
-        image_from_file = FSInputFile(config.ABS_PATH_TO_IMG_ONE)
-        await callback.message.answer_photo(
-            photo=image_from_file,
+        media = await get_media_registry()
+        await media.answer_photo(
+            callback.message,
+            config.bot.abs_img_path,
             caption=msg,
             reply_markup=get_on_main_menu_keyboard(lang_code),
             parse_mode=ParseMode.HTML,
@@ -81,12 +77,12 @@ async def go_back_handler(callback: CallbackQuery, state: FSMContext):
         data = await ds.get_storage_data(user_id, state)
         lang_code = data.get("lang_code")
 
-        msg = f"{MESSAGES['welcome'][lang_code]}"
+        msg = catalog.get(lang_code, "messages.welcome")
 
         if not data.get('nickname', False):
-            msg += MESSAGES["get_to_know"][lang_code]
+            msg += catalog.get(lang_code, "messages.get_to_know")
         else:
-            msg += MESSAGES["pin_me"][lang_code]
+            msg += catalog.get(lang_code, "messages.pin_me")
 
         await callback.message.edit_caption(
             caption=msg,
@@ -121,7 +117,7 @@ async def about(callback: CallbackQuery, state: FSMContext):
         is_active = data.get("is_active")
         if not is_active: return await callback.answer("Your subscription on pause")
 
-        msg = MESSAGES["about"][lang_code]
+        msg = catalog.get(lang_code, "messages.about")
 
         # Редактируем текущее сообщение
         await callback.message.edit_caption(
@@ -155,13 +151,13 @@ async def profile_handler(callback: CallbackQuery, state: FSMContext):
         nickname = data.get("nickname", callback.from_user.username)
         sidebar = "=" * (17 - len(nickname))
         formated_nickname = sidebar + " " + nickname + " " + sidebar
-        topics = [TRANSCRIPTIONS["topics"][topic][lang_code] for topic in data.get("topics").split(", ")]
-        msg = MESSAGES["user_info"][lang_code].format(
+        topics = [catalog.get(lang_code, f"transcriptions.topics.{topic}") for topic in data.get("topics").split(", ")]
+        msg = catalog.format(lang_code, "messages.user_info",
             nickname=formated_nickname,
-            age=data.get("age", 'not specified'),
-            fluency=TRANSCRIPTIONS["fluency"][data.get("fluency")][lang_code],
+            age=data.get("age") or 'not specified',
+            fluency=catalog.get(lang_code, f"transcriptions.fluency.{data.get('fluency')}"),
             topic=", ".join(topics),
-            language=TRANSCRIPTIONS["languages"][data.get("language")][lang_code],
+            language=catalog.get(lang_code, f"transcriptions.languages.{data.get('language')}"),
             about=data.get("about", 'not specified'),
         )
 
@@ -193,12 +189,12 @@ async def go_back_handler(callback: CallbackQuery, state: FSMContext):
         data = await ds.get_storage_data(user_id, state)
         lang_code = data.get("lang_code")
 
-        msg = f"{MESSAGES['welcome'][lang_code]}"
+        msg = catalog.get(lang_code, "messages.welcome")
 
         if not data.get('nickname', False):
-            msg += MESSAGES["get_to_know"][lang_code]
+            msg += catalog.get(lang_code, "messages.get_to_know")
         else:
-            msg += MESSAGES["pin_me"][lang_code]
+            msg += catalog.get(lang_code, "messages.pin_me")
 
         await callback.message.edit_caption(
             caption=msg,
@@ -223,10 +219,10 @@ async def shop_handler(callback: CallbackQuery, state: FSMContext):
     try:
         data = await ds.get_storage_data(user_id, state)
         lang_code = data.get("lang_code")
-        msg = MESSAGES["shop_offer"][lang_code] + " "*10 + f"{shop_indx+1}/10\n\n"
-        for k, v in EMOJI_SHOP["emojies"][shop_indx].items():
-            msg += v + " " + EMOJI_TRANSCRIPTIONS[k][lang_code] + "\n"
-        msg += "\n" + MESSAGES["shop_actions"][lang_code].format(description=EMOJI_SHOP["description"][shop_indx][lang_code])
+        msg = catalog.get(lang_code, "messages.shop_offer") + " "*10 + f"{shop_indx+1}/10\n\n"
+        for k, v in catalog.shared(f"emoji_shop.emojies.{shop_indx}").items():
+            msg += v + " " + catalog.get(lang_code, f"emoji_transcriptions.{k}") + "\n"
+        msg += "\n" + catalog.format(lang_code, "messages.shop_actions", description=catalog.get(lang_code, f"emoji_shop.description.{shop_indx}"))
 
         await callback.message.edit_caption(
             caption=msg,
@@ -254,14 +250,14 @@ async def manage_subscription_handler(callback: CallbackQuery, state: FSMContext
         due_to = data.get('due_to')
 
         if is_active:
-            cap = MESSAGES["active_sub_caption"][lang_code].format(date=due_to.split('T')[0])
+            cap = catalog.format(lang_code, "messages.active_sub_caption", date=due_to.split('T')[0])
             await callback.message.edit_caption(
                 caption=cap,
                 reply_markup=get_subscription_keyboard(lang_code, True),
                 parse_mode=ParseMode.HTML
             )
         else:
-            cap = MESSAGES["resume_sub_caption"][lang_code]
+            cap = catalog.get(lang_code, "messages.resume_sub_caption")
             await callback.message.edit_caption(
                 caption=cap,
                 reply_markup=get_subscription_keyboard(lang_code, False, True),
@@ -271,7 +267,7 @@ async def manage_subscription_handler(callback: CallbackQuery, state: FSMContext
         # Уже по новой вызывается ds, чтобы вытащить lang_code
         data = await ds.get_storage_data(user_id, state)
         lang_code = data.get("lang_code")
-        cap = MESSAGES["expired_sub_caption"][lang_code]
+        cap = catalog.get(lang_code, "messages.expired_sub_caption")
         await callback.message.edit_caption(
             caption=cap,
             reply_markup=get_subscription_keyboard(lang_code, False),
@@ -287,9 +283,13 @@ async def cancel_subscription_handler(callback: CallbackQuery, state: FSMContext
     user_id = callback.from_user.id
 
     gateway = await get_gateway()
-    async with gateway() as session:
-        await session.post('deactivate_subscription', user_id)
+    async with gateway:
+        # Ошибка ответа GateWay поднимает httpx.HTTPStatusError
+        await gateway.post('deactivate_subscription', user_id)
 
+    cache = await get_subscription_cache()
+    await cache.invalidate(user_id)
+    await ds.update_profile(user_id, is_active=False)
     await state.clear()
 
     user_id = callback.from_user.id
@@ -300,14 +300,14 @@ async def cancel_subscription_handler(callback: CallbackQuery, state: FSMContext
 
     if await approved(callback):
         if is_active:
-            cap = MESSAGES["active_sub_caption"][lang_code].format(date=due_to.split('T')[0])
+            cap = catalog.format(lang_code, "messages.active_sub_caption", date=due_to.split('T')[0])
             await callback.message.edit_caption(
                 caption=cap,
                 reply_markup=get_subscription_keyboard(lang_code, True),
                 parse_mode=ParseMode.HTML
             )
         else:
-            cap = MESSAGES["resume_sub_caption"][lang_code]
+            cap = catalog.get(lang_code, "messages.resume_sub_caption")
             await callback.message.edit_caption(
                 caption=cap,
                 reply_markup=get_subscription_keyboard(lang_code, False, True),
@@ -315,7 +315,7 @@ async def cancel_subscription_handler(callback: CallbackQuery, state: FSMContext
             )
 
     else:
-        cap = MESSAGES["expired_sub_caption"][lang_code]
+        cap = catalog.get(lang_code, "messages.expired_sub_caption")
         await callback.message.edit_caption(
             caption=cap,
             reply_markup=get_subscription_keyboard(lang_code, False),
@@ -330,10 +330,13 @@ async def resume_subscription_handler(callback: CallbackQuery, state: FSMContext
 
     user_id = callback.from_user.id
     gateway = await get_gateway()
-    async with gateway() as session:
-        resp: "ClientResponse" = await session.post('activate_subscription', user_id)
-        if resp.status != 200: raise aiohttp.client_exceptions.ClientError
+    async with gateway:
+        # Ошибка ответа GateWay поднимает httpx.HTTPStatusError
+        await gateway.post('activate_subscription', user_id)
 
+    cache = await get_subscription_cache()
+    await cache.invalidate(user_id)
+    await ds.update_profile(user_id, is_active=True)
     await state.clear()
 
     user_id = callback.from_user.id
@@ -344,21 +347,21 @@ async def resume_subscription_handler(callback: CallbackQuery, state: FSMContext
 
     if await approved(callback):
         if is_active:
-            cap = MESSAGES["active_sub_caption"][lang_code].format(date=due_to.split('T')[0])
+            cap = catalog.format(lang_code, "messages.active_sub_caption", date=due_to.split('T')[0])
             await callback.message.edit_caption(
                 caption=cap,
                 reply_markup=get_subscription_keyboard(lang_code, True),
                 parse_mode=ParseMode.HTML
             )
         else:
-            cap = MESSAGES["resume_sub_caption"][lang_code]
+            cap = catalog.get(lang_code, "messages.resume_sub_caption")
             await callback.message.edit_caption(
                 caption=cap,
                 reply_markup=get_subscription_keyboard(lang_code, False, True),
                 parse_mode=ParseMode.HTML
             )
     else:
-        cap = MESSAGES["expired_sub_caption"][lang_code]
+        cap = catalog.get(lang_code, "messages.expired_sub_caption")
         await callback.message.edit_caption(
             caption=cap,
             reply_markup=get_subscription_keyboard(lang_code, False),
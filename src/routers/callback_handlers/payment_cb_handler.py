@@ -5,11 +5,11 @@ from aiogram.enums import ParseMode
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
 
-from src.dependencies import get_gateway
+from src.dependencies import get_gateway, get_subscription_cache
 from src.exc import StorageDataException
 from src.keyboards.inline_keyboards import get_payment_keyboard
 from src.logconf import opt_logger as log
-from src.translations import MESSAGES
+from src.i18n import catalog
 from src.utils.access_data import data_storage as ds
 
 logger = log.setup_logger('payment_cb_handler')
@@ -23,16 +23,21 @@ async def subscription_expired_handler(callback: CallbackQuery, state: FSMContex
 
     user_id = callback.from_user.id
 
+    # Пользователь в процессе оплаты: следующая проверка
+    # подписки должна получить свежий статус из GateWay
+    cache = await get_subscription_cache()
+    await cache.invalidate(user_id)
+
     gateway = await get_gateway()
-    async with gateway() as session:
-        link = await session.get('yookassa_link', user_id)
+    async with gateway:
+        link = await gateway.get('yookassa_link', user_id)
 
     try:
         data = await ds.get_storage_data(user_id, state)
         lang_code = data.get("lang_code")
 
         sent = await callback.message.answer(
-            text=MESSAGES['payment_needed'][lang_code],
+            text=catalog.get(lang_code, "messages.payment_needed"),
             reply_markup=get_payment_keyboard(lang_code, link),
             parse_mode=ParseMode.HTML,
         )
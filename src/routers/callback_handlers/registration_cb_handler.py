@@ -3,10 +3,10 @@ from aiogram.enums import ParseMode
 from aiogram.filters import and_f
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
-from aiogram.types import CallbackQuery, FSInputFile
+from aiogram.types import CallbackQuery
 
 from src.config import config
-from src.dependencies import get_gateway
+from src.dependencies import get_gateway, get_subscription_cache, get_media_registry
 from src.keyboards.inline_keyboards import (
     show_language_keyboard,
     show_fluency_keyboard,
@@ -17,7 +17,7 @@ from src.keyboards.inline_keyboards import (
 )
 from src.logconf import opt_logger as log
 from src.models import User
-from src.translations import MESSAGES, QUESTIONARY, TRANSCRIPTIONS
+from src.i18n import catalog
 
 logger = log.setup_logger("registration_cb_handler")
 router = Router(name=__name__)
@@ -41,8 +41,8 @@ async def handle_camefrom(callback: CallbackQuery, state: FSMContext):
     users_choice = callback.data.split("_", 1)[1]
 
     msg = (
-        f"{MESSAGES["you_chose"][lang_code]} {TRANSCRIPTIONS["came_from"][users_choice][lang_code]}\n\n"
-        f"{QUESTIONARY["pick_lang"][lang_code]}"
+        f"{catalog.get(lang_code, "messages.you_chose")} {catalog.get(lang_code, f"transcriptions.came_from.{users_choice}")}\n\n"
+        f"{catalog.get(lang_code, "questionary.pick_lang")}"
     )
 
     await callback.message.edit_text(
@@ -62,8 +62,8 @@ async def handle_fluency_choice(callback: CallbackQuery, state: FSMContext):
 
     users_choice = callback.data.split("_", 1)[1]
     msg = (
-        f"{MESSAGES["you_chose"][lang_code]} {TRANSCRIPTIONS["languages"][users_choice][lang_code]}\n\n"
-        f"{QUESTIONARY['fluency'][lang_code]}"
+        f"{catalog.get(lang_code, "messages.you_chose")} {catalog.get(lang_code, f"transcriptions.languages.{users_choice}")}\n\n"
+        f"{catalog.get(lang_code, "questionary.fluency")}"
     )
     await callback.message.edit_text(
         text=msg,
@@ -86,8 +86,8 @@ async def handle_language_choice(callback: CallbackQuery, state: FSMContext):
 
     # Отправляем сообщение с подтверждением
     msg = (
-        f"{MESSAGES["you_chose"][lang_code]} {TRANSCRIPTIONS["fluency"][users_choice][lang_code]}\n\n"
-        f"{QUESTIONARY['choose_topic'][lang_code]}"
+        f"{catalog.get(lang_code, "messages.you_chose")} {catalog.get(lang_code, f"transcriptions.fluency.{users_choice}")}\n\n"
+        f"{catalog.get(lang_code, "questionary.choose_topic")}"
     )
     await callback.message.edit_text(
         text=msg,
@@ -108,10 +108,10 @@ async def handle_transaction_offer(callback: CallbackQuery, state: FSMContext):
 
     if users_choice == 'endselection':
         if len(data.get("topics", [])):
-            choices_str = ", ".join([TRANSCRIPTIONS["topics"][topic][lang_code] for topic in data.get("topics")])
+            choices_str = ", ".join([catalog.get(lang_code, f"transcriptions.topics.{topic}") for topic in data.get("topics")])
             msg = (
-                f"{MESSAGES["you_chose"][lang_code]} {choices_str}\n\n"
-                f"{QUESTIONARY['payment_offer'][lang_code]}"
+                f"{catalog.get(lang_code, "messages.you_chose")} {choices_str}\n\n"
+                f"{catalog.get(lang_code, "questionary.payment_offer")}"
             )
 
             await callback.message.edit_text(
@@ -139,7 +139,7 @@ async def handle_topic_choice(callback: CallbackQuery, state: FSMContext):
     lang_code = data.get("lang_code")
 
     # Отправляем сообщение с подтверждением
-    msg = f"{QUESTIONARY['terms'][lang_code]}"
+    msg = catalog.get(lang_code, "questionary.terms")
 
     await callback.message.edit_text(
         text=msg,
@@ -159,12 +159,13 @@ async def go_to_main_menu(callback: CallbackQuery, state: FSMContext):
     if lang_code not in ["en", "ru", "de", "es", "zh"]:
         lang_code = "en"
 
-    msg = f"{MESSAGES['welcome'][lang_code]}"
-    msg += MESSAGES["get_to_know"][lang_code]
+    msg = catalog.get(lang_code, "messages.welcome")
+    msg += catalog.get(lang_code, "messages.get_to_know")
 
-    image_from_file = FSInputFile(config.bot.abs_img_path)
-    await callback.message.answer_photo(
-        photo=image_from_file,
+    media = await get_media_registry()
+    await media.answer_photo(
+        callback.message,
+        config.bot.abs_img_path,
         caption=msg,
         reply_markup=get_on_main_menu_keyboard(lang_code),
         parse_mode=ParseMode.HTML,
@@ -185,3 +186,6 @@ async def go_to_main_menu(callback: CallbackQuery, state: FSMContext):
             )
         )
 
+    # Новый пользователь получает пробный период
+    cache = await get_subscription_cache()
+    await cache.invalidate(int(data.get("user_id")))
@@ -1,28 +1,36 @@
-import aiohttp.client_exceptions
+import httpx
 from aiogram import Router
 from aiogram.enums import ParseMode
 from aiogram.filters import and_f
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
-from aiohttp import ClientResponse
 
 from src.filters.approved import approved
 from src.keyboards.inline_keyboards import get_menu_keyboard
-from src.models import User, Profile
-from src.translations import MESSAGES
+from src.i18n import catalog
 from src.utils.access_data import MultiSelection
 from src.utils.access_data import data_storage as ds
 from src.utils.exc_handler import nickname_exception_handler, intro_exception_handler
 from src.validators.validators import validate_name, validate_intro
 from src.exc import AlreadyExistsError, TooShortError, TooLongError, InvalidCharactersError, EmptySpaceError, \
-    EmojiesNotAllowed
+    EmojiesNotAllowed, ProfileUpdateError, GatewayUnavailable, DeadlineExceeded
 from src.logconf import opt_logger as log
-from src.dependencies import get_gateway
+from src.dependencies import get_nickname_cache, get_profile_outbox
 
 router = Router(name=__name__)
 logger = log.setup_logger("edit_profile_commands")
 
 
+async def profile_update_failed(message: Message, state: FSMContext, lang_code: str) -> None:
+    """Изменение не сохранено: сообщаем и возвращаем в меню"""
+    await message.reply(
+        text=catalog.get(lang_code, "error_messages.profile_update_error"),
+        reply_markup=get_menu_keyboard(lang_code),
+        parse_mode=ParseMode.HTML
+    )
+    await state.set_state(MultiSelection.ended_change)
+
+
 @router.message(and_f(MultiSelection.waiting_nickname, approved))
 async def edit_nickname_handler(message: Message, state: FSMContext) -> None:
     """
@@ -33,7 +41,7 @@ async def edit_nickname_handler(message: Message, state: FSMContext) -> None:
     """
     user_id = message.from_user.id
     new_nickname = message.text.strip()
-    data = await state.get_data()
+    data = await ds.get_storage_data(user_id, state)
     lang_code = data.get("lang_code")
     try:
         await validate_name(new_nickname)
@@ -48,33 +56,35 @@ async def edit_nickname_handler(message: Message, state: FSMContext) -> None:
         await state.set_state(MultiSelection.waiting_nickname)
         return await nickname_exception_handler(message, lang_code, e)
     else:
-        await state.update_data(nickname=new_nickname)
+        # Никнейм уникален: пока GateWay не принял запись, его могут занять,
+        # поэтому он пишется сразу, а не через очередь
+        nickname_cache = await get_nickname_cache()
+        outbox = await get_profile_outbox()
+        try:
+            await outbox.write(user_id, 'profiles', nickname=new_nickname)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 409:
+                logger.error("Failed to change nickname of user %s: %s", user_id, e)
+                return await profile_update_failed(message, state, lang_code)
+            # Никнейм заняли между проверкой и записью
+            nickname_cache.mark_taken(new_nickname)
+            await state.set_state(MultiSelection.waiting_nickname)
+            return await nickname_exception_handler(message, lang_code, AlreadyExistsError())
+        except (ProfileUpdateError, httpx.TransportError, GatewayUnavailable, TimeoutError, DeadlineExceeded) as e:
+            logger.error("Failed to change nickname of user %s: %s", user_id, e)
+            return await profile_update_failed(message, state, lang_code)
+
+        await ds.update_profile(user_id, nickname=new_nickname)
+        # Новый никнейм теперь занят, а прежний освободился
+        nickname_cache.mark_taken(new_nickname)
+        if data.get('nickname'):
+            await nickname_cache.forget(data['nickname'])
+
         await message.answer(
-            text=MESSAGES["nickname_change_succeeded"][lang_code],
+            text=catalog.get(lang_code, "messages.nickname_change_succeeded"),
             reply_markup=get_menu_keyboard(lang_code),
             parse_mode=ParseMode.HTML
         )
-
-        gateway = await get_gateway()
-        user_data = ds.get_storage_data(user_id, state)
-        new_profile = Profile(
-            user_id=user_id,
-            nickname=new_nickname,
-            email=user_data.get('email', None),
-            gender=user_data.get('gender', None),
-            intro=user_data.get('intro', None),
-            birthday=user_data.get('birthday', None),
-            dating=user_data.get('dating', None),
-            status=user_data.get('status', None),
-        )
-
-        async with gateway:
-            resp: "ClientResponse" = await gateway.put(
-                'update_profile',
-                new_profile
-            )
-            if resp.status != 200: raise aiohttp.client_exceptions.ClientError
-
         return await state.set_state(MultiSelection.ended_change)
 
 
@@ -82,7 +92,7 @@ async def edit_nickname_handler(message: Message, state: FSMContext) -> None:
 async def edit_intro_handler(message: Message, state: FSMContext):
     user_id = message.from_user.id
     new_intro = message.text.strip()
-    data = await state.get_data()
+    data = await ds.get_storage_data(user_id, state)
     lang_code = data.get("lang_code")
     try:
         validate_intro(new_intro)
@@ -90,22 +100,20 @@ async def edit_intro_handler(message: Message, state: FSMContext):
         await state.set_state(MultiSelection.waiting_intro)
         return await intro_exception_handler(message, lang_code, e)
     else:
-        await state.update_data(intro=new_intro)
+        outbox = await get_profile_outbox()
+        try:
+            # В GateWay запись уходит из очереди в фоне
+            await outbox.enqueue(user_id, 'profiles', intro=new_intro)
+        except ProfileUpdateError as e:
+            logger.error("Failed to change intro of user %s: %s", user_id, e)
+            return await profile_update_failed(message, state, lang_code)
+        await ds.update_profile(user_id, intro=new_intro)
+
         await message.answer(
-            text=MESSAGES["intro_change_succeeded"][lang_code],
+            text=catalog.get(lang_code, "messages.intro_change_succeeded"),
             reply_markup=get_menu_keyboard(lang_code),
             parse_mode=ParseMode.HTML
         )
-
-        gateway = await get_gateway()
-        async with gateway:
-            resp: "ClientResponse" = await gateway.post(
-                'update_profile',
-                user_id, new_intro,
-                target='intro'
-            )
-            if resp.status != 200: raise aiohttp.client_exceptions.ClientError
-
         return await state.set_state(MultiSelection.ended_change)
 
 
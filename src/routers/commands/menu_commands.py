@@ -4,10 +4,10 @@ from aiogram import Router
 from aiogram.enums import ParseMode
 from aiogram.filters import Command, and_f
 from aiogram.fsm.context import FSMContext
-from aiogram.types import Message, FSInputFile
+from aiogram.types import Message
 
 from src.config import config
-from src.dependencies import get_gateway
+from src.dependencies import get_gateway, get_media_registry
 from src.exc import StorageDataException
 from src.filters.approved import approved
 from src.keyboards.inline_keyboards import (
@@ -15,7 +15,7 @@ from src.keyboards.inline_keyboards import (
 )
 from src.logconf import opt_logger as log
 from src.middlewares.rate_limit_middleware import RateLimitInfo
-from src.translations import MESSAGES
+from src.i18n import catalog
 from src.utils.access_data import data_storage as ds
 
 if TYPE_CHECKING:
@@ -44,15 +44,16 @@ async def show_main_menu(message: Message, state: FSMContext, rate_limit_info: R
         is_active = data.get("is_active")
         if not is_active: return
 
-        msg = f"{MESSAGES['welcome'][lang_code]}"
+        msg = catalog.get(lang_code, "messages.welcome")
         if data.get("nickname", False):
-            msg += MESSAGES["pin_me"][lang_code]
+            msg += catalog.get(lang_code, "messages.pin_me")
         else:
-            msg += MESSAGES["get_to_know"][lang_code]
+            msg += catalog.get(lang_code, "messages.get_to_know")
 
-        image_from_file = FSInputFile(config.bot.abs_img_path)
-        await message.answer_photo(
-            photo=image_from_file,
+        media = await get_media_registry()
+        await media.answer_photo(
+            message,
+            config.bot.abs_img_path,
             caption=msg,
             reply_markup=get_on_main_menu_keyboard(lang_code),
             parse_mode=ParseMode.HTML,
@@ -76,14 +77,14 @@ async def get_my_location(message: Message, state: FSMContext):
     async with gateway:
         location = await gateway.get('get_users_location', user_id)
         if not location:
-            await message.answer(text=MESSAGES["no_location"][lang_code])
+            await message.answer(text=catalog.get(lang_code, "messages.no_location"))
             return
 
         else:
             city = data["city"] # noqa
             country = data["country"] # noqa
 
-            msg = MESSAGES["your_location"][lang_code]
+            msg = catalog.get(lang_code, "messages.your_location")
             await message.answer(
                 text=f"{msg}: <b>{city}</b>, <b>{country}</b>",
                 parse_mode=ParseMode.HTML,
@@ -5,7 +5,7 @@ from aiogram.types import Message
 
 from src.keyboards.inline_keyboards import show_where_from_keyboard
 from src.middlewares.rate_limit_middleware import RateLimitInfo
-from src.translations import QUESTIONARY, MESSAGES
+from src.i18n import catalog
 from src.dependencies import get_gateway
 from src.logconf import opt_logger as log
 
@@ -33,18 +33,18 @@ async def start_with_polling(message: Message, state: FSMContext, rate_limit_inf
 
     gateway = await get_gateway()
     async with gateway:
-        response = await gateway.get('check_user_exists', user_id)
+        user = await gateway.get('check_user_exists', user_id)
 
 
-    if response.json():
+    if user is not None:
         # если пользователь есть — сразу меню
         return await message.answer(
             text="Press /menu to open menu"
         )
 
     msg = (
-        f"{MESSAGES['hello'][lang_code]} <b>{first_name}</b>!\n\n"
-        f"{QUESTIONARY["intro"][lang_code]}"
+        f"{catalog.get(lang_code, "messages.hello")} <b>{first_name}</b>!\n\n"
+        f"{catalog.get(lang_code, "questionary.intro")}"
     )
 
     await message.bot.send_message(
@@ -6,9 +6,9 @@ from aiogram.types import Message
 from src.filters.approved import approved
 from src.keyboards.inline_keyboards import get_payment_keyboard
 from src.middlewares.rate_limit_middleware import RateLimitInfo
-from src.translations import MESSAGES
+from src.i18n import catalog
 from src.utils.access_data import data_storage as ds
-from src.dependencies import get_gateway
+from src.dependencies import get_gateway, get_subscription_cache
 from src.exc import StorageDataException
 from src.logconf import opt_logger as log
 
@@ -32,7 +32,7 @@ async def get_help_handler(message: Message, state: FSMContext, rate_limit_info:
         if not is_active: return
 
         await message.bot.send_message(
-            chat_id=message.chat.id, text=MESSAGES["get_help"][lang_code]
+            chat_id=message.chat.id, text=catalog.get(lang_code, "messages.get_help")
         )
 
     except StorageDataException:
@@ -50,16 +50,15 @@ async def pay_cmd(message: Message, state: FSMContext, rate_limit_info: RateLimi
     gateway = await get_gateway()
 
     async with gateway:
-        response = await gateway.get('check_user_exists', user_id)
-
-        if response.status_code == 200:
-            response = await gateway.get('yookassa_link', user_id)
-            link = response.json()
-        elif response.status_code == 404:
+        if await gateway.get('check_user_exists', user_id) is None:
             await message.answer("You`re not registered. Press /start to do so")
             return
-        else:
-            return
+
+        # Пользователь в процессе оплаты: следующая проверка
+        # подписки должна получить свежий статус из GateWay
+        cache = await get_subscription_cache()
+        await cache.invalidate(user_id)
+        link = await gateway.get('yookassa_link', user_id)
 
     logger.debug(
         f"User %s message count: %s",
@@ -71,7 +70,7 @@ async def pay_cmd(message: Message, state: FSMContext, rate_limit_info: RateLimi
         lang_code = data.get("lang_code")
 
         await message.answer(
-            text=MESSAGES['payment_needed'][lang_code],
+            text=catalog.get(lang_code, "messages.payment_needed"),
             reply_markup=get_payment_keyboard(lang_code, link),
             parse_mode=ParseMode.HTML,
         )
@@ -0,0 +1,64 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from src.config import config
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('webhook server')
+
+
+async def health_handler(request: web.Request) -> web.Response:
+    """Проверка доступности для балансировщика и docker healthcheck"""
+    return web.json_response({'status': 'ok', 'mode': config.bot.mode})
+
+
+def build_webhook_app(disp: Dispatcher, bot: Bot) -> web.Application:
+    """Собирает aiohttp приложение с обработчиком обновлений Telegram"""
+
+    app = web.Application()
+    app.router.add_get('/health', health_handler)
+
+    # Telegram подписывает каждый запрос заголовком
+    # X-Telegram-Bot-Api-Secret-Token, чужие запросы отклоняются
+    SimpleRequestHandler(
+        dispatcher=disp,
+        bot=bot,
+        secret_token=config.bot.webhook_secret,
+    ).register(app, path=config.bot.webhook_path)
+
+    setup_application(app, disp, bot=bot)
+    return app
+
+
+async def run_webhook(disp: Dispatcher, bot: Bot) -> None:
+    """Регистрирует webhook в Telegram и запускает веб-сервер"""
+
+    if not config.bot.webhook_url:
+        raise RuntimeError('WEBHOOK_URL is required for BOT_MODE=webhook')
+    if not config.bot.webhook_secret:
+        logger.warning('WEBHOOK_SECRET is not set, webhook requests are not verified')
+
+    await bot.set_webhook(
+        url=config.bot.webhook_url.rstrip('/') + config.bot.webhook_path,
+        secret_token=config.bot.webhook_secret,
+        max_connections=config.bot.webhook_max_connections,
+        allowed_updates=disp.resolve_used_update_types(),
+    )
+
+    runner = web.AppRunner(build_webhook_app(disp, bot))
+    await runner.setup()
+    site = web.TCPSite(runner, host=config.bot.host, port=config.bot.port)
+    await site.start()
+
+    logger.info(
+        'Webhook server listening on %s:%s%s',
+        config.bot.host, config.bot.port, config.bot.webhook_path
+    )
+    try:
+        # Работаем до отмены задачи (SIGINT/SIGTERM)
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
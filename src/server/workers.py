@@ -0,0 +1,358 @@
+import asyncio
+import json
+import multiprocessing
+import signal
+import time
+from typing import Optional
+
+import httpx
+from aiogram import Bot
+from aiogram.types import Update
+from aiohttp import web
+from redis.exceptions import RedisError
+
+from src.config import config
+from src.services.metrics import start_metrics_server
+from src.services.redis import redis_service
+from src.utils.loop_monitor import start_loop_monitor
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('workers')
+
+QUEUE_KEY = 'updates:shard:{}'
+# Обновления, взятые воркером в работу, но еще не обработанные
+PROCESSING_KEY = 'updates:shard:{}:processing'
+
+
+def extract_user_id(update: dict) -> Optional[int]:
+    """Достает id пользователя из сырого обновления без разбора в pydantic"""
+    for key, event in update.items():
+        if key == 'update_id' or not isinstance(event, dict):
+            continue
+        for field in ('from', 'user', 'chat'):
+            owner = event.get(field)
+            if isinstance(owner, dict) and 'id' in owner:
+                return owner['id']
+    return None
+
+
+def shard_for(update: dict, shards: int) -> int:
+    """Все обновления одного пользователя попадают в один воркер"""
+    user_id = extract_user_id(update)
+    return hash(user_id) % shards if user_id is not None else 0
+
+
+class UpdateRouter:
+    """Раскладывает входящие обновления по очередям воркеров в Redis"""
+
+    def __init__(self, shards: int):
+        self.shards = shards
+
+    async def push(self, updates: list[dict]) -> None:
+        if not updates:
+            return
+
+        redis = await redis_service.get_redis_client()
+        async with redis.pipeline(transaction=False) as pipe:
+            for update in updates:
+                pipe.rpush(
+                    QUEUE_KEY.format(shard_for(update, self.shards)),
+                    json.dumps(update, ensure_ascii=False)
+                )
+            await pipe.execute()
+
+
+async def poll_updates(router: UpdateRouter, bot: Bot, allowed_updates: list[str]) -> None:
+    """Long polling getUpdates без разбора обновлений в текущем процессе"""
+
+    url = bot.session.api.api_url(bot.token, 'getUpdates')
+    offset, backoff = None, 1.0
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(40.0, connect=5.0)) as client:
+        while True:
+            try:
+                response = await client.post(url, json={
+                    'offset': offset,
+                    'timeout': 30,
+                    'allowed_updates': allowed_updates,
+                })
+                payload = response.json()
+                if not payload.get('ok'):
+                    raise RuntimeError(payload.get('description'))
+
+                updates = payload['result']
+                if updates:
+                    await router.push(updates)
+                    # Смещение двигается только после записи в очереди,
+                    # иначе Telegram больше не отдаст эти обновления
+                    offset = updates[-1]['update_id'] + 1
+
+            except Exception as e:
+                logger.error('Failed to receive or route updates: %s', e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+
+            backoff = 1.0
+
+
+def build_ingress_app(router: UpdateRouter) -> web.Application:
+    """Webhook, который только раскладывает обновления по воркерам"""
+
+    async def handle_update(request: web.Request) -> web.Response:
+        secret = config.bot.webhook_secret
+        if secret and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != secret:
+            return web.Response(status=401)
+
+        await router.push([await request.json()])
+        return web.Response()
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response({
+            'status': 'ok', 'mode': config.bot.mode, 'workers': router.shards
+        })
+
+    app = web.Application()
+    app.router.add_post(config.bot.webhook_path, handle_update)
+    app.router.add_get('/health', health)
+    return app
+
+
+class Supervisor:
+    """Запускает процессы-воркеры и перезапускает упавшие"""
+
+    def __init__(self, shards: int):
+        self.shards = shards
+        self._ctx = multiprocessing.get_context('spawn')
+        self._processes: dict[int, multiprocessing.Process] = {}
+        self._started_at: dict[int, float] = {}
+        self._restarts: dict[int, int] = {shard: 0 for shard in range(shards)}
+
+    def _spawn(self, shard: int) -> None:
+        process = self._ctx.Process(
+            target=worker_main, args=(shard,), name=f'bot-worker-{shard}', daemon=True
+        )
+        process.start()
+        self._processes[shard] = process
+        self._started_at[shard] = time.monotonic()
+        logger.info('Worker %s started (pid %s)', shard, process.pid)
+
+    def start(self) -> None:
+        for shard in range(self.shards):
+            self._spawn(shard)
+
+    async def watch(self, interval: float = 1.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            for shard, process in list(self._processes.items()):
+                if process.is_alive():
+                    # Воркер проработал достаточно - сбрасываем счетчик
+                    if time.monotonic() - self._started_at[shard] > 60:
+                        self._restarts[shard] = 0
+                    continue
+
+                self._restarts[shard] += 1
+                delay = min(2 ** self._restarts[shard], 30)
+                logger.error(
+                    'Worker %s exited with code %s, restarting in %ss',
+                    shard, process.exitcode, delay
+                )
+                del self._processes[shard]
+                asyncio.get_running_loop().call_later(delay, self._spawn, shard)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        for process in self._processes.values():
+            process.terminate()
+        for process in self._processes.values():
+            process.join(timeout)
+
+
+class ShardWorker:
+    """
+    Обрабатывает обновления своей очереди. Разные пользователи
+    обрабатываются параллельно, обновления одного - строго по порядку.
+
+    Обновление переносится (BLMOVE) в список processing и удаляется
+    оттуда только после обработки. Перезапущенный воркер возвращает
+    оставшееся в processing в начало очереди: обновления упавшего
+    процесса обрабатываются повторно, а не теряются (at-least-once).
+    """
+
+    def __init__(self, shard: int, bot: Bot, disp, concurrency: int, backlog: int):
+        self.shard = shard
+        self.queue_key = QUEUE_KEY.format(shard)
+        self.processing_key = PROCESSING_KEY.format(shard)
+        self.bot = bot
+        self.disp = disp
+        self._slots = asyncio.Semaphore(concurrency)
+        # Сколько взятых обновлений может ждать в памяти своей очереди
+        self._backlog = asyncio.Semaphore(backlog)
+        # user_id -> последняя задача пользователя
+        self._tails: dict[int, asyncio.Task] = {}
+
+    async def _process(self, raw: bytes, previous: Optional[asyncio.Task]) -> None:
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+
+            # Слот занимается, только когда подошла очередь пользователя:
+            # поток обновлений от одного пользователя не забирает чужие слоты
+            async with self._slots:
+                update = Update.model_validate_json(raw, context={'bot': self.bot})
+                await self.disp.feed_update(self.bot, update)
+        except Exception as e:
+            logger.exception('Failed to process update: %s', e)
+        finally:
+            self._backlog.release()
+            await self._ack(raw)
+
+    async def _ack(self, raw: bytes) -> None:
+        try:
+            redis = await redis_service.get_redis_client()
+            await redis.lrem(self.processing_key, 1, raw)
+        except RedisError as e:
+            # Останется в processing и будет обработано повторно после перезапуска
+            logger.warning('Failed to ack update on shard %s: %s', self.shard, e)
+
+    async def _recover(self, redis) -> None:
+        """Возвращает в начало очереди обновления, не обработанные до перезапуска"""
+        requeued = 0
+        while await redis.lmove(self.processing_key, self.queue_key, 'RIGHT', 'LEFT') is not None:
+            requeued += 1
+        if requeued:
+            logger.warning('Shard %s requeued %s unfinished updates', self.shard, requeued)
+
+    def _forget(self, user_id: int, task: asyncio.Task) -> None:
+        if self._tails.get(user_id) is task:
+            del self._tails[user_id]
+
+    async def run(self) -> None:
+        recovered, backoff = False, 1.0
+
+        while True:
+            await self._backlog.acquire()
+            try:
+                redis = await redis_service.get_redis_client()
+                if not recovered:
+                    await self._recover(redis)
+                    recovered = True
+                raw = await redis.blmove(self.queue_key, self.processing_key, 5, 'LEFT', 'RIGHT')
+            except RedisError as e:
+                self._backlog.release()
+                logger.error('Failed to read shard %s queue: %s', self.shard, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+
+            backoff = 1.0
+            if raw is None:
+                self._backlog.release()
+                continue
+
+            try:
+                user_id = extract_user_id(json.loads(raw))
+            except (ValueError, AttributeError) as e:
+                # Повтор не поможет: битое обновление просто удаляется
+                logger.error('Dropping malformed update on shard %s: %s', self.shard, e)
+                self._backlog.release()
+                await self._ack(raw)
+                continue
+
+            task = asyncio.create_task(self._process(raw, self._tails.get(user_id)))
+            if user_id is not None:
+                self._tails[user_id] = task
+                task.add_done_callback(lambda t, uid=user_id: self._forget(uid, t))
+
+
+async def run_worker(shard: int) -> None:
+    # Импорт внутри процесса-воркера, чтобы не создавать цикл импортов
+    from src.main import create_bot, create_dispatcher
+    from src.dependencies import get_gateway
+
+    bot = create_bot()
+    disp = await create_dispatcher()
+    worker = ShardWorker(
+        shard, bot, disp, config.bot.worker_concurrency, config.bot.worker_backlog
+    )
+    # У каждого процесса свой реестр метрик и свой порт: METRICS_PORT + 1 + shard
+    metrics_runner = await start_metrics_server(port=config.metrics.port + 1 + shard)
+    loop_monitor = start_loop_monitor()
+
+    # Те же startup/shutdown хуки, что вызывает start_polling в одиночном режиме
+    workflow_data = {'dispatcher': disp, 'bots': [bot], **disp.workflow_data}
+    await disp.emit_startup(bot=bot, **workflow_data)
+    work = asyncio.create_task(worker.run())
+    # Supervisor.stop() завершает воркер через SIGTERM: без обработчика процесс
+    # умирает сразу, и shutdown хуки (outbox, кэши, рассылка) не отрабатывают
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, work.cancel)
+    try:
+        await work
+    except asyncio.CancelledError:
+        logger.info('Worker %s is shutting down', shard)
+    finally:
+        loop.remove_signal_handler(signal.SIGTERM)
+        try:
+            await disp.emit_shutdown(bot=bot, **workflow_data)
+        except Exception as e:
+            logger.exception('Shutdown hooks of shard %s failed: %s', shard, e)
+        if loop_monitor is not None:
+            loop_monitor.stop()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        gateway = await get_gateway()
+        await gateway.close()
+        await bot.session.close()
+
+
+def worker_main(shard: int) -> None:
+    """Точка входа процесса-воркера"""
+    try:
+        asyncio.run(run_worker(shard))
+    except KeyboardInterrupt:
+        pass
+
+
+async def run_sharded() -> None:
+    """Прием обновлений (polling или webhook) и раздача их воркерам"""
+
+    from src.routers import router as main_router
+
+    router = UpdateRouter(config.bot.workers)
+    supervisor = Supervisor(config.bot.workers)
+    supervisor.start()
+
+    bot = Bot(token=config.bot.token)
+    allowed_updates = main_router.resolve_used_update_types()
+    runner: Optional[web.AppRunner] = None
+    # /metrics - только на отдельном порту, не на публичном webhook
+    metrics_runner = await start_metrics_server()
+    watch = asyncio.create_task(supervisor.watch())
+
+    try:
+        if config.bot.mode == 'webhook':
+            if not config.bot.webhook_url:
+                raise RuntimeError('WEBHOOK_URL is required for BOT_MODE=webhook')
+
+            await bot.set_webhook(
+                url=config.bot.webhook_url.rstrip('/') + config.bot.webhook_path,
+                secret_token=config.bot.webhook_secret,
+                max_connections=config.bot.webhook_max_connections,
+                allowed_updates=allowed_updates,
+            )
+            runner = web.AppRunner(build_ingress_app(router))
+            await runner.setup()
+            await web.TCPSite(runner, host=config.bot.host, port=config.bot.port).start()
+            await watch
+        else:
+            await bot.delete_webhook()
+            await poll_updates(router, bot, allowed_updates)
+
+    finally:
+        watch.cancel()
+        if runner is not None:
+            await runner.cleanup()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        supervisor.stop()
+        await bot.session.close()
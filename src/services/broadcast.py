@@ -0,0 +1,311 @@
+import asyncio
+import contextvars
+import random
+import uuid
+from dataclasses import dataclass, asdict, fields
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from redis.exceptions import RedisError
+
+from src.i18n import catalog
+from src.models.gateway_models import NotificationUser
+from src.services.gateway import gateway_service
+from src.services.redis import redis_service
+from src.services.send_scheduler import send_priority, BULK
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('broadcast')
+
+
+@dataclass
+class BroadcastProgress:
+    """Контрольная точка рассылки, хранится в Redis hash"""
+
+    # Последний user_id полностью обработанной страницы
+    cursor: int = 0
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+    done: bool = False
+    # Куда показывать прогресс администратору
+    chat_id: int = 0
+    message_id: int = 0
+
+    @classmethod
+    def from_redis(cls, raw: dict) -> "BroadcastProgress":
+        values = {key.decode(): value.decode() for key, value in raw.items()}
+        return cls(**{
+            field.name: field.type(values[field.name]) if field.type is not bool
+            else values[field.name] == '1'
+            for field in fields(cls) if field.name in values
+        })
+
+    def to_redis(self) -> dict:
+        return {key: int(value) for key, value in asdict(self).items()}
+
+    def render(self) -> str:
+        status = 'finished' if self.done else 'in progress'
+        return (
+            f"notify_users: {status}\n"
+            f"sent: {self.sent}\n"
+            f"failed: {self.failed}\n"
+            f"blocked bot: {self.blocked}"
+        )
+
+
+class BroadcastEngine:
+    """
+    Рассылка по всем пользователям с продолжением после перезапуска.
+
+    Получатели читаются из Gateway страницами, отправка идет через
+    планировщик с приоритетом BULK (ответы пользователям не ждут рассылку),
+    после каждой страницы одним запросом отмечается время уведомления
+    и сохраняется курсор. Одновременно идет только одна рассылка:
+    ее держит блокировка в Redis, которую продлевает отдельная задача
+    (как у ProfileOutbox). Потерявшая блокировку рассылка останавливается.
+    """
+
+    key_prefix = 'broadcast'
+    lock_ttl = 120
+    # Как часто после перезапуска проверять, освободилась ли блокировка
+    resume_interval = 10.0
+
+    # KEYS[1] - блокировка, ARGV[1] - значение владельца, ARGV[2] - ttl в мс
+    renew_script = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+    release_script = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(
+        self,
+        name: str,
+        page_size: int = 500,
+        concurrency: int = 100,
+        notified_days: int = 3,
+        report_interval: float = 3.0,
+    ):
+        self.name = name
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.notified_days = notified_days
+        self.report_interval = report_interval
+        self._token = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+        self._resumer: Optional[asyncio.Task] = None
+
+    @property
+    def key(self) -> str:
+        return f'{self.key_prefix}:{self.name}'
+
+    @property
+    def lock_key(self) -> str:
+        return f'{self.key}:lock'
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def load(self) -> Optional[BroadcastProgress]:
+        redis = await redis_service.get_redis_client()
+        raw = await redis.hgetall(self.key)
+        return BroadcastProgress.from_redis(raw) if raw else None
+
+    async def _save(self, progress: BroadcastProgress) -> None:
+        redis = await redis_service.get_redis_client()
+        await redis.hset(self.key, mapping=progress.to_redis())
+
+    async def _acquire(self) -> bool:
+        redis = await redis_service.get_redis_client()
+        return bool(await redis.set(self.lock_key, self._token, nx=True, ex=self.lock_ttl))
+
+    async def _owned(self) -> bool:
+        """Продлевает блокировку, если она все еще наша (проверка и продление атомарны)"""
+        redis = await redis_service.get_redis_client()
+        renew = redis.register_script(self.renew_script)
+        return bool(await renew(keys=[self.lock_key], args=[self._token, self.lock_ttl * 1000]))
+
+    async def _release(self) -> None:
+        redis = await redis_service.get_redis_client()
+        release = redis.register_script(self.release_script)
+        await release(keys=[self.lock_key], args=[self._token])
+
+    async def _heartbeat(self) -> None:
+        """Продлевает блокировку и возвращается, как только она стала чужой"""
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            try:
+                if not await self._owned():
+                    return
+            except RedisError as e:
+                # Блокировка еще жива до lock_ttl, пробуем продлить в следующий раз
+                logger.warning('Failed to renew broadcast %s lock: %s', self.name, e)
+
+    async def start(self, bot: Bot, chat_id: int, restart: bool = False) -> bool:
+        """
+        Запускает рассылку в фоне или продолжает незавершенную.
+        Возвращает False, если рассылка уже идет
+        """
+        if self.running or not await self._acquire():
+            return False
+
+        progress = None if restart else await self.load()
+        if progress is None or progress.done:
+            progress = BroadcastProgress()
+
+        message = await bot.send_message(chat_id=chat_id, text=progress.render())
+        progress.chat_id, progress.message_id = chat_id, message.message_id
+        await self._save(progress)
+
+        self._spawn(bot, progress)
+        return True
+
+    async def resume(self, bot: Bot) -> None:
+        """
+        Продолжает рассылку, прерванную перезапуском (startup хук).
+        Блокировка упавшего процесса живет до lock_ttl, поэтому
+        захватить ее пытаемся в фоне, пока рассылка не завершена
+        """
+        if self._resumer is None or self._resumer.done():
+            self._resumer = asyncio.create_task(self._resume(bot), context=contextvars.Context())
+
+    async def _resume(self, bot: Bot) -> None:
+        while True:
+            try:
+                progress = await self.load()
+                if progress is None or progress.done or self.running:
+                    return
+                if await self._acquire():
+                    # Пока ждали, рассылку мог закончить другой процесс
+                    progress = await self.load()
+                    if progress is None or progress.done:
+                        return await self._release()
+                    break
+            except RedisError as e:
+                logger.warning('Failed to check broadcast %s checkpoint: %s', self.name, e)
+            # Блокировку держит упавший процесс или рассылка идет в другом
+            await asyncio.sleep(self.resume_interval)
+
+        logger.info('Resuming broadcast %s after user %s', self.name, progress.cursor)
+        self._spawn(bot, progress)
+
+    def _spawn(self, bot: Bot, progress: BroadcastProgress) -> None:
+        # Чистый контекст: рассылке не нужен дедлайн обновления, которое ее запустило
+        self._task = asyncio.create_task(self._run(bot, progress), context=contextvars.Context())
+
+    async def _report(self, bot: Bot, progress: BroadcastProgress) -> None:
+        try:
+            await bot.edit_message_text(
+                chat_id=progress.chat_id,
+                message_id=progress.message_id,
+                text=progress.render(),
+            )
+        except TelegramBadRequest:
+            # Текст не изменился или сообщение удалено
+            pass
+
+    async def _send(self, bot: Bot, user: NotificationUser, progress: BroadcastProgress) -> bool:
+        lang_code = user.lang_code or catalog.fallback
+        texts = catalog.get(lang_code, "notifications.havent_seen_you")
+        try:
+            with send_priority(BULK):
+                await bot.send_message(chat_id=user.user_id, text=random.choice(texts))
+            progress.sent += 1
+            return True
+        except TelegramForbiddenError:
+            progress.blocked += 1
+        except Exception as e:
+            logger.warning('Failed to notify user %s: %s', user.user_id, e)
+            progress.failed += 1
+        return False
+
+    async def _page(self, after: Optional[int]) -> tuple[list[NotificationUser], Optional[int]]:
+        page = await gateway_service.get(
+            'users_for_notification', after, self.page_size, self.notified_days
+        )
+        if page is None:
+            return [], None
+        return page.users, page.next
+
+    async def _run(self, bot: Bot, progress: BroadcastProgress) -> None:
+        """Идет рассылка, пока heartbeat подтверждает блокировку"""
+        work = asyncio.create_task(self._broadcast(bot, progress))
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            done, _ = await asyncio.wait((work, heartbeat), return_when=asyncio.FIRST_COMPLETED)
+            if work not in done:
+                # Блокировку забрал другой процесс: продолжать значит слать дважды
+                logger.warning('Broadcast %s lost its lock after user %s', self.name, progress.cursor)
+                await bot.send_message(
+                    chat_id=progress.chat_id,
+                    text="notify_users stopped: another instance took over",
+                )
+
+        finally:
+            work.cancel()
+            heartbeat.cancel()
+            await asyncio.gather(work, heartbeat, return_exceptions=True)
+            await self._report(bot, progress)
+            try:
+                await self._release()
+            except RedisError as e:
+                logger.warning('Failed to release broadcast %s lock: %s', self.name, e)
+
+    async def _broadcast(self, bot: Bot, progress: BroadcastProgress) -> None:
+        slots = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+        reported_at = 0.0
+
+        async def send(user: NotificationUser) -> Optional[int]:
+            async with slots:
+                return user.user_id if await self._send(bot, user, progress) else None
+
+        try:
+            after = progress.cursor or None
+            while True:
+                users, next_cursor = await self._page(after)
+                if not users:
+                    break
+
+                results = await asyncio.gather(*(send(user) for user in users))
+                notified = [user_id for user_id in results if user_id is not None]
+                if notified:
+                    await gateway_service.post('notified_time', notified)
+
+                after = next_cursor or users[-1].user_id
+                progress.cursor = after
+                await self._save(progress)
+
+                if loop.time() - reported_at >= self.report_interval:
+                    reported_at = loop.time()
+                    await self._report(bot, progress)
+
+                if next_cursor is None and len(users) < self.page_size:
+                    break
+
+            progress.done = True
+            await self._save(progress)
+            logger.info(
+                'Broadcast %s finished: sent %s, failed %s, blocked %s',
+                self.name, progress.sent, progress.failed, progress.blocked
+            )
+
+        except Exception as e:
+            # Курсор сохранен, повторный запуск продолжит с последней страницы
+            logger.exception('Broadcast %s stopped: %s', self.name, e)
+            await bot.send_message(
+                chat_id=progress.chat_id,
+                text=f"notify_users stopped: {e}\nSend !notify_users to resume",
+            )
+
+
+notify_broadcast = BroadcastEngine('notify_users')
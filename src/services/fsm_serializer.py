@@ -0,0 +1,111 @@
+import json
+from typing import Any, Callable, Mapping, Union
+
+import msgspec
+
+from src.config import config
+from src.logconf import opt_logger as log
+
+try:
+    import zstandard
+except ImportError:
+    # Сжатие - необязательная зависимость (pip install zstandard)
+    zstandard = None
+
+logger = log.setup_logger('fsm serializer')
+
+# JSON никогда не начинается с нулевого байта, поэтому по префиксу
+# новые форматы отличаются от ключей, записанных прежним RedisStorage
+MSGPACK = b'\x00M'
+ZSTD = b'\x00Z'
+
+FORMATS = ('json', 'msgpack')
+
+
+def _json_key(key: Any) -> Any:
+    """Ключ словаря так, как его записывает json.dumps"""
+    if isinstance(key, str):
+        return key
+    if key is None or isinstance(key, (bool, int, float)):
+        return json.dumps(key)
+    return key
+
+
+def _json_keys(value: Any) -> Any:
+    """Копия данных с ключами-строками: msgpack иначе сохранил бы int ключи"""
+    if isinstance(value, dict):
+        return {_json_key(key): _json_keys(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_keys(item) for item in value]
+    return value
+
+
+class FSMSerializer:
+    """
+    Сериализация данных FSM для Redis.
+
+    json - прежний формат aiogram RedisStorage, msgpack - компактный
+    бинарный. Данные больше compress_threshold байт дополнительно
+    сжимаются zstd. Чтение понимает все форматы, поэтому смена настройки
+    не требует миграции: ключ переписывается в новом формате при
+    следующем update_data, а непрочитанные ключи истекают по data_ttl.
+
+    Ключи словарей в msgpack приводятся к строкам так же, как в JSON
+    ({1: ...} читается как {'1': ...}), иначе результат зависел бы от формата.
+    """
+
+    def __init__(
+        self,
+        fmt: str = 'json',
+        compress_threshold: int = 0,
+        compress_level: int = 3,
+        json_dumps: Callable[..., str] = json.dumps,
+        json_loads: Callable[..., Any] = json.loads,
+    ):
+        if fmt not in FORMATS:
+            raise ValueError(f'Unknown FSM serializer {fmt!r}, expected one of {FORMATS}')
+
+        if compress_threshold and zstandard is None:
+            logger.warning('zstandard is not installed, FSM data is stored uncompressed')
+            compress_threshold = 0
+
+        self.fmt = fmt
+        self.compress_threshold = compress_threshold
+        self.json_dumps = json_dumps
+        self.json_loads = json_loads
+
+        self._encoder = msgspec.msgpack.Encoder()
+        self._decoder = msgspec.msgpack.Decoder(dict)
+        self._compressor = zstandard.ZstdCompressor(level=compress_level) if compress_threshold else None
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def dumps(self, data: Mapping[str, Any]) -> bytes:
+        if self.fmt == 'msgpack':
+            raw = MSGPACK + self._encoder.encode(_json_keys(data))
+        else:
+            raw = self.json_dumps(data).encode('utf-8')
+
+        if self._compressor is not None and len(raw) > self.compress_threshold:
+            return ZSTD + self._compressor.compress(raw)
+        return raw
+
+    def loads(self, raw: Union[bytes, str]) -> dict[str, Any]:
+        if isinstance(raw, str):
+            return self.json_loads(raw)
+
+        if raw.startswith(ZSTD):
+            if self._decompressor is None:
+                raise RuntimeError('FSM data is zstd-compressed, but zstandard is not installed')
+            raw = self._decompressor.decompress(raw[len(ZSTD):])
+
+        if raw.startswith(MSGPACK):
+            return self._decoder.decode(memoryview(raw)[len(MSGPACK):])
+        return self.json_loads(raw)
+
+
+def create_fsm_serializer(
+    fmt: str = config.redis.fsm_serializer,
+    compress_threshold: int = config.redis.fsm_compress_threshold,
+    compress_level: int = config.redis.fsm_compress_level,
+) -> FSMSerializer:
+    return FSMSerializer(fmt, compress_threshold, compress_level)
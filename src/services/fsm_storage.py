@@ -0,0 +1,172 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StorageKey, StateType
+from aiogram.fsm.storage.redis import RedisStorage
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.services.fsm_serializer import FSMSerializer
+from src.services.metrics import FSM_OPERATIONS
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('fsm storage')
+
+
+class FSMSnapshot:
+    """Состояние и данные одного ключа FSM на время обработки обновления"""
+
+    __slots__ = ('state', 'data', 'state_dirty', 'data_dirty', 'closed')
+
+    def __init__(self, state: Optional[str], data: Optional[bytes]):
+        self.state = state
+        # Данные хранятся сериализованными: каждый get_data отдает новый dict,
+        # а ошибка сериализации возникает там же, где и раньше - в set_data
+        self.data = data
+        self.state_dirty = False
+        self.data_dirty = False
+        # Задачи, созданные обработчиком, наследуют контекст со снимком:
+        # после записи они должны обращаться к Redis напрямую
+        self.closed = False
+
+    @property
+    def dirty(self) -> bool:
+        return self.state_dirty or self.data_dirty
+
+
+_snapshots: ContextVar[Optional[dict[StorageKey, FSMSnapshot]]] = ContextVar(
+    'fsm_snapshots', default=None
+)
+
+
+class BotRedisStorage(RedisStorage):
+    """
+    RedisStorage, который считает обращения к Redis по операциям.
+
+    Внутри snapshot(key) состояние и данные ключа читаются одним
+    пайплайном, чтения и записи обработчиков идут в память, а изменения
+    записываются одним пайплайном при выходе. Остальные ключи
+    (и вызовы вне snapshot) работают как в обычном RedisStorage.
+
+    Данные сериализует FSMSerializer (json или msgpack, опционально zstd).
+    """
+
+    def __init__(self, redis: Redis, serializer: Optional[FSMSerializer] = None, **kwargs):
+        super().__init__(redis, **kwargs)
+        self.serializer = serializer or FSMSerializer(
+            json_dumps=self.json_dumps, json_loads=self.json_loads
+        )
+
+    def _snapshot(self, key: StorageKey) -> Optional[FSMSnapshot]:
+        snapshots = _snapshots.get()
+        snap = snapshots.get(key) if snapshots is not None else None
+        return snap if snap is not None and not snap.closed else None
+
+    @asynccontextmanager
+    async def snapshot(self, key: StorageKey) -> AsyncIterator[FSMSnapshot]:
+        current = self._snapshot(key)
+        if current is not None:
+            # Вложенный вызов: снимок уже загружен выше по стеку
+            yield current
+            return
+
+        snap = await self._load(key)
+        token = _snapshots.set({**(_snapshots.get() or {}), key: snap})
+        error: Optional[BaseException] = None
+        try:
+            yield snap
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _snapshots.reset(token)
+            snap.closed = True
+            if snap.dirty:
+                try:
+                    await self._flush(key, snap)
+                except RedisError as e:
+                    logger.error('Failed to flush FSM of user %s: %s', key.user_id, e)
+                    # Ошибка записи не должна подменять исключение обработчика
+                    if error is None:
+                        raise
+
+    async def _load(self, key: StorageKey) -> FSMSnapshot:
+        FSM_OPERATIONS.labels('load').inc()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(self.key_builder.build(key, 'state'))
+            pipe.get(self.key_builder.build(key, 'data'))
+            state, data = await pipe.execute()
+
+        if isinstance(state, bytes):
+            state = state.decode('utf-8')
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return FSMSnapshot(state, data)
+
+    async def _flush(self, key: StorageKey, snap: FSMSnapshot) -> None:
+        FSM_OPERATIONS.labels('flush').inc()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if snap.state_dirty:
+                state_key = self.key_builder.build(key, 'state')
+                if snap.state is None:
+                    pipe.delete(state_key)
+                else:
+                    pipe.set(state_key, snap.state, ex=self.state_ttl)
+
+            if snap.data_dirty:
+                data_key = self.key_builder.build(key, 'data')
+                if snap.data is None:
+                    pipe.delete(data_key)
+                else:
+                    pipe.set(data_key, snap.data, ex=self.data_ttl)
+
+            await pipe.execute()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        snap = self._snapshot(key)
+        if snap is None:
+            FSM_OPERATIONS.labels('set_state').inc()
+            return await super().set_state(key, state)
+
+        snap.state = state.state if isinstance(state, State) else state
+        snap.state_dirty = True
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        snap = self._snapshot(key)
+        if snap is None:
+            FSM_OPERATIONS.labels('get_state').inc()
+            return await super().get_state(key)
+
+        return snap.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+
+        raw = self.serializer.dumps(data) if data else None
+        snap = self._snapshot(key)
+        if snap is not None:
+            snap.data = raw
+            snap.data_dirty = True
+            return
+
+        FSM_OPERATIONS.labels('set_data').inc()
+        redis_key = self.key_builder.build(key, 'data')
+        if raw is None:
+            await self.redis.delete(redis_key)
+        else:
+            await self.redis.set(redis_key, raw, ex=self.data_ttl)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        snap = self._snapshot(key)
+        if snap is not None:
+            raw = snap.data
+        else:
+            FSM_OPERATIONS.labels('get_data').inc()
+            raw = await self.redis.get(self.key_builder.build(key, 'data'))
+
+        return self.serializer.loads(raw) if raw is not None else {}
@@ -1,49 +1,219 @@
+import asyncio
 import json
+import random
+import time
+from dataclasses import dataclass
 
 import httpx
-from typing import Any, Optional, Union
+from typing import Any, Optional, TypeVar, Union
 
 from src.config import config
+from src.exc import DeadlineExceeded, GatewayUnavailable
 from src.models import User, Profile
+from src.models.gateway_models import (
+    UserRecord, ProfileRecord, FullUserData, DueTo, NicknameCheck, NotificationPage, decode
+)
+from src.services.metrics import GATEWAY_LATENCY, GATEWAY_RESPONSES, GATEWAY_RETRIES
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.deadline import budget, remaining
+from src.utils.single_flight import SingleFlight
 
 from src.logconf import opt_logger as log
 
 logger = log.setup_logger('gateway service')
 
+T = TypeVar('T')
+
+
+@dataclass(frozen=True)
+class MethodPolicy:
+    """ Таймаут запроса и число повторов (повторяются только GET) """
+    timeout: float
+    retries: int = 0
+
+
+GET_POLICY = MethodPolicy(timeout=config.gateway.get_timeout, retries=config.gateway.retries)
+WRITE_POLICY = MethodPolicy(timeout=config.gateway.write_request_timeout)
+
+# Методы, которым нужны особые условия
+METHOD_POLICIES = {
+    # Создание платежа в ЮKassa происходит синхронно
+    'yookassa_link': MethodPolicy(timeout=10.0, retries=0),
+    # Страницы рассылки большие, а ждать их никто не торопится
+    'users_for_notification': MethodPolicy(timeout=30.0, retries=3),
+}
+
 
 class GatewayService:
-    def __init__(self, host: str, port: int):
+    def __init__(self, host: str, port: int, coalesce_methods: Optional[set[str]] = None):
         self.gateway_url = f'http://{host}:{port}'
         self.session: Optional["httpx.AsyncClient"] = None
 
+        # Одинаковые одновременные GET запросы выполняются один раз
+        self.coalesce_methods = frozenset(coalesce_methods or ())
+        self.single_flight = SingleFlight()
+
+        # Когда GateWay лежит, запросы отклоняются сразу, а не висят до таймаута
+        self.breaker = CircuitBreaker(
+            'gateway',
+            failure_threshold=config.gateway.breaker_failures,
+            reset_timeout=config.gateway.breaker_reset,
+        )
+
     async def __aenter__(self):
-        self.connect()
+        # Пул соединений живет все время работы бота (см. main.run),
+        # поэтому контекст лишь гарантирует, что клиент уже открыт
+        if not self.connected:
+            self.connect()
         return self
 
     async def __aexit__(self, *args):
-        await self.close()
+        # Соединения остаются в пуле для следующих запросов
+        pass
+
+    @property
+    def connected(self) -> bool:
+        return self.session is not None and not self.session.is_closed
 
     def connect(self) -> None:
-        """Подключение к серверу"""
-        self.session = httpx.AsyncClient()
+        """Открывает общий для всех обработчиков пул соединений"""
+        if self.connected:
+            return
+
+        gw = config.gateway
+        self.session = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=gw.max_connections,
+                max_keepalive_connections=gw.max_keepalive_connections,
+                keepalive_expiry=gw.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                connect=gw.connect_timeout,
+                read=gw.read_timeout,
+                write=gw.write_timeout,
+                pool=gw.pool_timeout,
+            ),
+        )
+        logger.info(
+            'Gateway pool opened (max_connections=%s, keepalive=%s)',
+            gw.max_connections, gw.max_keepalive_connections
+        )
 
     async def close(self) -> None:
+        """Закрывает пул соединений при остановке бота"""
         if self.session:
             await self.session.aclose()
+            self.session = None
+            logger.info('Gateway pool closed')
 
-    async def _execute_request(self, method_name: str, CRUD: str, *args, **kwargs) -> dict:
+    async def _execute_request(self, method_name: str, CRUD: str, *args, **kwargs):
         """ Исполняет различные CRUD запросы """
         method = getattr(self, f"_{CRUD}_{method_name}", None)
 
         if method is None:
             raise AttributeError(f'{CRUD} метод {method_name} не существует')
 
-        return await method(*args, **kwargs)
+        policy = METHOD_POLICIES.get(method_name) or (GET_POLICY if CRUD == 'get' else WRITE_POLICY)
+        retries = policy.retries if CRUD == 'get' else 0
+
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(method_name, method, policy, *args, **kwargs)
+            except (httpx.TransportError, httpx.HTTPStatusError, TimeoutError) as e:
+                if attempt >= retries or not self._retryable(e):
+                    raise
+
+            # Полный jitter: случайная задержка до base * 2^attempt
+            delay = random.uniform(0, config.gateway.retry_backoff * 2 ** attempt)
+            left = remaining()
+            if left is not None and left <= delay:
+                raise DeadlineExceeded(method_name)
+
+            attempt += 1
+            GATEWAY_RETRIES.labels(method_name).inc()
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+        return True
+
+    async def _attempt(self, method_name: str, method, policy: MethodPolicy, *args, **kwargs):
+        """ Один запрос под таймаутом и circuit breaker """
+        if not self.breaker.allow():
+            GATEWAY_RESPONSES.labels(method_name, 'circuit_open').inc()
+            raise GatewayUnavailable(method_name)
+
+        started = time.perf_counter()
+        try:
+            timeout = budget(policy.timeout)
+            async with asyncio.timeout(timeout):
+                result = await method(*args, **kwargs)
+
+        except TimeoutError as e:
+            GATEWAY_RESPONSES.labels(method_name, 'timeout').inc()
+            if timeout < policy.timeout:
+                # Кончился бюджет обновления, а не терпение к GateWay
+                self.breaker.release()
+                raise DeadlineExceeded(method_name) from e
+            self.breaker.record_failure()
+            raise
+
+        except httpx.HTTPStatusError as e:
+            GATEWAY_RESPONSES.labels(method_name, e.response.status_code).inc()
+            if e.response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+
+        except httpx.TransportError as e:
+            GATEWAY_RESPONSES.labels(method_name, type(e).__name__).inc()
+            self.breaker.record_failure()
+            raise
+
+        except BaseException as e:
+            GATEWAY_RESPONSES.labels(method_name, type(e).__name__).inc()
+            self.breaker.release()
+            raise
+
+        finally:
+            GATEWAY_LATENCY.labels(method_name).observe(time.perf_counter() - started)
 
+        # GET методы уже разобрали ответ: None значит, что записи нет (404)
+        status = getattr(result, 'status_code', 404 if result is None else 200)
+        GATEWAY_RESPONSES.labels(method_name, status).inc()
+        self.breaker.record_success()
+        return result
+
+    @staticmethod
+    def _decode(response: httpx.Response, type_: type[T]) -> Optional[T]:
+        """
+        Разбирает тело ответа прямо из байтов в типизированный объект.
+        404 -> None, остальные ошибки -> HTTPStatusError
+        """
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return decode(response.content, type_)
 
     async def get(self, method_name: str, *args, **kwargs):
-        """ GET запросы к внешнему серверу """
-        return await self._execute_request(method_name, 'get', *args, **kwargs)
+        """ GET запросы к внешнему серверу -> разобранный ответ или None, если записи нет """
+        if method_name not in self.coalesce_methods:
+            return await self._execute_request(method_name, 'get', *args, **kwargs)
+
+        key = (method_name, args, tuple(sorted(kwargs.items())))
+        return await self.single_flight.do(
+            key,
+            lambda: self._execute_request(method_name, 'get', *args, **kwargs),
+            group=method_name,
+        )
+
+    def coalescing_stats(self) -> dict:
+        """ Метрики объединения запросов по методам """
+        return self.single_flight.stats()
 
     async def post(self, method_name: str, *args, **kwargs):
         """POST запросы к внешнему серверу"""
@@ -54,34 +224,73 @@ class GatewayService:
         return await self._execute_request(method_name, 'put', *args, **kwargs)
 
     # GET функции
-    async def _get_check_user_exists(self, user_id: int):
-        """ Проверка существования пользователя """
+    async def _get_check_user_exists(self, user_id: int) -> Optional[UserRecord]:
+        """ Проверка существования пользователя -> запись users или None """
         url = f'{self.gateway_url}/api/users?user_id={user_id}'
         response = await self.session.get(url=url)
-        return response
+        return self._decode(response, UserRecord)
 
-    async def _get_nickname_exists(self, nickname: str) -> httpx.Response:
+    async def _get_nickname_exists(self, nickname: str) -> Optional[NicknameCheck]:
         url = f'{self.gateway_url}/api/nicknames?nickname={nickname}'
         response = await self.session.get(url=url)
-        return response
+        return self._decode(response, NicknameCheck)
 
-    async def _get_user_data(self, user_id: int, target: str) -> httpx.Response:
+    async def _get_user_data(
+            self, user_id: int, target: str
+    ) -> Union[UserRecord, ProfileRecord, None]:
         """ Запращивает данные о пользователе по опреденному критерию """
         url = f'{self.gateway_url}/api/users?user_id={user_id}&target_field={target}'
         response = await self.session.get(url=url)
-        return response
+        return self._decode(response, ProfileRecord if target == 'profiles' else UserRecord)
+
+    async def _get_full_user_data(self, user_id: int) -> Optional[FullUserData]:
+        """ Запрашивает users и profiles за один запрос -> {'users': {...}, 'profiles': {...}} """
+        url = f'{self.gateway_url}/api/users?user_id={user_id}&target_field=all'
+        response = await self.session.get(url=url)
+        return self._decode(response, FullUserData)
 
-    async def _get_due_to(self, user_id: int) -> httpx.Response:
+    async def _get_due_to(self, user_id: int) -> Optional[DueTo]:
         url = f'{self.gateway_url}/api/due_to?user_id={user_id}'
         response = await self.session.get(url=url)
-        return response
+        return self._decode(response, DueTo)
 
-    async def _get_yookassa_link(self, user_id: int):
+    async def _get_yookassa_link(self, user_id: int) -> Optional[str]:
         url = f'{self.gateway_url}/api/yookassa_link?user_id={user_id}'
         response = await self.session.get(url=url)
-        return response
+        return self._decode(response, str)
+
+    async def _get_users_for_notification(
+            self, after: Optional[int], limit: int, notified_days: int
+    ) -> Optional[NotificationPage]:
+        """ Страница пользователей для рассылки -> {'users': [...], 'next': user_id | None} """
+        params = {'limit': limit, 'notified_days': notified_days}
+        if after is not None:
+            params['after'] = after
+
+        url = f'{self.gateway_url}/api/users/notification'
+        response = await self.session.get(url=url, params=params)
+        return self._decode(response, NotificationPage)
 
     # POST функции
+    async def _post_notified_time(self, user_ids: list[int]):
+        """ Отмечает время уведомления сразу для пачки пользователей """
+        url = f'{self.gateway_url}/api/notified_time'
+        response = await self.session.post(url=url, json={'user_ids': user_ids}, timeout=10.0)
+        response.raise_for_status()
+        return response
+
+    async def _post_activate_subscription(self, user_id: int) -> Optional[DueTo]:
+        """ Возобновляет подписку -> новый статус подписки """
+        url = f'{self.gateway_url}/api/activate_subscription'
+        response = await self.session.post(url=url, json={'user_id': user_id}, timeout=10.0)
+        return self._decode(response, DueTo)
+
+    async def _post_deactivate_subscription(self, user_id: int) -> Optional[DueTo]:
+        """ Отменяет подписку -> новый статус подписки """
+        url = f'{self.gateway_url}/api/deactivate_subscription'
+        response = await self.session.post(url=url, json={'user_id': user_id}, timeout=10.0)
+        return self._decode(response, DueTo)
+
     async def _post_add_user(self, user_data: User):
         url = f'{self.gateway_url}/api/users'
         headers = {"Content-Type": "application/json"}
@@ -96,22 +305,30 @@ class GatewayService:
         return response
 
     # PUT функции
-    async def _put_update_profile(self, new_data: Union[User, Profile]):
-
-        if isinstance(new_data, User):
-            target = 'users'
-        else:
-            target = 'profiles'
-
+    async def _put_update_profile(
+            self, new_data: Union[User, Profile], idempotency_key: Optional[str] = None
+    ):
+        """ Перезаписывает users или profiles целиком, повтор запроса безопасен """
         url = f'{self.gateway_url}/api/update_profile'
+        headers = {'content-type': 'application/json'}
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
+
         response = await self.session.put(
             url=url,
-            headers={'content-type': 'application/json'},
-            json=new_data.model_dump(),
+            headers=headers,
+            # model_dump_json сериализует и дату рождения
+            content=new_data.model_dump_json(),
             timeout=10.0
         )
         response.raise_for_status()
         return response
 
 
-gateway_service = GatewayService(config.gateway.host, config.gateway.port)
+gateway_service = GatewayService(
+    config.gateway.host,
+    config.gateway.port,
+    coalesce_methods={
+        name.strip() for name in config.gateway.coalesce_methods.split(',') if name.strip()
+    },
+)
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+from typing import Optional
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+from redis.exceptions import RedisError
+
+from src.services.redis import redis_service
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('media registry')
+
+
+class MediaRegistry:
+    """Реестр статичных медиафайлов, уже загруженных в Telegram.
+
+    Каждый файл загружается один раз, а полученный file_id хранится
+    в Redis по хэшу содержимого. Повторные отправки используют file_id,
+    а если Telegram его отклонит - файл загружается заново.
+    """
+
+    key_prefix = 'media:file_id'
+
+    def __init__(self):
+        # path -> sha256 содержимого (файл читается один раз за процесс)
+        self._hashes: dict[str, str] = {}
+        # sha256 -> file_id, чтобы не ходить в Redis на каждое открытие меню
+        self._file_ids: dict[str, str] = {}
+
+    def _key(self, content_hash: str) -> str:
+        return f'{self.key_prefix}:{content_hash}'
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(64 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    async def _content_hash(self, path: str) -> str:
+        content_hash = self._hashes.get(path)
+        if content_hash is None:
+            # Чтение файла не должно блокировать event loop
+            content_hash = await asyncio.to_thread(self._hash_file, path)
+            self._hashes[path] = content_hash
+        return content_hash
+
+    async def get_file_id(self, path: str) -> Optional[str]:
+        content_hash = await self._content_hash(path)
+        file_id = self._file_ids.get(content_hash)
+        if file_id:
+            return file_id
+
+        try:
+            redis = await redis_service.get_redis_client()
+            raw = await redis.get(self._key(content_hash))
+        except RedisError as e:
+            logger.warning('Failed to read file_id for %s: %s', path, e)
+            return None
+
+        if raw is None:
+            return None
+
+        file_id = raw.decode() if isinstance(raw, bytes) else raw
+        self._file_ids[content_hash] = file_id
+        return file_id
+
+    async def remember(self, path: str, file_id: str) -> None:
+        content_hash = await self._content_hash(path)
+        self._file_ids[content_hash] = file_id
+
+        try:
+            redis = await redis_service.get_redis_client()
+            await redis.set(self._key(content_hash), file_id)
+        except RedisError as e:
+            logger.warning('Failed to store file_id for %s: %s', path, e)
+
+    async def forget(self, path: str) -> None:
+        content_hash = await self._content_hash(path)
+        self._file_ids.pop(content_hash, None)
+
+        try:
+            redis = await redis_service.get_redis_client()
+            await redis.delete(self._key(content_hash))
+        except RedisError as e:
+            logger.warning('Failed to drop file_id for %s: %s', path, e)
+
+    async def answer_photo(self, message: Message, path: str, **kwargs) -> Message:
+        """Отправляет фото в чат сообщения, загружая файл только при необходимости"""
+
+        file_id = await self.get_file_id(path)
+        if file_id:
+            try:
+                return await message.answer_photo(photo=file_id, **kwargs)
+            except TelegramBadRequest as e:
+                # Ошибка не связана с файлом (например, слишком длинная подпись)
+                if 'file' not in e.message.lower():
+                    raise
+                logger.warning('Telegram rejected cached file_id for %s: %s', path, e.message)
+                await self.forget(path)
+
+        sent = await message.answer_photo(photo=FSInputFile(path), **kwargs)
+        if sent.photo:
+            # Самый большой размер - последний в списке
+            await self.remember(path, sent.photo[-1].file_id)
+        return sent
+
+
+media_registry = MediaRegistry()
@@ -0,0 +1,218 @@
+import time
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+from aiohttp import web
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from src.config import config
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('metrics')
+
+# Границы бакетов в секундах: от быстрых ответов из кэша до таймаутов
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+UPDATE_LATENCY = Histogram(
+    'bot_update_duration_seconds', 'Full update processing time',
+    ['event_type'], buckets=LATENCY_BUCKETS,
+)
+HANDLER_LATENCY = Histogram(
+    'bot_handler_duration_seconds', 'Handler time including inner middlewares',
+    ['router', 'handler'], buckets=LATENCY_BUCKETS,
+)
+HANDLER_ERRORS = Counter(
+    'bot_handler_errors_total', 'Exceptions raised from handlers',
+    ['router', 'handler', 'error'],
+)
+UPDATE_ERRORS = Counter(
+    'bot_update_errors_total', 'Exceptions that escaped update processing',
+    ['event_type', 'error'],
+)
+
+GATEWAY_LATENCY = Histogram(
+    'bot_gateway_request_duration_seconds', 'Gateway request time',
+    ['method'], buckets=LATENCY_BUCKETS,
+)
+GATEWAY_RESPONSES = Counter(
+    'bot_gateway_responses_total', 'Gateway responses by status code',
+    ['method', 'status'],
+)
+GATEWAY_RETRIES = Counter(
+    'bot_gateway_retries_total', 'Gateway GET requests retried', ['method'],
+)
+
+PROFILE_OUTBOX = Counter(
+    'bot_profile_outbox_total', 'Profile updates passed through the write-behind outbox',
+    ['event'],
+)
+CACHE_REQUESTS = Counter(
+    'bot_cache_requests_total', 'Cache lookups by level that answered',
+    ['cache', 'result'],
+)
+RATE_LIMITED = Counter(
+    'bot_rate_limited_total', 'Messages stopped by RateLimitMiddleware',
+    ['action'],
+)
+FSM_OPERATIONS = Counter(
+    'bot_fsm_storage_operations_total', 'FSM storage calls (Redis round-trips)',
+    ['operation'],
+)
+
+NICKNAME_VALIDATIONS = Histogram(
+    'bot_nickname_validation_duration_seconds',
+    'validate_name time by outcome and by the step that decided it (local, cache, gateway)',
+    ['outcome', 'source'], buckets=LATENCY_BUCKETS,
+)
+
+LOOP_LAG = Histogram(
+    'bot_event_loop_lag_seconds', 'Delay of a scheduled wakeup in the event loop',
+    buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5),
+)
+LOOP_STALLS = Counter(
+    'bot_event_loop_stalls_total', 'Event loop blocked longer than the threshold',
+)
+
+
+class StatsCollector(Collector):
+    """
+    Снимает счетчики, которые сервисы и так ведут у себя (объединение
+    запросов к Gateway, очередь исходящих сообщений), в момент запроса /metrics
+    """
+
+    def __init__(self, gateway=None, send_scheduler=None):
+        self.gateway = gateway
+        self.send_scheduler = send_scheduler
+
+    def collect(self) -> Iterable:
+        if self.gateway is not None:
+            calls = CounterMetricFamily(
+                'bot_gateway_coalescing_calls', 'Coalescible gateway GET calls', labels=['method']
+            )
+            coalesced = CounterMetricFamily(
+                'bot_gateway_coalesced', 'Calls served by an in-flight request', labels=['method']
+            )
+            for method, stats in self.gateway.coalescing_stats().items():
+                calls.add_metric([method], stats['calls'])
+                coalesced.add_metric([method], stats['coalesced'])
+            yield calls
+            yield coalesced
+            yield GaugeMetricFamily(
+                'bot_gateway_circuit_open', 'Gateway circuit breaker is open (1) or not (0)',
+                value=int(self.gateway.breaker.state != self.gateway.breaker.CLOSED),
+            )
+
+        if self.send_scheduler is not None:
+            stats = self.send_scheduler.stats()
+            yield GaugeMetricFamily(
+                'bot_send_queue_depth', 'Outbound requests waiting for a send slot',
+                value=stats['depth'],
+            )
+            yield CounterMetricFamily(
+                'bot_send_requests', 'Outbound requests released by the scheduler',
+                value=stats['sent'],
+            )
+            yield CounterMetricFamily(
+                'bot_send_retries', 'Outbound requests retried after 429',
+                value=stats['retries'],
+            )
+            yield GaugeMetricFamily(
+                'bot_send_wait_avg_seconds', 'Average wait for a send slot',
+                value=stats['wait_avg'],
+            )
+            yield GaugeMetricFamily(
+                'bot_send_wait_max_seconds', 'Longest wait for a send slot',
+                value=stats['wait_max'],
+            )
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Время обработки и ошибки.
+
+    Внешний middleware на disp.update измеряет обновление целиком,
+    внутренний на наблюдателях событий - конкретный обработчик
+    (aiogram передает его в data['handler'] вместе с data['event_router'])
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_object = data.get('handler')
+        if handler_object is None:
+            return await self._measure_update(handler, event, data)
+
+        router = getattr(data.get('event_router'), 'name', 'unknown')
+        name = getattr(handler_object.callback, '__qualname__', repr(handler_object.callback))
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            HANDLER_ERRORS.labels(router, name, type(e).__name__).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(router, name).observe(time.perf_counter() - started)
+
+    @staticmethod
+    async def _measure_update(handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        event_type = event.event_type if isinstance(event, Update) else type(event).__name__
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            UPDATE_ERRORS.labels(event_type, type(e).__name__).inc()
+            raise
+        finally:
+            UPDATE_LATENCY.labels(event_type).observe(time.perf_counter() - started)
+
+
+metrics_middleware = MetricsMiddleware()
+
+
+def setup_metrics(disp: Dispatcher, gateway=None, send_scheduler=None) -> None:
+    """Подключает middleware ко всем типам событий и сборщик статистики сервисов"""
+
+    disp.update.outer_middleware(metrics_middleware)
+    for name, observer in disp.observers.items():
+        if name not in ('update', 'error'):
+            observer.middleware(metrics_middleware)
+
+    try:
+        REGISTRY.register(StatsCollector(gateway, send_scheduler))
+    except ValueError:
+        # Уже зарегистрирован (повторная сборка диспетчера)
+        pass
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        body=generate_latest(REGISTRY),
+        headers={'Content-Type': CONTENT_TYPE_LATEST},
+    )
+
+
+async def start_metrics_server(
+    host: str = config.metrics.host, port: int = config.metrics.port
+) -> Optional[web.AppRunner]:
+    """Отдельный от webhook сервер /metrics (во всех режимах)"""
+    if not config.metrics.enabled:
+        return None
+
+    app = web.Application()
+    app.router.add_get('/metrics', metrics_handler)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    logger.info('Metrics available on %s:%s/metrics', host, port)
+    return runner
@@ -0,0 +1,99 @@
+import asyncio
+import contextvars
+import uuid
+from typing import Optional
+
+from redis.exceptions import RedisError
+
+from src.config import config
+from src.services.metrics import CACHE_REQUESTS
+from src.services.redis import redis_service
+from src.utils.lru_cache import LRUCache
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('nickname cache')
+
+
+class NicknameCache:
+    """
+    Локальный негативный кэш занятых никнеймов.
+
+    Запоминает только ответы GateWay "никнейм занят": занятый никнейм
+    освобождается редко, и то через этот же бот (см. forget), поэтому
+    повторная попытка взять его отклоняется без сетевого запроса.
+    Свободный никнейм всегда перепроверяется в GateWay - его могли
+    занять с другого воркера.
+
+    Освобожденный никнейм публикуется в канал nickname:release, и остальные
+    экземпляры бота забывают его так же, как ProfileCache сбрасывает профиль.
+    """
+
+    channel = 'nickname:release'
+    # Пауза перед повторной подпиской после обрыва соединения
+    reconnect_delay = 1.0
+
+    def __init__(
+        self,
+        maxsize: int = config.cache.nickname_maxsize,
+        ttl: float = config.cache.nickname_taken_ttl,
+    ):
+        self._taken = LRUCache[str, bool](maxsize=maxsize, ttl=ttl)
+        # Свои сообщения подписчик пропускает
+        self._origin = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+
+    def is_taken(self, nickname: str) -> bool:
+        taken = self._taken.get(nickname, False)
+        CACHE_REQUESTS.labels('nickname', 'local' if taken else 'miss').inc()
+        return taken
+
+    def mark_taken(self, nickname: str) -> None:
+        self._taken.set(nickname, True)
+
+    async def forget(self, nickname: str) -> None:
+        """Никнейм освободился (пользователь сменил его на другой)"""
+        self._taken.pop(nickname)
+
+        try:
+            redis = await redis_service.get_redis_client()
+            await redis.publish(self.channel, f'{self._origin}:{nickname}')
+        except RedisError as e:
+            logger.warning('Failed to publish released nickname %s: %s', nickname, e)
+
+    def _on_message(self, data: bytes) -> None:
+        # Никнейм не содержит ':' (см. NICKNAME_PATTERN), origin - uuid
+        origin, _, nickname = data.decode().partition(':')
+        if origin != self._origin:
+            CACHE_REQUESTS.labels('nickname', 'invalidated').inc()
+            self._taken.pop(nickname)
+
+    async def listen(self) -> None:
+        """Забывает никнеймы, освобожденные через другие экземпляры"""
+        while True:
+            try:
+                redis = await redis_service.get_redis_client()
+                async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # Пока подписки не было, сообщения могли потеряться
+                    self._taken.clear()
+                    async for message in pubsub.listen():
+                        self._on_message(message['data'])
+            except (RedisError, OSError) as e:
+                logger.warning('Nickname release channel is down: %s', e)
+                self._taken.clear()
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def start(self) -> None:
+        """Запускает подписку в фоне (startup хук)"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self.listen(), context=contextvars.Context())
+
+    async def stop(self) -> None:
+        """shutdown хук"""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+
+nickname_cache = NicknameCache()
@@ -0,0 +1,186 @@
+import asyncio
+import contextvars
+import uuid
+from typing import Any, Optional
+
+import msgspec
+from redis.exceptions import RedisError
+
+from src.config import config
+from src.services.metrics import CACHE_REQUESTS
+from src.services.redis import redis_service
+from src.utils.lru_cache import LRUCache
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('profile cache')
+
+# Без этих полей запись считается неполной и перезапрашивается у GateWay
+REQUIRED_FIELDS = ('user_id', 'first_name', 'is_active', 'lang_code')
+
+
+class ProfileCache:
+    """
+    Кэш данных пользователя (users + profiles) в Redis hash profile:{user_id}.
+
+    Каждое поле хранится отдельно в JSON, поэтому изменение одного поля
+    переписывает только его, а короткоживущие данные диалога остаются
+    в FSM и не тянут за собой весь профиль. state.clear() профиль не трогает.
+
+    Перед Redis стоит in-process LRU с коротким TTL: просмотр меню
+    обходится без сетевых запросов. Каждая запись публикует user_id
+    в канал profile:invalidate, и остальные экземпляры бота (воркеры,
+    реплики) сбрасывают свою локальную копию - см. listen().
+    """
+
+    key_prefix = 'profile'
+    channel = 'profile:invalidate'
+    # Пауза перед повторной подпиской после обрыва соединения
+    reconnect_delay = 1.0
+
+    def __init__(
+        self,
+        maxsize: int = config.cache.profile_maxsize,
+        local_ttl: float = config.cache.profile_local_ttl,
+        ttl: int = config.cache.profile_ttl,
+    ):
+        self.ttl = ttl
+        self._local = LRUCache[int, dict[str, Any]](maxsize=maxsize, ttl=local_ttl)
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        # Свои сообщения об инвалидации подписчик пропускает
+        self._origin = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+
+    def _key(self, user_id: int) -> str:
+        return f'{self.key_prefix}:{user_id}'
+
+    def _encode(self, fields: dict[str, Any]) -> dict[str, bytes]:
+        return {name: self._encoder.encode(value) for name, value in fields.items()}
+
+    def _message(self, user_id: int) -> str:
+        return f'{self._origin}:{user_id}'
+
+    async def get(self, user_id: int) -> Optional[dict[str, Any]]:
+        """Профиль целиком или None, если его нет или он неполный"""
+        profile = self._local.get(user_id)
+        if profile is not None:
+            CACHE_REQUESTS.labels('profile', 'local').inc()
+            # Копия: вызывающий код может менять словарь
+            return dict(profile)
+
+        try:
+            redis = await redis_service.get_redis_client()
+            raw = await redis.hgetall(self._key(user_id))
+        except RedisError as e:
+            logger.warning('Failed to read profile of user %s: %s', user_id, e)
+            CACHE_REQUESTS.labels('profile', 'error').inc()
+            return None
+
+        profile = {name.decode(): self._decoder.decode(value) for name, value in raw.items()}
+        if not all(name in profile for name in REQUIRED_FIELDS):
+            CACHE_REQUESTS.labels('profile', 'miss').inc()
+            return None
+
+        CACHE_REQUESTS.labels('profile', 'redis').inc()
+        self._local.set(user_id, profile)
+        return dict(profile)
+
+    async def hydrate(self, user_id: int, record: dict[str, Any]) -> dict[str, Any]:
+        """
+        Дополняет профиль записью из GateWay и возвращает результат.
+
+        Поля, уже записанные через update(), не перезаписываются: пока
+        их изменение ждет в ProfileOutbox, GateWay отдает прежнее значение
+        """
+        key = self._key(user_id)
+        try:
+            redis = await redis_service.get_redis_client()
+            async with redis.pipeline(transaction=True) as pipe:
+                for name, value in self._encode(record).items():
+                    pipe.hsetnx(key, name, value)
+                pipe.expire(key, self.ttl)
+                pipe.hgetall(key)
+                pipe.publish(self.channel, self._message(user_id))
+                *_, raw, _ = await pipe.execute()
+        except RedisError as e:
+            logger.warning('Failed to store profile of user %s: %s', user_id, e)
+            return dict(record)
+
+        profile = {name.decode(): self._decoder.decode(value) for name, value in raw.items()}
+        self._local.set(user_id, profile)
+        return dict(profile)
+
+    async def update(self, user_id: int, **fields: Any) -> None:
+        """
+        Записывает только изменившиеся поля. Если профиля в кэше нет,
+        получится неполная запись: get() ее не отдаст, а hydrate() дополнит
+        """
+        if not fields:
+            return
+
+        profile = self._local.get(user_id)
+        if profile is not None:
+            self._local.set(user_id, {**profile, **fields})
+
+        key = self._key(user_id)
+        try:
+            redis = await redis_service.get_redis_client()
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping=self._encode(fields))
+                pipe.expire(key, self.ttl)
+                pipe.publish(self.channel, self._message(user_id))
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning('Failed to update profile of user %s: %s', user_id, e)
+            # Лучше перечитать профиль из GateWay, чем отдавать устаревший
+            await self.invalidate(user_id)
+
+    async def invalidate(self, user_id: int) -> None:
+        self._local.pop(user_id)
+
+        try:
+            redis = await redis_service.get_redis_client()
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.delete(self._key(user_id))
+                pipe.publish(self.channel, self._message(user_id))
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning('Failed to invalidate profile of user %s: %s', user_id, e)
+
+    def _on_message(self, data: bytes) -> None:
+        origin, _, user_id = data.decode().rpartition(':')
+        if origin != self._origin:
+            CACHE_REQUESTS.labels('profile', 'invalidated').inc()
+            self._local.pop(int(user_id))
+
+    async def listen(self) -> None:
+        """Сбрасывает локальные копии профилей, измененных другими экземплярами"""
+        while True:
+            try:
+                redis = await redis_service.get_redis_client()
+                async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # Пока подписки не было, сообщения могли потеряться
+                    self._local.clear()
+                    async for message in pubsub.listen():
+                        self._on_message(message['data'])
+            except (RedisError, OSError) as e:
+                logger.warning('Profile invalidation channel is down: %s', e)
+                # Без подписки локальная копия может отстать от Redis
+                self._local.clear()
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def start(self) -> None:
+        """Запускает подписку на инвалидацию в фоне (startup хук)"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self.listen(), context=contextvars.Context())
+
+    async def stop(self) -> None:
+        """shutdown хук"""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+
+profile_cache = ProfileCache()
@@ -0,0 +1,372 @@
+import asyncio
+import contextvars
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional, Union
+
+import httpx
+import msgspec
+from redis.exceptions import RedisError, ResponseError
+
+from src.config import config
+from src.exc import GatewayUnavailable, StorageDataException, ProfileUpdateError
+from src.models import User, Profile
+from src.services.gateway import gateway_service
+from src.services.metrics import PROFILE_OUTBOX
+from src.services.profile_cache import profile_cache
+from src.services.redis import redis_service
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('profile outbox')
+
+TARGETS = {'users': User, 'profiles': Profile}
+
+
+@dataclass
+class PendingWrite:
+    """Слитые изменения одной таблицы пользователя, ожидающие PUT"""
+
+    user_id: int
+    target: str
+    fields: dict[str, Any]
+    entry_ids: list[str] = field(default_factory=list)
+    attempt: int = 0
+    next_at: float = 0.0
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return isinstance(error, (httpx.TransportError, TimeoutError, GatewayUnavailable))
+
+
+class ProfileOutbox:
+    """
+    Отложенная запись изменений профиля в GateWay (write-behind).
+
+    Обработчик обновляет ProfileCache и добавляет изменение в Redis stream
+    profile:outbox - на этом его работа закончена. Фоновый разборщик читает
+    stream через consumer group, сливает изменения одного пользователя
+    в один PUT и подтверждает записи только после ответа GateWay.
+    Неудачные PUT повторяются с экспоненциальной задержкой, а после
+    max_attempts или при ошибке данных уходят в profile:outbox:dead.
+
+    PUT отправляет запись целиком, поэтому повтор безопасен; дополнительно
+    передается Idempotency-Key - id последней вошедшей в него записи stream.
+    Тело PUT собирается уже в enqueue: изменение, которое GateWay не примет
+    из-за неполной записи, отклоняется сразу, и обработчик может об этом сказать.
+    Разборщик один на все экземпляры бота (блокировка в Redis, как у
+    рассылки): так изменения одного пользователя не обгоняют друг друга.
+    Блокировку продлевает отдельная задача, поэтому долгий PUT ее не теряет,
+    а потерявший блокировку разборщик сразу останавливается.
+    """
+
+    stream_key = 'profile:outbox'
+    dead_key = 'profile:outbox:dead'
+    lock_key = 'profile:outbox:lock'
+    group = 'profile-writers'
+    lock_ttl = 30
+
+    # KEYS[1] - блокировка, ARGV[1] - значение владельца, ARGV[2] - ttl в мс
+    renew_script = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+    release_script = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(
+        self,
+        batch_size: int = config.outbox.batch_size,
+        block: float = config.outbox.block,
+        max_attempts: int = config.outbox.max_attempts,
+        retry_backoff: float = config.outbox.retry_backoff,
+        retry_max_delay: float = config.outbox.retry_max_delay,
+        maxlen: int = config.outbox.maxlen,
+    ):
+        self.batch_size = batch_size
+        self.block = block
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.retry_max_delay = retry_max_delay
+        self.maxlen = maxlen
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder(dict)
+        # Значение блокировки и имя потребителя в группе
+        self._token = uuid.uuid4().hex
+        self._pending: dict[tuple[int, str], PendingWrite] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._renew = None
+        self._unlock = None
+
+    async def enqueue(self, user_id: int, target: str, **fields: Any) -> None:
+        """
+        Ставит изменение users или profiles в очередь на запись в GateWay.
+        ProfileUpdateError - из текущей записи и изменения не собрать тело PUT
+        """
+        write = self._pending_write(user_id, target, fields)
+        new_data = await self._prepare(write)
+
+        entry = {'user_id': user_id, 'target': target, 'fields': self._encoder.encode(fields)}
+        try:
+            redis = await redis_service.get_redis_client()
+            await redis.xadd(self.stream_key, entry, maxlen=self.maxlen, approximate=True)
+        except RedisError as e:
+            # Без очереди изменение не должно потеряться - пишем сразу
+            logger.warning('Failed to enqueue %s update of user %s, writing directly: %s', target, user_id, e)
+            PROFILE_OUTBOX.labels('direct').inc()
+            return await self._put(write, new_data)
+
+        PROFILE_OUTBOX.labels('enqueued').inc()
+
+    async def write(self, user_id: int, target: str, **fields: Any) -> None:
+        """
+        Записывает изменение в GateWay сразу, до ответа пользователю.
+        Для полей, которые GateWay может отклонить (уникальный никнейм):
+        ошибка PUT доходит до обработчика, а не до profile:outbox:dead
+        """
+        write = self._pending_write(user_id, target, fields)
+        await self._put(write, await self._prepare(write))
+        PROFILE_OUTBOX.labels('sync').inc()
+
+        # Изменение, уже ждущее в очереди, могло собрать тело PUT со старым
+        # значением до этой записи - повтор в stream идет после него
+        await self.enqueue(user_id, target, **fields)
+
+    @staticmethod
+    def _pending_write(user_id: int, target: str, fields: dict[str, Any]) -> PendingWrite:
+        if target not in TARGETS:
+            raise ValueError(f'Unknown profile target {target!r}, expected one of {tuple(TARGETS)}')
+        return PendingWrite(user_id, target, fields)
+
+    # Запись в GateWay
+    async def _base(self, user_id: int, target: str) -> dict[str, Any]:
+        """Текущая запись пользователя: из кэша профилей или из GateWay"""
+        profile = await profile_cache.get(user_id)
+        if profile is not None:
+            return profile
+
+        async with gateway_service:
+            record = await gateway_service.get('user_data', user_id, target=target)
+        if record is None:
+            raise StorageDataException
+        return msgspec.structs.asdict(record)
+
+    @staticmethod
+    def _build(user_id: int, target: str, record: dict[str, Any]) -> Union[User, Profile]:
+        model = TARGETS[target]
+        values = {name: record[name] for name in model.model_fields if name in record}
+        values['user_id'] = user_id
+
+        # В кэше темы хранятся строкой, а дата рождения - в ISO формате
+        if isinstance(values.get('topics'), str):
+            values['topics'] = values['topics'].split(', ') if values['topics'] else []
+        if isinstance(values.get('birthday'), str):
+            values['birthday'] = datetime.fromisoformat(values['birthday']).date()
+        return model(**values)
+
+    async def _prepare(self, write: PendingWrite) -> Union[User, Profile]:
+        """Тело PUT: текущая запись пользователя с изменениями"""
+        base = await self._base(write.user_id, write.target)
+        try:
+            return self._build(write.user_id, write.target, {**base, **write.fields})
+        except ValueError as e:
+            # ValidationError pydantic: в записи нет обязательных полей (email, camefrom...)
+            raise ProfileUpdateError(f'{write.target} of user {write.user_id}: {e}') from e
+
+    async def _write(self, write: PendingWrite) -> None:
+        await self._put(write, await self._prepare(write))
+
+    @staticmethod
+    async def _put(write: PendingWrite, new_data: Union[User, Profile]) -> None:
+        async with gateway_service:
+            await gateway_service.put(
+                'update_profile', new_data,
+                idempotency_key=write.entry_ids[-1] if write.entry_ids else None,
+            )
+
+    # Разбор очереди
+    async def _ensure_group(self, redis) -> None:
+        try:
+            await redis.xgroup_create(self.stream_key, self.group, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    async def _acquire(self, redis) -> bool:
+        # После сбоя Redis блокировка может остаться нашей - не ждем ее истечения
+        if await redis.set(self.lock_key, self._token, nx=True, ex=self.lock_ttl):
+            return True
+        return await self._owned(redis)
+
+    async def _owned(self, redis) -> bool:
+        """Продлевает блокировку, если она все еще наша (проверка и продление атомарны)"""
+        if self._renew is None:
+            self._renew = redis.register_script(self.renew_script)
+        return bool(await self._renew(keys=[self.lock_key], args=[self._token, self.lock_ttl * 1000]))
+
+    async def _release(self, redis) -> None:
+        if self._unlock is None:
+            self._unlock = redis.register_script(self.release_script)
+        await self._unlock(keys=[self.lock_key], args=[self._token])
+
+    async def _heartbeat(self, redis) -> None:
+        """Продлевает блокировку и возвращается, как только она стала чужой"""
+        while await self._owned(redis):
+            await asyncio.sleep(self.lock_ttl / 3)
+
+    async def _collect(self, redis, entries: list) -> None:
+        """Сливает новые записи stream с уже ожидающими, сохраняя порядок"""
+        for entry_id, data in entries:
+            entry_id = entry_id.decode()
+            try:
+                user_id = int(data[b'user_id'])
+                target = data[b'target'].decode()
+                fields = self._decoder.decode(data[b'fields'])
+            except (KeyError, TypeError, ValueError, msgspec.DecodeError):
+                # Повтор не поможет: запись просто подтверждается
+                logger.error('Malformed profile outbox entry %s: %s', entry_id, data)
+                PROFILE_OUTBOX.labels('malformed').inc()
+                await redis.xack(self.stream_key, self.group, entry_id)
+                continue
+
+            write = self._pending.get((user_id, target))
+            if write is None:
+                self._pending[(user_id, target)] = PendingWrite(user_id, target, fields, [entry_id])
+            else:
+                PROFILE_OUTBOX.labels('coalesced').inc()
+                write.fields.update(fields)
+                write.entry_ids.append(entry_id)
+
+    async def _claim(self, redis) -> None:
+        """Забирает неподтвержденные записи: свои после перезапуска и чужие после смены владельца"""
+        start = '0-0'
+        while True:
+            start, entries, *_ = await redis.xautoclaim(
+                self.stream_key, self.group, self._token,
+                min_idle_time=0, start_id=start, count=self.batch_size,
+            )
+            await self._collect(redis, entries)
+            if start in (b'0-0', '0-0'):
+                return
+
+    async def _done(self, redis, write: PendingWrite, error: Optional[Exception] = None) -> None:
+        async with redis.pipeline(transaction=True) as pipe:
+            if error is not None:
+                pipe.xadd(self.dead_key, {
+                    'user_id': write.user_id,
+                    'target': write.target,
+                    'fields': self._encoder.encode(write.fields),
+                    'entry_ids': ','.join(write.entry_ids),
+                    'error': repr(error),
+                }, maxlen=self.maxlen, approximate=True)
+            pipe.xack(self.stream_key, self.group, *write.entry_ids)
+            pipe.xdel(self.stream_key, *write.entry_ids)
+            await pipe.execute()
+        self._pending.pop((write.user_id, write.target), None)
+
+    async def _process(self, redis, write: PendingWrite) -> None:
+        try:
+            await self._write(write)
+        except Exception as e:
+            write.attempt += 1
+            if _retryable(e) and write.attempt < self.max_attempts:
+                # Полный jitter, как у повторов GET в GatewayService
+                delay = random.uniform(0, min(self.retry_max_delay, self.retry_backoff * 2 ** write.attempt))
+                write.next_at = time.monotonic() + delay
+                PROFILE_OUTBOX.labels('retried').inc()
+                logger.warning(
+                    'Failed to write %s of user %s (attempt %s), retry in %.1fs: %s',
+                    write.target, write.user_id, write.attempt, delay, e
+                )
+                return
+
+            logger.error('Dropping %s update of user %s to %s: %s', write.target, write.user_id, self.dead_key, e)
+            PROFILE_OUTBOX.labels('dead').inc()
+            await self._done(redis, write, e)
+            # В кэше осталось значение, которого нет в GateWay
+            return await profile_cache.invalidate(write.user_id)
+
+        PROFILE_OUTBOX.labels('written').inc()
+        await self._done(redis, write)
+
+    async def _drain(self, redis) -> None:
+        await self._ensure_group(redis)
+        self._pending.clear()
+        await self._claim(redis)
+
+        while True:
+            now = time.monotonic()
+            due = [write for write in self._pending.values() if write.next_at <= now]
+            await asyncio.gather(*(self._process(redis, write) for write in due))
+
+            # Ждем новые записи не дольше, чем до ближайшего повтора
+            wait = min((write.next_at for write in self._pending.values()), default=now + self.block)
+            block = int(max(0.0, min(self.block, wait - time.monotonic())) * 1000)
+            response = await redis.xreadgroup(
+                self.group, self._token, {self.stream_key: '>'},
+                count=self.batch_size, block=block or None,
+            )
+            for _, entries in response or ():
+                await self._collect(redis, entries)
+
+    async def _hold(self, redis) -> None:
+        """Разбирает очередь, пока heartbeat подтверждает блокировку"""
+        drain = asyncio.create_task(self._drain(redis))
+        heartbeat = asyncio.create_task(self._heartbeat(redis))
+        try:
+            done, _ = await asyncio.wait((drain, heartbeat), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # Прерванные PUT не подтверждены - их заберет следующий владелец
+            drain.cancel()
+            heartbeat.cancel()
+            await asyncio.gather(drain, heartbeat, return_exceptions=True)
+
+        for task in done:
+            task.result()
+
+    async def run(self) -> None:
+        """Разбирает очередь, пока этот экземпляр держит блокировку"""
+        while True:
+            try:
+                redis = await redis_service.get_redis_client()
+                if await self._acquire(redis):
+                    logger.info('Profile outbox drainer started')
+                    await self._hold(redis)
+                    logger.warning('Profile outbox lock lost')
+            except RedisError as e:
+                logger.warning('Profile outbox drainer failed: %s', e)
+            await asyncio.sleep(self.lock_ttl / 3)
+
+    async def start(self) -> None:
+        """Запускает разборщик в фоне (startup хук)"""
+        if self._task is None or self._task.done():
+            # Чистый контекст: разборщику не нужен дедлайн обновления
+            self._task = asyncio.create_task(self.run(), context=contextvars.Context())
+
+    async def stop(self) -> None:
+        """shutdown хук: неподтвержденные записи заберет следующий владелец"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            redis = await redis_service.get_redis_client()
+            await self._release(redis)
+        except RedisError as e:
+            logger.warning('Failed to release profile outbox lock: %s', e)
+
+
+profile_outbox = ProfileOutbox()
@@ -0,0 +1,117 @@
+import math
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Optional
+
+from redis.exceptions import RedisError
+
+from src.config import config
+from src.services.redis import redis_service
+from src.utils.token_bucket import TokenBuckets
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('rate limiter')
+
+
+class RateLimiter(ABC):
+    """Счетчик сообщений пользователя в скользящем окне"""
+
+    def __init__(self, limit: int, time_interval: timedelta):
+        self.limit = limit
+        self.time_interval = time_interval
+
+    @abstractmethod
+    async def hit(self, user_id: int) -> tuple[int, Optional[datetime]]:
+        """
+        Учитывает новое сообщение, пока лимит не превышен.
+        Возвращает количество сообщений в окне (вместе с текущим)
+        и время самого раннего из них
+        """
+
+
+class MemoryRateLimiter(RateLimiter):
+    """
+    Token bucket в памяти процесса (однопроцессный режим).
+    Ведро на limit сообщений пополняется равномерно за time_interval,
+    на пользователя хранится только остаток токенов и время пересчета.
+    """
+
+    def __init__(self, limit: int, time_interval: timedelta, maxsize: int = 100_000):
+        super().__init__(limit, time_interval)
+        self.buckets = TokenBuckets(
+            capacity=limit,
+            rate=limit / time_interval.total_seconds(),
+            maxsize=maxsize,
+        )
+
+    async def hit(self, user_id: int) -> tuple[int, Optional[datetime]]:
+        tokens = self.buckets.consume(user_id)
+        if tokens < 0:
+            return self.limit + 1, None
+
+        # Израсходованные токены - приблизительное число сообщений в окне,
+        # а время первого из них - момент, когда ведро было полным
+        count = max(1, math.ceil(self.limit - tokens))
+        first = datetime.now() - timedelta(seconds=(count - 1) / self.buckets.rate)
+        return count, first
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Скользящее окно в Redis, общее для всех процессов и инстансов.
+    Проверка и учет сообщения выполняются одним Lua скриптом за один запрос.
+    """
+
+    key_prefix = 'rate_limit'
+
+    # KEYS[1] - ключ пользователя
+    # ARGV[1] - окно в мс, ARGV[2] - лимит, ARGV[3] - уникальный id сообщения
+    script = """
+    local t = redis.call('TIME')
+    local now = t[1] * 1000 + math.floor(t[2] / 1000)
+    local window = tonumber(ARGV[1])
+
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+    local count = redis.call('ZCARD', KEYS[1])
+    if count <= tonumber(ARGV[2]) then
+        redis.call('ZADD', KEYS[1], now, ARGV[3])
+        count = count + 1
+    end
+    redis.call('PEXPIRE', KEYS[1], window)
+
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return {count, oldest[2]}
+    """
+
+    def __init__(self, limit: int, time_interval: timedelta):
+        super().__init__(limit, time_interval)
+        self.window_ms = int(time_interval.total_seconds() * 1000)
+        self._script = None
+
+    async def hit(self, user_id: int) -> tuple[int, Optional[datetime]]:
+        try:
+            if self._script is None:
+                redis = await redis_service.get_redis_client()
+                self._script = redis.register_script(self.script)
+
+            count, oldest = await self._script(
+                keys=[f'{self.key_prefix}:{user_id}'],
+                args=[self.window_ms, self.limit, uuid.uuid4().hex],
+            )
+        except RedisError as e:
+            # Недоступность Redis не должна блокировать пользователей
+            logger.warning('Rate limit check failed for user %s: %s', user_id, e)
+            return 1, datetime.now()
+
+        return int(count), datetime.fromtimestamp(int(oldest) / 1000) if oldest else None
+
+
+def create_rate_limiter(
+    backend: str = config.rate_limit.backend,
+    limit: int = config.rate_limit.limit,
+    time_interval: timedelta = timedelta(seconds=config.rate_limit.interval),
+) -> RateLimiter:
+    if backend == 'redis':
+        return RedisRateLimiter(limit, time_interval)
+    return MemoryRateLimiter(limit, time_interval)
@@ -0,0 +1,226 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Hashable, Iterator, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware, NextRequestMiddlewareType
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from src.config import config
+from src.utils.token_bucket import TokenBuckets
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('send scheduler')
+
+# Чем меньше число, тем раньше уходит запрос
+INTERACTIVE = 0
+BULK = 10
+
+_priority: ContextVar[int] = ContextVar('send_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def send_priority(priority: int) -> Iterator[None]:
+    """Задает приоритет всех отправок внутри блока (и созданных в нем задач)"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class SendScheduler(BaseRequestMiddleware):
+    """
+    Планировщик исходящих запросов к Telegram (request middleware сессии бота).
+
+    Отправка и редактирование сообщений проходят через общую очередь
+    с приоритетами: общий бюджет запросов в секунду и лимит на чат
+    считаются token bucket'ами. Ответы пользователям (INTERACTIVE)
+    обгоняют рассылки (BULK). После 429 на retry_after секунд
+    приостанавливается ведро, лимит которого превышен: чата для групп
+    (20 сообщений в минуту на чат), иначе общее - и запрос снова встает
+    в очередь.
+    """
+
+    # Методы Bot API, на которые действуют flood-лимиты
+    throttled_prefixes = ('send', 'copy', 'forward', 'edit')
+    _global_key = 'global'
+
+    def __init__(
+        self,
+        rate: float = config.send.rate,
+        chat_rate: float = config.send.chat_rate,
+        chat_burst: int = config.send.chat_burst,
+        max_retries: int = config.send.max_retries,
+    ):
+        self.max_retries = max_retries
+        self._global = TokenBuckets(capacity=max(1.0, rate), rate=rate, maxsize=1)
+        self._chats = TokenBuckets(capacity=chat_burst, rate=chat_rate)
+
+        # (приоритет, порядковый номер, chat_id, future, время постановки)
+        self._queue: list[tuple[int, int, Optional[Hashable], asyncio.Future, float]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Метрики
+        self.sent = 0
+        self.retries = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def depth(self) -> int:
+        """Сколько запросов ждут своей очереди"""
+        return len(self._queue)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            'depth': self.depth,
+            'sent': self.sent,
+            'retries': self.retries,
+            'wait_avg': self.wait_total / self.sent if self.sent else 0.0,
+            'wait_max': self.wait_max,
+        }
+
+    def _is_throttled(self, method: TelegramMethod) -> bool:
+        return method.__api_method__.startswith(self.throttled_prefixes)
+
+    @staticmethod
+    def _is_group(chat_id: Optional[Hashable]) -> bool:
+        # У групп и каналов id отрицательный, каналы можно указать по @username
+        return isinstance(chat_id, str) or (isinstance(chat_id, int) and chat_id < 0)
+
+    def _pause(self, chat_id: Optional[Hashable], retry_after: float) -> None:
+        """Останавливает отправку, пока Telegram не разрешит ее снова"""
+        if self._is_group(chat_id):
+            self._chats.pause(chat_id, retry_after)
+        else:
+            # Личные чаты и так ограничены chat_rate: 429 значит, что исчерпан
+            # общий бюджет бота, и до retry_after не уходит ни один запрос
+            self._global.pause(self._global_key, retry_after)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+
+        if not self._is_throttled(method):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, 'chat_id', None)
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(chat_id)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                logger.warning(
+                    '%s to chat %s hit flood limit, retry in %ss',
+                    method.__api_method__, chat_id, e.retry_after
+                )
+                self._pause(chat_id, e.retry_after)
+
+    async def acquire(self, chat_id: Optional[Hashable] = None) -> None:
+        """Ждет, пока планировщик разрешит отправку в чат"""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._queue, (_priority.get(), next(self._seq), chat_id, future, time.monotonic())
+        )
+
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+        await future
+
+    async def stop(self) -> None:
+        """shutdown хук: останавливает очередь, ожидающие отправки отменяются"""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+        for entry in self._queue:
+            entry[3].cancel()
+        self._queue.clear()
+
+    def _next_ready(self) -> tuple[Optional[tuple], float]:
+        """
+        Достает самый приоритетный запрос, чат которого не исчерпал лимит.
+        Если таких нет - возвращает время до появления токена в ближайшем чате
+        """
+        deferred, blocked = [], {}
+        ready = None
+
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            chat_id, future = entry[2], entry[3]
+            if future.done():
+                # Ожидающий был отменен
+                continue
+            if chat_id is None:
+                ready = entry
+                break
+            if chat_id not in blocked:
+                if self._chats.consume(chat_id) >= 0:
+                    ready = entry
+                    break
+                blocked[chat_id] = self._chats.wait_time(chat_id)
+            deferred.append(entry)
+
+        for entry in deferred:
+            heapq.heappush(self._queue, entry)
+
+        return ready, min(blocked.values(), default=0.0)
+
+    async def _run(self) -> None:
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._global.wait_time(self._global_key)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            entry, delay = self._next_ready()
+            if entry is None:
+                if not self._queue:
+                    continue
+                # Все чаты в очереди упираются в свой лимит - ждем токен
+                # или новый запрос, который может оказаться в другой чат
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except TimeoutError:
+                    pass
+                continue
+
+            self._global.consume(self._global_key)
+            waited = time.monotonic() - entry[4]
+            self.sent += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            entry[3].set_result(None)
+
+
+# В режиме нескольких воркеров общий бюджет делится между процессами
+send_scheduler = SendScheduler(rate=config.send.rate / max(1, config.bot.workers))
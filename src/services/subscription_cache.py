@@ -0,0 +1,200 @@
+import asyncio
+import contextvars
+import json
+import uuid
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Optional
+
+from redis.exceptions import RedisError
+
+from src.config import config
+from src.models.gateway_models import DueTo
+from src.services.metrics import CACHE_REQUESTS
+from src.services.redis import redis_service
+from src.utils.lru_cache import LRUCache
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('subscription cache')
+
+
+@dataclass(frozen=True, slots=True)
+class Subscription:
+    """Статус подписки пользователя, как его отдает GET /api/due_to"""
+
+    until: Optional[str]
+    is_active: bool
+
+    @classmethod
+    def from_due_to(cls, due_to: Optional[DueTo]) -> "Subscription":
+        if due_to is None:
+            return cls(until=None, is_active=False)
+        return cls(until=due_to.until, is_active=due_to.active)
+
+    @property
+    def registered(self) -> bool:
+        return bool(self.until)
+
+    def is_valid(self) -> bool:
+        """Решает локально по дате окончания, не истекла ли подписка"""
+        if not self.until:
+            # Пользователь еще не зарегистрирован
+            return True
+
+        due_date = datetime.fromisoformat(self.until)
+        # Приводим к naive datetime если нужно
+        if due_date.tzinfo is not None:
+            due_date = due_date.replace(tzinfo=None)
+
+        return due_date > datetime.now(tz=config.tzinfo).replace(tzinfo=None)
+
+
+class SubscriptionCache:
+    """Двухуровневый кэш статуса подписки: in-process LRU + Redis.
+
+    Статус меняется только при оплате, отмене или возобновлении
+    подписки, поэтому эти сценарии явно вызывают invalidate().
+    invalidate() публикует user_id в канал subscription:invalidate,
+    и остальные экземпляры бота сбрасывают свою локальную копию,
+    как в ProfileCache. Последний полученный статус дополнительно
+    хранится долго и отдается через get_stale(), когда GateWay недоступен.
+    """
+
+    key_prefix = 'subscription'
+    channel = 'subscription:invalidate'
+    # Пауза перед повторной подпиской после обрыва соединения
+    reconnect_delay = 1.0
+
+    def __init__(
+        self,
+        maxsize: int = config.cache.subscription_maxsize,
+        local_ttl: float = config.cache.subscription_local_ttl,
+        ttl: int = config.cache.subscription_ttl,
+        negative_ttl: int = config.cache.subscription_negative_ttl,
+        stale_ttl: int = config.cache.subscription_stale_ttl,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.local_ttl = local_ttl
+        self._local = LRUCache[int, Subscription](maxsize=maxsize, ttl=local_ttl)
+        # Свои сообщения об инвалидации подписчик пропускает
+        self._origin = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+
+    def _key(self, user_id: int) -> str:
+        return f'{self.key_prefix}:{user_id}'
+
+    def _stale_key(self, user_id: int) -> str:
+        return f'{self.key_prefix}:stale:{user_id}'
+
+    def _message(self, user_id: int) -> str:
+        return f'{self._origin}:{user_id}'
+
+    def _ttl_for(self, subscription: Subscription) -> int:
+        if subscription.registered and subscription.is_valid():
+            return self.ttl
+        return self.negative_ttl
+
+    async def get(self, user_id: int) -> Optional[Subscription]:
+        subscription = self._local.get(user_id)
+        if subscription is not None:
+            CACHE_REQUESTS.labels('subscription', 'local').inc()
+            return subscription
+
+        try:
+            redis = await redis_service.get_redis_client()
+            raw = await redis.get(self._key(user_id))
+        except RedisError as e:
+            logger.warning('Failed to read subscription of user %s: %s', user_id, e)
+            CACHE_REQUESTS.labels('subscription', 'error').inc()
+            return None
+
+        if raw is None:
+            CACHE_REQUESTS.labels('subscription', 'miss').inc()
+            return None
+
+        CACHE_REQUESTS.labels('subscription', 'redis').inc()
+
+        subscription = Subscription(**json.loads(raw))
+        self._local.set(
+            user_id, subscription,
+            ttl=min(self.local_ttl, self._ttl_for(subscription))
+        )
+        return subscription
+
+    async def set(self, user_id: int, subscription: Subscription) -> None:
+        ttl = self._ttl_for(subscription)
+        self._local.set(user_id, subscription, ttl=min(self.local_ttl, ttl))
+
+        raw = json.dumps(asdict(subscription))
+        try:
+            redis = await redis_service.get_redis_client()
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(self._key(user_id), raw, ex=ttl)
+                pipe.set(self._stale_key(user_id), raw, ex=self.stale_ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning('Failed to store subscription of user %s: %s', user_id, e)
+
+    async def get_stale(self, user_id: int) -> Optional[Subscription]:
+        """Последний известный статус, даже если он уже устарел"""
+        try:
+            redis = await redis_service.get_redis_client()
+            raw = await redis.get(self._stale_key(user_id))
+        except RedisError as e:
+            logger.warning('Failed to read stale subscription of user %s: %s', user_id, e)
+            return None
+
+        CACHE_REQUESTS.labels('subscription', 'stale' if raw else 'stale_miss').inc()
+        return Subscription(**json.loads(raw)) if raw else None
+
+    async def invalidate(self, user_id: int) -> None:
+        """Сбрасывает статус после оплаты, отмены или возобновления подписки"""
+        self._local.pop(user_id)
+
+        try:
+            redis = await redis_service.get_redis_client()
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.delete(self._key(user_id))
+                pipe.publish(self.channel, self._message(user_id))
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning('Failed to invalidate subscription of user %s: %s', user_id, e)
+
+    def _on_message(self, data: bytes) -> None:
+        origin, _, user_id = data.decode().rpartition(':')
+        if origin != self._origin:
+            CACHE_REQUESTS.labels('subscription', 'invalidated').inc()
+            self._local.pop(int(user_id))
+
+    async def listen(self) -> None:
+        """Сбрасывает локальные копии статусов, измененных другими экземплярами"""
+        while True:
+            try:
+                redis = await redis_service.get_redis_client()
+                async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # Пока подписки не было, сообщения могли потеряться
+                    self._local.clear()
+                    async for message in pubsub.listen():
+                        self._on_message(message['data'])
+            except (RedisError, OSError) as e:
+                logger.warning('Subscription invalidation channel is down: %s', e)
+                self._local.clear()
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def start(self) -> None:
+        """Запускает подписку на инвалидацию в фоне (startup хук)"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self.listen(), context=contextvars.Context())
+
+    async def stop(self) -> None:
+        """shutdown хук"""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+
+subscription_cache = SubscriptionCache()
@@ -1,3 +1,6 @@
+# Исходные тексты каталога переводов. Обработчики читают скомпилированный
+# каталог (src/i18n), поэтому после изменений выполните: python -m src.i18n.build
+
 MESSAGES = dict(
     {
         "hello": {
@@ -1535,6 +1538,13 @@ ERROR_MESSAGES = dict(
             "de": "Unbekannter Fehler. Bitte versuchen Sie es erneut",
             "es": "Error desconocido. Inténtalo de nuevo",
             "zh": "未知错误。请重试",
+        },
+        "profile_update_error": {
+            "en": "Failed to save the changes. Please, try again later",
+            "ru": "Не удалось сохранить изменения. Пожалуйста, попробуйте позже",
+            "de": "Die Änderungen konnten nicht gespeichert werden. Bitte versuchen Sie es später erneut",
+            "es": "No se pudieron guardar los cambios. Inténtalo más tarde",
+            "zh": "无法保存更改。请稍后再试",
         }
     }
 )
\ No newline at end of file
@@ -1,10 +1,13 @@
-from datetime import datetime, time
+import asyncio
+from typing import Optional
 
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 
-from src.dependencies import get_gateway
+from src.config import config
+from src.dependencies import get_gateway, get_profile_cache
 from src.exc import StorageDataException
+from src.models import UserRecord, ProfileRecord
 
 
 class MultiSelection(StatesGroup):
@@ -17,6 +20,10 @@ class MultiSelection(StatesGroup):
 
 
 class DataStorage:
+    """
+    Данные пользователя для обработчиков: профиль из ProfileCache
+    (при промахе - из GateWay) вместе с данными диалога из FSM
+    """
 
     async def get_storage_data(
         self, user_id: int, state: FSMContext
@@ -25,30 +32,52 @@ class DataStorage:
 
         s_data = await state.get_data()
 
-        # Проверяем наличие необходимых ключей
-        keys = ["user_id", "first_name", "is_active", "lang_code"]
-        if all(s_data.get(key, False) for key in keys):
-            return s_data
+        cache = await get_profile_cache()
+        profile = await cache.get(user_id)
+        if profile is None:
+            # Если данных нет в Redis, получаем из базы и сохраняем в Redis
+            profile = await self.set_user_info(user_id)
+            if not profile:
+                raise StorageDataException
+            # Поля, измененные ботом, но еще не записанные в GateWay, остаются из кэша
+            profile = await cache.hydrate(user_id, profile)
 
-        # Если данных нет в Redis, получаем из базы и сохраняем в Redis
-        user_data = await self.set_user_info(user_id)
-        if not user_data:
-            raise StorageDataException
+        # Поля профиля важнее их копий, оставшихся в FSM от прежних версий
+        return {**s_data, **profile}
 
-        await state.update_data(user_data)
-        return user_data
+    @staticmethod
+    async def update_profile(user_id: int, **fields) -> None:
+        """Обновляет в кэше только переданные поля профиля"""
+        cache = await get_profile_cache()
+        await cache.update(user_id, **fields)
 
     @staticmethod
-    async def set_user_info(user_id: int) -> dict:
-        """Гарантирует, что машина состояние имеет все данные о пользователе"""
+    async def fetch_user_info(
+        user_id: int
+    ) -> tuple[Optional[UserRecord], Optional[ProfileRecord]]:
+        """Запрашивает у GateWay данные users и profiles пользователя"""
 
         gateway = await get_gateway()
         async with gateway:
-            user_data = await gateway.get('user_data', user_id, target='users')
-            profile_data = await gateway.get('user_data', user_id, target='profiles')
+            if config.gateway.combined_user_data:
+                # Один запрос на обе таблицы
+                full_info = await gateway.get('full_user_data', user_id)
+                if full_info is None:
+                    return None, None
+                return full_info.user, full_info.profile
+
+            # Иначе оба запроса отправляются одновременно
+            user_info, profile_info = await asyncio.gather(
+                gateway.get('user_data', user_id, target='users'),
+                gateway.get('user_data', user_id, target='profiles'),
+            )
 
-        user_info = user_data.json()
-        profile_info = profile_data.json()
+        return user_info, profile_info
+
+    async def set_user_info(self, user_id: int) -> dict:
+        """Гарантирует, что машина состояние имеет все данные о пользователе"""
+
+        user_info, profile_info = await self.fetch_user_info(user_id)
 
         if not user_info:
             return {}
@@ -56,32 +85,28 @@ class DataStorage:
 
         result = {
             "user_id": user_id,
-            "username": user_info["username"],
-            "first_name": user_info["first_name"],
-            "language": user_info["language"],
-            "fluency": user_info["fluency"],
-            "topics": ', '.join(user_info["topics"]),
-            "camefrom": user_info["camefrom"],
-            "lang_code": user_info["lang_code"],
-            "is_active": user_info["is_active"],
-            "due_to": user_info.get('due_to', None)
+            "username": user_info.username,
+            "first_name": user_info.first_name,
+            "language": user_info.language,
+            "fluency": user_info.fluency,
+            "topics": ', '.join(user_info.topics),
+            "camefrom": user_info.camefrom,
+            "lang_code": user_info.lang_code,
+            "is_active": user_info.is_active,
+            "due_to": user_info.due_to
         }
 
-        if profile_info and not profile_info.get('error', False):
-            birthday = profile_info["birthday"]
-            if not isinstance(birthday, datetime):
-                birthday = datetime.combine(birthday, time.min)
-
+        if profile_info:
             result.update(
                 {
-                    "age": (datetime.now() - birthday).days // 365,
-                    "birthday": profile_info["birthday"],
-                    "nickname": profile_info["nickname"],
-                    "email": profile_info["email"],
-                    "gender": profile_info["gender"],
-                    "dating": profile_info["dating"],
-                    "intro": profile_info['intro'],
-                    "status": profile_info["status"]
+                    "age": profile_info.age,
+                    "birthday": profile_info.birthday,
+                    "nickname": profile_info.nickname,
+                    "email": profile_info.email,
+                    "gender": profile_info.gender,
+                    "dating": profile_info.dating,
+                    "intro": profile_info.intro,
+                    "status": profile_info.status
                 }
             )
 
@@ -0,0 +1,65 @@
+import time
+
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('circuit breaker')
+
+
+class CircuitBreaker:
+    """
+    Размыкатель для внешнего сервиса.
+
+    closed    - запросы идут как обычно, подряд идущие ошибки считаются;
+    open      - после failure_threshold ошибок запросы сразу отклоняются
+                на reset_timeout секунд;
+    half_open - затем пропускается один пробный запрос: успех замыкает
+                цепь, ошибка снова размыкает ее.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Можно ли выполнить запрос сейчас"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info('Circuit %s closed', self.name)
+        self._state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Запрос завершился не по вине сервиса (отмена, дедлайн обновления)"""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning('Circuit %s opened after %s failures', self.name, self.failures)
+            self._state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
@@ -0,0 +1,40 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from src.exc import DeadlineExceeded
+
+# Момент (time.monotonic), к которому обработка обновления должна завершиться
+_deadline: ContextVar[Optional[float]] = ContextVar('deadline', default=None)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Задает бюджет времени для кода внутри блока и всех задач, созданных в нем.
+    Вложенный бюджет не может быть больше внешнего
+    """
+    current = _deadline.get()
+    until = time.monotonic() + seconds
+    token = _deadline.set(until if current is None else min(current, until))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Сколько секунд осталось до дедлайна (None - дедлайна нет)"""
+    until = _deadline.get()
+    return None if until is None else until - time.monotonic()
+
+
+def budget(timeout: float) -> float:
+    """Таймаут операции с учетом оставшегося бюджета"""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded
+    return min(timeout, left)
@@ -1,7 +1,7 @@
 from aiogram.enums import ParseMode
 from aiogram.types import Message
 
-from src.translations import ERROR_MESSAGES
+from src.i18n import catalog
 from exc import (
     EmptySpaceError, EmojiesNotAllowed,
     AlreadyExistsError,  TooShortError,
@@ -21,18 +21,18 @@ async def nickname_exception_handler(
         AlreadyExistsError: "nickname_already_exists_error",
         TooShortError: "nickname_too_short_error",
         TooLongError: "nickname_too_long_error",
-        InvalidCharactersError: "invalid_characters_error"
+        InvalidCharactersError: "nickname_invalid_characters_error"
     }
 
     error_type = type(error)
     if error_type in error_messages:
         msg_key = error_messages[error_type]
-        msg = ERROR_MESSAGES[msg_key][lang_code]
+        msg = catalog.get(lang_code, f"error_messages.{msg_key}")
         await message.reply(text=msg, parse_mode=ParseMode.HTML)
 
     else:
         await message.reply(
-            text=ERROR_MESSAGES["unknown_error"][lang_code],
+            text=catalog.get(lang_code, "error_messages.unknown_error"),
             parse_mode=ParseMode.HTML
         )
 
@@ -44,15 +44,15 @@ async def intro_exception_handler(
     """Обработчик исключений для валидации интро"""
     error_messages = {
         TooShortError: "intro_too_short_error",
-        TooLongError: "intro_too_long_error"
+        TooLongError: "intro_too_long_intro"
     }
     error_type = type(error)
     if error_type in error_messages:
         msg_key = error_messages[error_type]
-        msg = ERROR_MESSAGES[msg_key][lang_code]
+        msg = catalog.get(lang_code, f"error_messages.{msg_key}")
         await message.reply(text=msg, parse_mode=ParseMode.HTML)
     else:
         await message.reply(
-            text=ERROR_MESSAGES["unknown_error"][lang_code],
+            text=catalog.get(lang_code, "error_messages.unknown_error"),
             parse_mode=ParseMode.HTML
         )
\ No newline at end of file
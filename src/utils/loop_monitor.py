@@ -0,0 +1,91 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from src.config import config
+from src.services.metrics import LOOP_LAG, LOOP_STALLS
+from src.logconf import opt_logger as log
+
+logger = log.setup_logger('loop monitor')
+
+
+class LoopMonitor:
+    """
+    Сторож event loop.
+
+    Задача-пульс засыпает на interval и меряет, насколько позже она
+    проснулась - это задержка loop, она идет в гистограмму. Отдельный
+    поток следит за временем последнего пульса: если loop не отвечает
+    дольше threshold, поток снимает стек главного потока (то есть код,
+    который сейчас блокирует loop) и пишет его в лог один раз за блокировку.
+    """
+
+    def __init__(
+        self,
+        interval: float = config.metrics.loop_interval,
+        threshold: float = config.metrics.loop_threshold,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+
+        self._heartbeat = asyncio.create_task(self._pulse())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+        logger.info(
+            'Loop monitor started (interval=%ss, threshold=%ss)', self.interval, self.threshold
+        )
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+
+    async def _pulse(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(0.0, loop.time() - started - self.interval))
+            self._beat = time.monotonic()
+
+    def _watch(self) -> None:
+        reported_beat = None
+        # Пульс должен приходить каждые interval секунд
+        deadline = self.interval + self.threshold
+
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._beat
+            stalled = time.monotonic() - beat
+            if stalled < deadline or beat == reported_beat:
+                continue
+
+            reported_beat = beat
+            LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else 'unavailable'
+            logger.warning(
+                'Event loop blocked for over %.3fs, current stack:\n%s', stalled - self.interval, stack
+            )
+
+
+def start_loop_monitor() -> Optional[LoopMonitor]:
+    """Запускает монитор, если он включен в конфиге"""
+    if not config.metrics.loop_monitor:
+        return None
+
+    monitor = LoopMonitor()
+    monitor.start()
+    return monitor
@@ -0,0 +1,67 @@
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """Объединяет одинаковые одновременные запросы в один.
+
+    Пока запрос с ключом key выполняется, остальные вызовы с тем же
+    ключом не создают новый запрос, а ждут результат уже запущенного.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        # Метрики по группам (например, по имени метода Gateway)
+        self.calls = Counter()
+        self.coalesced = Counter()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[T]],
+        group: str = 'default',
+    ) -> T:
+        self.calls[group] += 1
+
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced[group] += 1
+        else:
+            # Запрос выполняется в отдельной задаче, чтобы отмена
+            # одного из ожидающих не отменяла его для остальных
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Помечаем исключение как полученное, даже если его никто не ждал
+        if not task.cancelled():
+            task.exception()
+
+    def ratio(self, group: str = None) -> float:
+        """Доля запросов, которые были объединены с уже выполняющимися"""
+        if group is None:
+            calls, coalesced = self.calls.total(), self.coalesced.total()
+        else:
+            calls, coalesced = self.calls[group], self.coalesced[group]
+        return coalesced / calls if calls else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            group: {
+                'calls': self.calls[group],
+                'coalesced': self.coalesced[group],
+                'ratio': self.ratio(group),
+            }
+            for group in self.calls
+        }
@@ -0,0 +1,85 @@
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class TokenBucket:
+    """Состояние одного ведра: остаток токенов и время последнего пересчета"""
+
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class TokenBuckets:
+    """
+    Набор token bucket по ключу (например, по user_id) на монотонных часах.
+
+    Каждая проверка - O(1) и без блокировок: код синхронный и
+    выполняется в одном event loop. Ведра, которые успели наполниться
+    до краев, ничем не отличаются от новых, поэтому удаляются, а общее
+    число ведер ограничено maxsize (вытесняются давно неактивные).
+    Приостановленное через pause() ведро не отдает токены до конца паузы.
+    """
+
+    def __init__(self, capacity: float, rate: float, maxsize: int = 100_000):
+        self.capacity = capacity
+        # Токенов в секунду
+        self.rate = rate
+        self.maxsize = maxsize
+        # Время, за которое пустое ведро наполняется полностью
+        self.idle_after = capacity / rate
+        self._buckets: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _refill(self, key: Hashable, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.capacity, now)
+            self._buckets[key] = bucket
+        else:
+            # Во время паузы updated в будущем, и ведро не пополняется
+            bucket.tokens = min(self.capacity, bucket.tokens + max(0.0, now - bucket.updated) * self.rate)
+            bucket.updated = max(now, bucket.updated)
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _sweep(self, now: float) -> None:
+        # Ведра упорядочены по последнему обращению: в начале - самые старые
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.maxsize and now - bucket.updated < self.idle_after:
+                break
+            del self._buckets[key]
+
+    def consume(self, key: Hashable, tokens: float = 1.0) -> float:
+        """
+        Списывает токены, если их хватает.
+        Возвращает остаток после списания или -1, если токенов не хватило
+        """
+        now = time.monotonic()
+        bucket = self._refill(key, now)
+        self._sweep(now)
+
+        if bucket.updated > now or bucket.tokens < tokens:
+            return -1.0
+
+        bucket.tokens -= tokens
+        return bucket.tokens
+
+    def wait_time(self, key: Hashable, tokens: float = 1.0) -> float:
+        """Сколько секунд ждать, пока в ведре накопится нужное число токенов"""
+        now = time.monotonic()
+        bucket = self._refill(key, now)
+        return max(0.0, bucket.updated - now) + max(0.0, (tokens - bucket.tokens) / self.rate)
+
+    def pause(self, key: Hashable, seconds: float) -> None:
+        """Запрещает списание на seconds секунд, после паузы в ведре не больше одного токена"""
+        now = time.monotonic()
+        bucket = self._refill(key, now)
+        bucket.tokens = min(bucket.tokens, 1.0)
+        bucket.updated = max(bucket.updated, now + seconds)
@@ -1,37 +1,67 @@
 import re
+import time
 
-import aiohttp.client_exceptions
 import emoji
-from typing import Union
+from typing import Optional, Union
 
-from aiohttp import ClientResponse
-
-from src.dependencies import get_gateway
+from src.dependencies import get_gateway, get_nickname_cache
 from src.exc import (
     AlreadyExistsError, TooShortError,
     TooLongError, EmptySpaceError,
-    InvalidCharactersError, EmojiesNotAllowed
+    InvalidCharactersError, EmojiesNotAllowed,
+    GatewayResponseError
 )
+from src.models import NicknameCheck
+from src.services.metrics import NICKNAME_VALIDATIONS
+
+
+NICKNAME_PATTERN = re.compile(r"^(?=.*[a-zA-Z]{1,})(?=.*[\d]{0,})[a-zA-Z0-9]{1,15}$")
+WHITESPACE = re.compile(r"\s")
+# Эмодзи из одного символа: только их и находила посимвольная проверка
+EMOJI_CHARS = frozenset(ch for ch in emoji.EMOJI_DATA if len(ch) == 1)
 
 
+def check_name_locally(nickname: str) -> None:
+    """Проверки без сети, в прежнем порядке (он определяет текст ошибки)"""
+    # Среди эмодзи нет ASCII символов, поэтому обычный никнейм не проверяется посимвольно
+    if not nickname.isascii() and not EMOJI_CHARS.isdisjoint(nickname): raise EmojiesNotAllowed
+    if not 6 <= len(nickname): raise TooShortError
+    if not len(nickname) <= 16: raise TooLongError
+    if WHITESPACE.search(nickname): raise EmptySpaceError
+    if not NICKNAME_PATTERN.match(nickname): raise InvalidCharactersError
 
 
 async def validate_name(nickname: str) -> Union[True, Exception]:
-    string_pattern = r"^(?=.*[a-zA-Z]{1,})(?=.*[\d]{0,})[a-zA-Z0-9]{1,15}$"
+    """
+    Сначала локальные проверки, затем кэш занятых никнеймов
+    и только если ответ все еще неизвестен - запрос в GateWay
+    """
+    started = time.perf_counter()
+    outcome, source = 'ok', 'local'
+    try:
+        check_name_locally(nickname)
 
-    gateway = await get_gateway()
-    async with gateway:
-        resp: "ClientResponse" = await gateway.get('nickname_exists', nickname)
-        if resp.status != 200: raise aiohttp.client_exceptions.ClientError
-        data: dict = resp.json() # noqa
-        if not data.get('exists'): raise AlreadyExistsError
+        source = 'cache'
+        nickname_cache = await get_nickname_cache()
+        if nickname_cache.is_taken(nickname): raise AlreadyExistsError
 
-    if any([ch in emoji.EMOJI_DATA for ch in nickname]): raise EmojiesNotAllowed
-    if not 6 <= len(nickname): raise TooShortError
-    if not len(nickname) <= 16: raise TooLongError
-    if not re.sub(r"\s", "", nickname) == nickname: raise EmptySpaceError
-    if not re.match(string_pattern, nickname): raise InvalidCharactersError
-    return True
+        source = 'gateway'
+        gateway = await get_gateway()
+        async with gateway:
+            check: Optional[NicknameCheck] = await gateway.get('nickname_exists', nickname)
+            if check is None: raise GatewayResponseError('nickname_exists')
+            if not check.exists:
+                nickname_cache.mark_taken(nickname)
+                raise AlreadyExistsError
+
+        return True
+
+    except Exception as e:
+        outcome = type(e).__name__
+        raise
+
+    finally:
+        NICKNAME_VALIDATIONS.labels(outcome, source).observe(time.perf_counter() - started)
 
 def validate_intro(intro: str) -> Union[True, Exception]:
     intro_wo_spaces = intro.replace(' ', '')
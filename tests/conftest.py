@@ -0,0 +1,67 @@
+import asyncio
+import os
+
+# Конфиг читает окружение при импорте src.config
+os.environ.setdefault('BOT_TOKEN', '123456:TEST')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+import fakeredis
+import httpx
+import pytest
+from fakeredis.aioredis import FakeRedis as BaseFakeRedis
+
+from src.services.gateway import gateway_service
+from src.services.redis import redis_service
+from src.utils.circuit_breaker import CircuitBreaker
+from tests.helpers import StubGateway
+
+
+class FakeRedis(BaseFakeRedis):
+    """
+    fakeredis не ждет на блокирующих командах: XREADGROUP BLOCK и BLMOVE
+    сразу возвращают пустой ответ, не отдавая управление event loop.
+    Пустой ответ здесь ненадолго засыпает, как настоящий Redis до таймаута
+    """
+
+    idle = 0.005
+
+    async def xreadgroup(self, *args, **kwargs):
+        response = await super().xreadgroup(*args, **kwargs)
+        if not response:
+            await asyncio.sleep(self.idle)
+        return response
+
+    async def blmove(self, *args, **kwargs):
+        response = await super().blmove(*args, **kwargs)
+        if response is None:
+            await asyncio.sleep(self.idle)
+        return response
+
+
+@pytest.fixture
+def redis_server() -> fakeredis.FakeServer:
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+async def redis(redis_server, monkeypatch):
+    """Подменяет клиент redis_service на fakeredis с поддержкой Lua"""
+    client = FakeRedis(server=redis_server)
+    monkeypatch.setattr(redis_service, 'redis_client', client, raising=False)
+    monkeypatch.setattr(redis_service, 'initialized', True)
+    yield client
+    await client.aclose()
+
+
+
+@pytest.fixture
+async def gateway(monkeypatch) -> StubGateway:
+    """Подменяет пул gateway_service транспортом со StubGateway"""
+    stub = StubGateway()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(stub))
+    monkeypatch.setattr(gateway_service, 'gateway_url', 'http://gateway')
+    monkeypatch.setattr(gateway_service, 'session', client)
+    # Ошибки одного теста не размыкают цепь для следующих
+    monkeypatch.setattr(gateway_service, 'breaker', CircuitBreaker('gateway'))
+    yield stub
+    await client.aclose()
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Union
+
+import httpx
+
+
+async def wait_for(predicate, timeout: float = 2.0, interval: float = 0.01):
+    """Ждет, пока условие станет истинным (фоновые задачи, pub/sub)"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        result = predicate()
+        if asyncio.iscoroutine(result):
+            result = await result
+        if result:
+            return result
+        if loop.time() >= deadline:
+            raise AssertionError('condition was not met in time')
+        await asyncio.sleep(interval)
+
+
+class StubGateway:
+    """
+    GateWay для GatewayService на httpx.MockTransport: отвечает заданными
+    ответами и запоминает запросы, чтобы тест проверил отправленное тело
+    """
+
+    def __init__(self):
+        self.requests: list[httpx.Request] = []
+        self._routes: dict[tuple[str, str], list[httpx.Response]] = {}
+
+    def respond(self, method: str, path: str, *responses: Union[int, dict, list, None]) -> None:
+        """Ответы по очереди, последний повторяется. int - статус, иначе JSON тело"""
+        self._routes[(method, path)] = [
+            httpx.Response(response) if isinstance(response, int) else httpx.Response(200, json=response)
+            for response in responses
+        ]
+
+    def sent(self, method: str, path: str) -> list[httpx.Request]:
+        return [request for request in self.requests if (request.method, request.url.path) == (method, path)]
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        responses = self._routes.get((request.method, request.url.path))
+        if not responses:
+            return httpx.Response(404)
+        return responses.pop(0) if len(responses) > 1 else responses[0]
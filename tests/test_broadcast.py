@@ -0,0 +1,168 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.models.gateway_models import NotificationUser
+from src.services import broadcast as broadcast_module
+from src.services.broadcast import BroadcastEngine, BroadcastProgress
+from tests.helpers import wait_for
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(chat_id)
+        return SimpleNamespace(message_id=len(self.sent))
+
+    async def edit_message_text(self, **kwargs):
+        pass
+
+
+class PagedBroadcast(BroadcastEngine):
+    """Получатели рассылки - user_id 1..total вместо страниц Gateway"""
+
+    def __init__(self, total: int, **kwargs):
+        super().__init__('test', page_size=3, **kwargs)
+        self.total = total
+        self.pages = []
+        # Снятое событие задерживает чтение страниц
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def _page(self, after):
+        start = after or 0
+        self.pages.append(start)
+        await self.gate.wait()
+        users = [NotificationUser(user_id) for user_id in range(start + 1, min(start + self.page_size, self.total) + 1)]
+        return users, None
+
+
+@pytest.fixture
+def bot() -> FakeBot:
+    return FakeBot()
+
+
+@pytest.fixture
+async def engine(redis, monkeypatch):
+    notified = []
+
+    async def post(method, user_ids):
+        notified.extend(user_ids)
+
+    monkeypatch.setattr(broadcast_module.gateway_service, 'post', post)
+    engine = PagedBroadcast(total=7)
+    engine.resume_interval = 0.01
+    engine.notified = notified
+    yield engine
+    for task in (engine._resumer, engine._task):
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+async def checkpoint(redis, engine, **values):
+    progress = BroadcastProgress(chat_id=100, message_id=1, **values)
+    await redis.hset(engine.key, mapping=progress.to_redis())
+
+
+async def finished(engine) -> bool:
+    progress = await engine.load()
+    return progress is not None and progress.done and not engine.running
+
+
+async def test_resume_continues_from_cursor(engine, redis, bot):
+    await checkpoint(redis, engine, cursor=3, sent=3)
+
+    await engine.resume(bot)
+    await wait_for(lambda: finished(engine))
+
+    assert engine.pages[0] == 3
+    assert engine.notified == [4, 5, 6, 7]
+    progress = await engine.load()
+    assert progress.sent == 7
+    assert progress.cursor == 7
+    assert await redis.exists(engine.lock_key) == 0
+
+
+async def test_resume_waits_for_stale_lock(engine, redis, bot):
+    await checkpoint(redis, engine, cursor=3, sent=3)
+    # Блокировка упавшего процесса живет до lock_ttl
+    await redis.set(engine.lock_key, 'crashed', ex=120)
+
+    await engine.resume(bot)
+    await asyncio.sleep(0.05)
+    assert not engine.running
+    assert engine.notified == []
+
+    await redis.delete(engine.lock_key)
+    await wait_for(lambda: finished(engine))
+    assert engine.notified == [4, 5, 6, 7]
+
+
+async def test_resume_stops_if_other_process_finishes(engine, redis, bot):
+    await checkpoint(redis, engine, cursor=3)
+    await redis.set(engine.lock_key, 'other', ex=120)
+
+    await engine.resume(bot)
+    await asyncio.sleep(0.05)
+    # Другой процесс дошел до конца и отпустил блокировку
+    await redis.hset(engine.key, 'done', 1)
+    await redis.delete(engine.lock_key)
+
+    await wait_for(lambda: engine._resumer.done())
+    assert engine._task is None
+    assert engine.notified == []
+    assert await redis.exists(engine.lock_key) == 0
+
+
+@pytest.mark.parametrize('values', [None, {'done': True}])
+async def test_nothing_to_resume(engine, redis, bot, values):
+    if values is not None:
+        await checkpoint(redis, engine, **values)
+
+    await engine.resume(bot)
+    await wait_for(lambda: engine._resumer.done())
+    assert engine._task is None
+    assert await redis.exists(engine.lock_key) == 0
+
+
+async def test_start_refuses_while_running(engine, redis, bot):
+    assert await engine.start(bot, chat_id=100)
+    assert not await engine.start(bot, chat_id=100)
+
+    await wait_for(lambda: finished(engine))
+    assert engine.notified == list(range(1, 8))
+
+
+async def test_run_stops_when_lock_is_taken(engine, redis, bot):
+    engine.lock_ttl = 1
+    engine.gate.clear()
+    assert await engine.start(bot, chat_id=100)
+    await wait_for(lambda: engine.pages == [0])
+
+    await redis.set(engine.lock_key, 'other', ex=120)
+    # heartbeat замечает чужую блокировку за lock_ttl / 3
+    await wait_for(lambda: not engine.running)
+
+    assert engine.notified == []
+    assert not (await engine.load()).done
+    # Чужая блокировка при остановке не снимается
+    assert await redis.get(engine.lock_key) == b'other'
+
+
+async def test_heartbeat_renews_lock_during_slow_page(engine, redis, bot):
+    engine.lock_ttl = 1
+    engine.gate.clear()
+    assert await engine.start(bot, chat_id=100)
+
+    # Страница читается дольше lock_ttl, а блокировка все еще наша
+    await asyncio.sleep(1.5)
+    assert (await redis.get(engine.lock_key)).decode() == engine._token
+
+    engine.gate.set()
+    await wait_for(lambda: finished(engine))
+    assert engine.notified == list(range(1, 8))
+    assert await redis.exists(engine.lock_key) == 0
@@ -0,0 +1,100 @@
+import json
+from datetime import date
+
+import pytest
+
+from aiogram.fsm.storage.base import StorageKey
+
+from src.services import fsm_serializer
+from src.services.fsm_serializer import FSMSerializer, MSGPACK, ZSTD
+from src.services.fsm_storage import BotRedisStorage
+
+DATA = {
+    'nickname': 'bob',
+    'topics': ['music', 'travel'],
+    'fluency': 2,
+    'is_active': True,
+    'birthday': None,
+    'quiz': {'answers': [1, 2.5], 'scores': {3: 'x', 'y': {}}},
+}
+# Так данные возвращает JSON: ключи словарей - строки
+EXPECTED = {**DATA, 'quiz': {'answers': [1, 2.5], 'scores': {'3': 'x', 'y': {}}}}
+
+zstd_only = pytest.mark.skipif(fsm_serializer.zstandard is None, reason='zstandard is not installed')
+
+
+@pytest.mark.parametrize('fmt', fsm_serializer.FORMATS)
+def test_round_trip(fmt):
+    serializer = FSMSerializer(fmt)
+    assert serializer.loads(serializer.dumps(DATA)) == EXPECTED
+
+
+def test_msgpack_has_prefix():
+    assert FSMSerializer('msgpack').dumps(DATA).startswith(MSGPACK)
+
+
+# True == 1 и False == 0: булевы ключи в отдельных словарях, иначе они сольются с числовыми
+@pytest.mark.parametrize('keys, expected', [
+    ({1: 'a', 2.5: 'b', None: 'd'}, {'1': 'a', '2.5': 'b', 'null': 'd'}),
+    ({True: 'c'}, {'true': 'c'}),
+    ({False: 'c'}, {'false': 'c'}),
+])
+def test_msgpack_keys_match_json(keys, expected):
+    data = {'map': keys, 'rows': [{7: 'x'}]}
+    as_json = FSMSerializer('json')
+    as_msgpack = FSMSerializer('msgpack')
+    assert as_json.loads(as_json.dumps(data)) == {'map': expected, 'rows': [{'7': 'x'}]}
+    assert as_msgpack.loads(as_msgpack.dumps(data)) == as_json.loads(as_json.dumps(data))
+
+
+@pytest.mark.parametrize('written_by', fsm_serializer.FORMATS)
+@pytest.mark.parametrize('read_by', fsm_serializer.FORMATS)
+def test_reads_any_format(written_by, read_by):
+    # Смена FSM_SERIALIZER не требует миграции ключей
+    raw = FSMSerializer(written_by).dumps(DATA)
+    assert FSMSerializer(read_by).loads(raw) == EXPECTED
+
+
+def test_reads_legacy_redis_storage_value():
+    # Прежний RedisStorage хранил json строкой
+    legacy = json.dumps(DATA)
+    assert FSMSerializer('msgpack').loads(legacy) == EXPECTED
+    assert FSMSerializer('msgpack').loads(legacy.encode()) == EXPECTED
+
+
+def test_custom_json_functions_are_used():
+    serializer = FSMSerializer(json_dumps=lambda data: json.dumps(data, default=str))
+    assert serializer.loads(serializer.dumps({'day': date(2025, 1, 2)})) == {'day': '2025-01-02'}
+
+
+@zstd_only
+@pytest.mark.parametrize('fmt', fsm_serializer.FORMATS)
+def test_compresses_above_threshold(fmt):
+    serializer = FSMSerializer(fmt, compress_threshold=64)
+    small = {'a': 1}
+    large = {'words': ['word'] * 100}
+
+    assert not serializer.dumps(small).startswith(ZSTD)
+    raw = serializer.dumps(large)
+    assert raw.startswith(ZSTD)
+    assert serializer.loads(raw) == large
+    # Читатель без сжатия тоже понимает сжатые данные
+    assert FSMSerializer(fmt).loads(raw) == large
+
+
+@pytest.mark.parametrize('fmt', fsm_serializer.FORMATS)
+async def test_storage_round_trip(redis, fmt):
+    storage = BotRedisStorage(redis, serializer=FSMSerializer(fmt))
+    key = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+    async with storage.snapshot(key):
+        await storage.set_data(key, DATA)
+
+    assert await storage.get_data(key) == EXPECTED
+    async with storage.snapshot(key):
+        assert await storage.get_data(key) == EXPECTED
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        FSMSerializer('pickle')
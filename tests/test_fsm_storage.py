@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+from aiogram import Bot
+from aiogram.dispatcher.middlewares.user_context import EVENT_CONTEXT_KEY, EventContext
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import SimpleEventIsolation
+from aiogram.types import Chat, User
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.middlewares.fsm_snapshot_middleware import FSMSnapshotMiddleware
+from src.services.fsm_storage import BotRedisStorage
+
+KEY = StorageKey(bot_id=123456, chat_id=42, user_id=42)
+
+
+@pytest.fixture
+def storage(redis) -> BotRedisStorage:
+    return BotRedisStorage(redis)
+
+
+async def test_snapshot_flushes_on_exit(storage, redis):
+    state_key = storage.key_builder.build(KEY, 'state')
+    data_key = storage.key_builder.build(KEY, 'data')
+
+    async with storage.snapshot(KEY):
+        await storage.set_state(KEY, 'MultiSelection:waiting_nickname')
+        await storage.set_data(KEY, {'nickname': 'bob'})
+        # Обработчик видит свои изменения, Redis - еще нет
+        assert await storage.get_state(KEY) == 'MultiSelection:waiting_nickname'
+        assert await storage.get_data(KEY) == {'nickname': 'bob'}
+        assert await redis.exists(state_key, data_key) == 0
+
+    assert await redis.get(state_key) == b'MultiSelection:waiting_nickname'
+    assert await storage.get_data(KEY) == {'nickname': 'bob'}
+
+
+@pytest.fixture
+def broken_flush(storage, monkeypatch):
+    async def flush(key, snap):
+        raise RedisConnectionError('redis is down')
+
+    monkeypatch.setattr(storage, '_flush', flush)
+
+
+async def test_flush_error_keeps_handler_error(storage, broken_flush):
+    with pytest.raises(ValueError, match='handler failed'):
+        async with storage.snapshot(KEY):
+            await storage.set_state(KEY, 'a')
+            raise ValueError('handler failed')
+
+
+async def test_flush_error_is_raised_after_successful_handler(storage, broken_flush):
+    with pytest.raises(RedisConnectionError):
+        async with storage.snapshot(KEY):
+            await storage.set_state(KEY, 'a')
+
+
+async def test_snapshot_reads_existing_values_once(storage):
+    await storage.set_state(KEY, 'a')
+    await storage.set_data(KEY, {'count': 1})
+
+    async with storage.snapshot(KEY) as snap:
+        assert await storage.get_state(KEY) == 'a'
+        data = await storage.get_data(KEY)
+        # Каждый get_data отдает новый словарь
+        data['count'] = 2
+        assert await storage.get_data(KEY) == {'count': 1}
+        assert not snap.dirty
+
+
+async def test_clean_snapshot_does_not_overwrite(storage):
+    await storage.set_data(KEY, {'count': 1})
+
+    async with storage.snapshot(KEY):
+        await storage.get_data(KEY)
+        # Другой процесс меняет данные, пока снимок открыт только для чтения
+        await BotRedisStorage(storage.redis).set_data(KEY, {'count': 5})
+
+    assert await storage.get_data(KEY) == {'count': 5}
+
+
+async def test_clear_deletes_keys(storage, redis):
+    await storage.set_state(KEY, 'a')
+    await storage.set_data(KEY, {'count': 1})
+
+    async with storage.snapshot(KEY):
+        await FSMContext(storage, KEY).clear()
+
+    assert await redis.exists(
+        storage.key_builder.build(KEY, 'state'),
+        storage.key_builder.build(KEY, 'data'),
+    ) == 0
+
+
+async def test_nested_snapshot_is_reused(storage):
+    async with storage.snapshot(KEY) as outer:
+        async with storage.snapshot(KEY) as inner:
+            assert inner is outer
+            await storage.set_data(KEY, {'step': 1})
+        # Вложенный выход не записывает данные раньше времени
+        assert await storage.redis.get(storage.key_builder.build(KEY, 'data')) is None
+
+
+async def test_task_outliving_snapshot_writes_directly(storage):
+    written = asyncio.Event()
+
+    async def background():
+        await written.wait()
+        await storage.set_data(KEY, {'from': 'task'})
+
+    async with storage.snapshot(KEY):
+        task = asyncio.create_task(background())
+        await storage.set_data(KEY, {'from': 'handler'})
+
+    written.set()
+    await task
+    assert await storage.get_data(KEY) == {'from': 'task'}
+
+
+async def test_middleware_isolates_updates_of_one_user(storage):
+    middleware = FSMSnapshotMiddleware(storage=storage, events_isolation=SimpleEventIsolation())
+    bot = Bot(token='123456:TEST')
+    user = User(id=42, is_bot=False, first_name='Bob')
+    chat = Chat(id=42, type='private')
+
+    async def handler(event, data):
+        state: FSMContext = data['state']
+        count = (await state.get_data()).get('count', 0)
+        # Без изоляции второе обновление прочитало бы тот же снимок
+        await asyncio.sleep(0.01)
+        await state.update_data(count=count + 1)
+
+    def event_data():
+        return {'bot': bot, EVENT_CONTEXT_KEY: EventContext(chat=chat, user=user)}
+
+    await asyncio.gather(*(middleware(handler, None, event_data()) for _ in range(3)))
+    assert await storage.get_data(KEY) == {'count': 3}
+    await bot.session.close()
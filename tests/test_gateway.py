@@ -0,0 +1,29 @@
+import json
+
+import httpx
+import pytest
+
+from src.models.gateway_models import DueTo
+from src.services.gateway import gateway_service
+
+
+@pytest.mark.parametrize('method', ['activate_subscription', 'deactivate_subscription'])
+async def test_subscription_post_returns_new_status(gateway, method):
+    gateway.respond('POST', f'/api/{method}', {'until': '2030-01-01', 'is_active': 'true'})
+
+    due_to = await gateway_service.post(method, 42)
+
+    assert due_to == DueTo(until='2030-01-01', is_active='true')
+    request, = gateway.sent('POST', f'/api/{method}')
+    assert json.loads(request.content) == {'user_id': 42}
+
+
+async def test_subscription_post_for_unknown_user(gateway):
+    assert await gateway_service.post('deactivate_subscription', 42) is None
+
+
+async def test_subscription_post_error_is_raised(gateway):
+    gateway.respond('POST', '/api/activate_subscription', 422)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await gateway_service.post('activate_subscription', 42)
@@ -0,0 +1,42 @@
+import pytest
+
+from src.exc import GatewayResponseError
+from src.models.gateway_models import decode, DueTo, NotificationPage, ProfileRecord, UserRecord
+
+PROFILE = b'{"nickname": "bob", "email": null, "gender": null, "intro": null, "birthday": null}'
+
+
+def test_decodes_typed_record():
+    page = decode(b'{"users": [{"user_id": 1, "lang_code": "en"}], "next": 1}', NotificationPage)
+    assert page.users[0].user_id == 1
+    assert page.next == 1
+
+
+@pytest.mark.parametrize('content', [b'null', b'{}', b'[]', b'{"error": "User not found"}'])
+def test_missing_record_is_none(content):
+    assert decode(content, UserRecord) is None
+
+
+@pytest.mark.parametrize('content, type_', [
+    (b'{"nickname": 1}', ProfileRecord),
+    (b'{"until": [1]}', DueTo),
+    (b'not json', DueTo),
+    (b'', UserRecord),
+])
+def test_unexpected_response_raises(content, type_):
+    with pytest.raises(GatewayResponseError):
+        decode(content, type_)
+
+
+def test_profile_fields_may_be_null():
+    profile = decode(PROFILE, ProfileRecord)
+    assert profile.nickname == 'bob'
+    assert profile.user_id is None
+    assert profile.birth_date is None
+    assert profile.age is None
+
+
+def test_age_from_birthday_with_timezone():
+    profile = decode(b'{"nickname": "bob", "birthday": "2000-01-02T00:00:00+03:00"}', ProfileRecord)
+    assert profile.birth_date.tzinfo is None
+    assert profile.age >= 25
@@ -0,0 +1,94 @@
+import pytest
+
+from src.services.profile_cache import ProfileCache
+from tests.helpers import wait_for
+
+PROFILE = {
+    'user_id': 42,
+    'first_name': 'Bob',
+    'is_active': True,
+    'lang_code': 'en',
+    'nickname': 'bob',
+    'topics': 'music, travel',
+}
+
+
+@pytest.fixture
+def cache(redis) -> ProfileCache:
+    return ProfileCache(maxsize=100, local_ttl=60, ttl=3600)
+
+
+async def test_get_missing_profile(cache):
+    assert await cache.get(42) is None
+
+
+async def test_hydrate_then_get(cache, redis):
+    assert await cache.hydrate(42, PROFILE) == PROFILE
+    assert 0 < await redis.ttl('profile:42') <= 3600
+
+    # Из Redis, минуя локальную копию
+    assert await ProfileCache().get(42) == PROFILE
+    assert await cache.get(42) == PROFILE
+
+
+async def test_get_returns_copy(cache):
+    await cache.hydrate(42, PROFILE)
+    profile = await cache.get(42)
+    profile['nickname'] = 'changed'
+    assert (await cache.get(42))['nickname'] == 'bob'
+
+
+async def test_update_changes_only_given_fields(cache, redis):
+    await cache.hydrate(42, PROFILE)
+    await cache.update(42, nickname='alice', fluency=3)
+
+    expected = {**PROFILE, 'nickname': 'alice', 'fluency': 3}
+    assert await cache.get(42) == expected
+    assert await ProfileCache().get(42) == expected
+
+
+async def test_partial_record_is_a_miss(cache):
+    await cache.update(42, nickname='alice')
+    assert await cache.get(42) is None
+
+
+async def test_hydrate_keeps_fields_written_before_it(cache):
+    # Изменение ждет в outbox, GateWay еще отдает прежний никнейм
+    await cache.update(42, nickname='alice')
+    profile = await cache.hydrate(42, PROFILE)
+
+    assert profile['nickname'] == 'alice'
+    assert profile['first_name'] == 'Bob'
+    assert await ProfileCache().get(42) == {**PROFILE, 'nickname': 'alice'}
+
+
+async def test_invalidate(cache, redis):
+    await cache.hydrate(42, PROFILE)
+    await cache.invalidate(42)
+
+    assert await redis.exists('profile:42') == 0
+    assert await cache.get(42) is None
+
+
+async def test_other_instances_drop_local_copy(cache, redis_server):
+    other = ProfileCache()
+    await other.start()
+    try:
+        await cache.hydrate(42, PROFILE)
+        assert await other.get(42) == PROFILE
+
+        await cache.update(42, nickname='alice')
+        await wait_for(lambda: 42 not in other._local)
+        assert (await other.get(42))['nickname'] == 'alice'
+    finally:
+        await other.stop()
+
+
+async def test_own_messages_are_skipped(cache):
+    await cache.hydrate(42, PROFILE)
+
+    cache._on_message(cache._message(42).encode())
+    assert 42 in cache._local
+
+    cache._on_message(b'another-instance:42')
+    assert 42 not in cache._local
@@ -0,0 +1,256 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.exc import ProfileUpdateError
+from src.services.profile_cache import profile_cache
+from src.services.profile_outbox import ProfileOutbox
+from tests.helpers import wait_for
+
+PUT = ('PUT', '/api/update_profile')
+
+# Профиль в кэше: поля users и profiles вместе, как их собирает set_user_info
+USERS = {
+    'user_id': 1, 'username': 'bob', 'first_name': 'Bob', 'language': 'english',
+    'fluency': 2, 'topics': 'music, travel', 'camefrom': 'friends', 'lang_code': 'en',
+    'is_active': True, 'due_to': None,
+}
+PROFILES = {
+    'nickname': 'bob', 'email': 'bob@example.com', 'gender': 'male', 'intro': 'Hello there',
+    'birthday': '2000-01-02T00:00:00', 'dating': False, 'status': 'rookie', 'age': 25,
+}
+
+
+@pytest.fixture
+async def outbox(redis, gateway):
+    box = ProfileOutbox(
+        batch_size=10, block=0.05, max_attempts=3,
+        retry_backoff=0.01, retry_max_delay=0.02, maxlen=1000,
+    )
+    profile_cache._local.clear()
+    await profile_cache.hydrate(1, {**USERS, **PROFILES})
+    gateway.respond(*PUT, 200)
+    yield box
+    await box.stop()
+    profile_cache._local.clear()
+
+
+def bodies(gateway) -> list[dict]:
+    return [json.loads(request.content) for request in gateway.sent(*PUT)]
+
+
+async def drained(redis) -> bool:
+    return await redis.xlen(ProfileOutbox.stream_key) == 0
+
+
+async def test_put_body_is_full_record_with_changes(outbox, redis, gateway):
+    await outbox.enqueue(1, 'profiles', intro='A new intro text')
+    (entry_id, _), = await redis.xrange(ProfileOutbox.stream_key)
+
+    await outbox.start()
+    await wait_for(lambda: drained(redis))
+
+    request, = gateway.sent(*PUT)
+    assert json.loads(request.content) == {
+        'user_id': 1, 'nickname': 'bob', 'email': 'bob@example.com', 'gender': 'male',
+        'intro': 'A new intro text', 'birthday': '2000-01-02', 'dating': False, 'status': 'rookie',
+    }
+    assert request.headers['Idempotency-Key'] == entry_id.decode()
+
+
+async def test_updates_of_one_user_are_coalesced(outbox, redis, gateway):
+    await outbox.enqueue(1, 'users', language='german', fluency=1)
+    await outbox.enqueue(1, 'users', topics=['films'])
+    await outbox.enqueue(1, 'profiles', intro='Changed intro')
+    entry_ids = [entry_id.decode() for entry_id, _ in await redis.xrange(ProfileOutbox.stream_key)]
+
+    await outbox.start()
+    await wait_for(lambda: drained(redis))
+
+    requests = gateway.sent(*PUT)
+    assert len(requests) == 2
+    users, = [request for request in requests if b'camefrom' in request.content]
+    profiles, = [request for request in requests if b'nickname' in request.content]
+    assert json.loads(users.content) == {
+        'user_id': 1, 'username': 'bob', 'camefrom': 'friends', 'first_name': 'Bob',
+        'language': 'german', 'fluency': 1, 'topics': ['films'], 'lang_code': 'en',
+    }
+    # Idempotency-Key - последняя слитая запись stream
+    assert users.headers['Idempotency-Key'] == entry_ids[1]
+    assert json.loads(profiles.content)['intro'] == 'Changed intro'
+    assert await redis.xlen(ProfileOutbox.dead_key) == 0
+
+
+async def test_profile_is_read_from_gateway_on_cache_miss(outbox, redis, gateway):
+    await profile_cache.invalidate(1)
+    gateway.respond('GET', '/api/users', {'user_id': 1, **PROFILES})
+
+    await outbox.enqueue(1, 'profiles', intro='From the gateway')
+    await outbox.start()
+    await wait_for(lambda: drained(redis))
+
+    assert bodies(gateway)[0]['email'] == 'bob@example.com'
+    assert bodies(gateway)[0]['intro'] == 'From the gateway'
+
+
+async def test_incomplete_profile_is_rejected_on_enqueue(outbox, redis, gateway):
+    await profile_cache.update(1, email=None)
+
+    with pytest.raises(ProfileUpdateError):
+        await outbox.enqueue(1, 'profiles', intro='Never written')
+    assert await redis.xlen(ProfileOutbox.stream_key) == 0
+
+
+async def test_user_without_profiles_row_can_edit_users_only(outbox, redis, gateway):
+    await profile_cache.invalidate(1)
+    await profile_cache.hydrate(1, USERS)
+
+    with pytest.raises(ProfileUpdateError):
+        await outbox.enqueue(1, 'profiles', intro='Never written')
+
+    await outbox.enqueue(1, 'users', fluency=3)
+    await outbox.start()
+    await wait_for(lambda: drained(redis))
+    assert [body['fluency'] for body in bodies(gateway)] == [3]
+
+
+async def test_retryable_error_is_retried(outbox, redis, gateway):
+    gateway.respond(*PUT, 503, 200)
+    await outbox.enqueue(1, 'profiles', intro='Retried intro')
+
+    await outbox.start()
+    await wait_for(lambda: drained(redis))
+
+    first, second = gateway.sent(*PUT)
+    # Повтор отправляет то же тело с тем же Idempotency-Key
+    assert first.content == second.content
+    assert first.headers['Idempotency-Key'] == second.headers['Idempotency-Key']
+    assert await redis.xlen(ProfileOutbox.dead_key) == 0
+
+
+async def test_exhausted_retries_go_to_dead_letter(outbox, redis, gateway):
+    gateway.respond(*PUT, 503)
+    await outbox.enqueue(1, 'profiles', intro='Never accepted')
+
+    await outbox.start()
+    await wait_for(lambda: drained(redis))
+
+    assert len(gateway.sent(*PUT)) == 3
+    assert await redis.xlen(ProfileOutbox.dead_key) == 1
+
+
+async def test_rejected_write_goes_to_dead_letter_and_drops_cached_profile(outbox, redis, gateway):
+    gateway.respond(*PUT, 422)
+    await outbox.enqueue(1, 'profiles', intro='Rejected intro')
+    await profile_cache.update(1, intro='Rejected intro')
+
+    await outbox.start()
+    await wait_for(lambda: drained(redis))
+
+    assert len(gateway.sent(*PUT)) == 1
+    (_, entry), = await redis.xrange(ProfileOutbox.dead_key)
+    assert entry[b'user_id'] == b'1'
+    assert entry[b'target'] == b'profiles'
+    assert b'422' in entry[b'error']
+    # Кэш больше не показывает значение, которого нет в GateWay
+    assert await profile_cache.get(1) is None
+
+
+async def test_unacked_entries_of_crashed_owner_are_claimed(outbox, redis, gateway):
+    await outbox.enqueue(1, 'profiles', intro='Claimed intro')
+    await outbox._ensure_group(redis)
+    # Прежний владелец прочитал запись и упал до подтверждения
+    await redis.xreadgroup(outbox.group, 'crashed', {outbox.stream_key: '>'})
+
+    await outbox.start()
+    await wait_for(lambda: drained(redis))
+
+    assert [body['intro'] for body in bodies(gateway)] == ['Claimed intro']
+    pending = await redis.xpending(outbox.stream_key, outbox.group)
+    assert pending['pending'] == 0
+
+
+async def test_sync_write_puts_before_returning(outbox, redis, gateway):
+    await outbox.write(1, 'profiles', nickname='alice')
+
+    assert bodies(gateway)[0]['nickname'] == 'alice'
+    # Повтор в stream перекрывает изменения, собранные до этой записи
+    (_, entry), = await redis.xrange(ProfileOutbox.stream_key)
+    assert json.loads(entry[b'fields']) == {'nickname': 'alice'}
+
+
+async def test_sync_write_reports_rejection(outbox, redis, gateway):
+    gateway.respond(*PUT, 409)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await outbox.write(1, 'profiles', nickname='taken')
+    assert await redis.xlen(ProfileOutbox.stream_key) == 0
+
+
+async def test_enqueue_writes_directly_without_redis(outbox, redis, gateway, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RedisConnectionError('redis is down')
+
+    monkeypatch.setattr(redis, 'xadd', broken)
+    await outbox.enqueue(1, 'profiles', intro='Written directly')
+    assert bodies(gateway)[0]['intro'] == 'Written directly'
+
+
+async def test_unknown_target_is_rejected(outbox):
+    with pytest.raises(ValueError):
+        await outbox.enqueue(1, 'subscriptions', until=None)
+
+
+async def test_only_lock_owner_drains(outbox, redis, gateway):
+    await redis.set(ProfileOutbox.lock_key, 'another-instance', ex=30)
+    await outbox.enqueue(1, 'profiles', intro='Not drained here')
+
+    await outbox.start()
+    await asyncio.sleep(0.2)
+    assert gateway.sent(*PUT) == []
+    assert await redis.get(ProfileOutbox.lock_key) == b'another-instance'
+
+
+async def test_drainer_stops_when_lock_is_lost(outbox, redis, gateway):
+    outbox.lock_ttl = 1
+    await outbox.start()
+    await wait_for(lambda: redis.ttl(ProfileOutbox.lock_key))
+
+    await redis.set(ProfileOutbox.lock_key, 'another-instance', ex=30)
+    # heartbeat замечает чужую блокировку за lock_ttl / 3
+    await asyncio.sleep(0.5)
+    await outbox.enqueue(1, 'profiles', intro='Not drained here')
+    await asyncio.sleep(0.2)
+
+    assert gateway.sent(*PUT) == []
+    await outbox.stop()
+    # Чужая блокировка при остановке не снимается
+    assert await redis.get(ProfileOutbox.lock_key) == b'another-instance'
+
+
+async def test_heartbeat_renews_lock_during_slow_write(outbox, redis, gateway, monkeypatch):
+    outbox.lock_ttl = 1
+    release = asyncio.Event()
+    started = asyncio.Event()
+    put = outbox._put
+
+    async def slow_put(write, new_data):
+        started.set()
+        await release.wait()
+        await put(write, new_data)
+
+    monkeypatch.setattr(outbox, '_put', slow_put)
+    await outbox.enqueue(1, 'profiles', intro='Slow intro')
+    await outbox.start()
+    await asyncio.wait_for(started.wait(), 2)
+
+    # PUT идет дольше lock_ttl, а блокировка все еще наша
+    await asyncio.sleep(1.5)
+    assert (await redis.get(ProfileOutbox.lock_key)).decode() == outbox._token
+
+    release.set()
+    await wait_for(lambda: drained(redis))
+    assert len(gateway.sent(*PUT)) == 1
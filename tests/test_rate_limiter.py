@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.services.rate_limiter import RedisRateLimiter, MemoryRateLimiter, create_rate_limiter
+from src.utils import token_bucket
+
+
+@pytest.fixture
+def limiter(redis) -> RedisRateLimiter:
+    return RedisRateLimiter(limit=3, time_interval=timedelta(seconds=60))
+
+
+async def test_counts_messages_in_window(limiter, redis):
+    started = datetime.now()
+    counts = [(await limiter.hit(42))[0] for _ in range(5)]
+
+    # Сверх лимита учитывается одно сообщение: дальше окно не растет
+    assert counts == [1, 2, 3, 4, 4]
+    assert await redis.zcard('rate_limit:42') == 4
+    assert 0 < await redis.pttl('rate_limit:42') <= 60_000
+
+    _, first = await limiter.hit(42)
+    assert abs((first - started).total_seconds()) < 1
+
+
+async def test_users_are_counted_separately(limiter):
+    for _ in range(4):
+        await limiter.hit(1)
+    assert (await limiter.hit(2))[0] == 1
+
+
+async def test_old_messages_leave_window(limiter):
+    limiter.window_ms = 100
+    for _ in range(4):
+        await limiter.hit(42)
+
+    await asyncio.sleep(0.15)
+    assert (await limiter.hit(42))[0] == 1
+
+
+async def test_redis_failure_lets_user_through(limiter, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RedisConnectionError('redis is down')
+
+    await limiter.hit(42)
+    monkeypatch.setattr(limiter, '_script', broken)
+    count, _ = await limiter.hit(42)
+    assert count == 1
+
+
+def test_backend_is_chosen_by_config():
+    assert isinstance(create_rate_limiter('redis', 3, timedelta(seconds=1)), RedisRateLimiter)
+    assert isinstance(create_rate_limiter('memory', 3, timedelta(seconds=1)), MemoryRateLimiter)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое time.monotonic внутри модуля token bucket"""
+    now = [1000.0]
+    monkeypatch.setattr(token_bucket, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+async def test_memory_limiter_counts_spent_tokens(clock):
+    memory = MemoryRateLimiter(limit=3, time_interval=timedelta(seconds=3))
+
+    assert [(await memory.hit(42))[0] for _ in range(4)] == [1, 2, 3, 4]
+    # Ведро пополняется на limit за time_interval: через секунду - одно сообщение
+    clock[0] += 1
+    assert (await memory.hit(42))[0] == 3
+    assert (await memory.hit(42))[0] == 4
+
+
+async def test_memory_limiter_first_message_time(clock):
+    memory = MemoryRateLimiter(limit=3, time_interval=timedelta(seconds=3))
+    for _ in range(2):
+        await memory.hit(42)
+
+    count, first = await memory.hit(42)
+    assert count == 3
+    # Три сообщения подряд выглядят как равномерные за последние 2 секунды
+    assert (datetime.now() - first).total_seconds() == pytest.approx(2, abs=0.1)
@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetMe, SendMessage
+
+from src.services.send_scheduler import SendScheduler, send_priority, BULK, INTERACTIVE
+
+
+@pytest.fixture
+async def scheduler():
+    scheduler = SendScheduler(rate=20, chat_rate=10, chat_burst=2, max_retries=2)
+    yield scheduler
+    await scheduler.stop()
+
+
+def flood(method, retry_after: float) -> TelegramRetryAfter:
+    error = TelegramRetryAfter(method=method, message='Too Many Requests', retry_after=1)
+    # В тестах пауза короче секунды
+    error.retry_after = retry_after
+    return error
+
+
+class FloodedApi:
+    """make_request: первый запрос в chat_id получает 429, остальные проходят"""
+
+    def __init__(self, chat_id, retry_after: float):
+        self.chat_id = chat_id
+        self.retry_after = retry_after
+        self.sent: list[tuple[object, float]] = []
+
+    async def __call__(self, bot, method):
+        if method.chat_id == self.chat_id and self.retry_after:
+            retry_after, self.retry_after = self.retry_after, 0
+            raise flood(method, retry_after)
+        self.sent.append((method.chat_id, time.monotonic()))
+        return method.chat_id
+
+
+def send(chat_id) -> SendMessage:
+    return SendMessage(chat_id=chat_id, text='hello')
+
+
+async def test_interactive_overtakes_bulk(scheduler):
+    # Общий бюджет исчерпан: оба запроса ждут в очереди
+    scheduler._global.consume(scheduler._global_key, 20)
+    order = []
+
+    async def acquire(chat_id, priority):
+        with send_priority(priority):
+            await scheduler.acquire(chat_id)
+        order.append(priority)
+
+    bulk = asyncio.create_task(acquire(1, BULK))
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(acquire(2, INTERACTIVE))
+    await asyncio.gather(bulk, interactive)
+
+    assert order == [INTERACTIVE, BULK]
+
+
+async def test_chat_limit_does_not_block_other_chats(scheduler):
+    loop = asyncio.get_running_loop()
+    done = {}
+
+    async def acquire(name, chat_id):
+        await scheduler.acquire(chat_id)
+        done[name] = loop.time()
+
+    started = loop.time()
+    # chat_burst=2: третий запрос в чат 1 ждет токен (1 / chat_rate)
+    await asyncio.gather(
+        acquire('first', 1), acquire('second', 1), acquire('third', 1), acquire('other', 2)
+    )
+
+    assert done['other'] - started < 0.05
+    assert done['third'] - started >= 0.08
+    assert scheduler.stats()['sent'] == 4
+
+
+async def test_private_chat_flood_pauses_everyone(scheduler):
+    api = FloodedApi(chat_id=1, retry_after=0.2)
+    started = time.monotonic()
+
+    first = asyncio.create_task(scheduler(api, None, send(1)))
+    await asyncio.sleep(0.05)
+    assert await scheduler(api, None, send(2)) == 2
+    assert await first == 1
+
+    # Запрос в другой чат тоже ждал конца паузы общего бюджета
+    assert sorted(chat_id for chat_id, _ in api.sent) == [1, 2]
+    assert all(sent_at - started >= 0.2 for _, sent_at in api.sent)
+    assert scheduler.retries == 1
+
+
+async def test_group_flood_pauses_only_that_chat(scheduler):
+    api = FloodedApi(chat_id=-100, retry_after=0.2)
+    started = time.monotonic()
+
+    first = asyncio.create_task(scheduler(api, None, send(-100)))
+    await asyncio.sleep(0.05)
+    assert await scheduler(api, None, send(2)) == 2
+    assert await first == -100
+
+    sent = dict(api.sent)
+    assert sent[2] - started < 0.15
+    assert sent[-100] - started >= 0.2
+
+
+async def test_flood_error_after_max_retries(scheduler):
+    async def always_flooded(bot, method):
+        raise flood(method, 0.01)
+
+    with pytest.raises(TelegramRetryAfter):
+        await scheduler(always_flooded, None, send(1))
+    assert scheduler.retries == 2
+
+
+async def test_unthrottled_methods_bypass_queue(scheduler):
+    scheduler._global.consume(scheduler._global_key, 20)
+
+    async def make_request(bot, method):
+        return 'me'
+
+    assert await asyncio.wait_for(scheduler(make_request, None, GetMe()), 0.05) == 'me'
+    assert scheduler._worker is None
+
+
+async def test_stop_cancels_waiting_requests(scheduler):
+    scheduler._global.pause(scheduler._global_key, 10)
+    waiting = asyncio.create_task(scheduler.acquire(1))
+    await asyncio.sleep(0.01)
+
+    await scheduler.stop()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert scheduler.depth == 0
+    assert scheduler._worker is None
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_request():
+    flight = SingleFlight()
+    started = 0
+    release = asyncio.Event()
+
+    async def fetch():
+        nonlocal started
+        started += 1
+        await release.wait()
+        return 'value'
+
+    waiters = [asyncio.create_task(flight.do('key', fetch, group='user_data')) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert len(flight) == 1
+
+    release.set()
+    assert await asyncio.gather(*waiters) == ['value'] * 5
+    assert started == 1
+    assert flight.stats() == {'user_data': {'calls': 5, 'coalesced': 4, 'ratio': 0.8}}
+    # После завершения ключ забывается, следующий вызов идет заново
+    assert len(flight) == 0
+    assert await flight.do('key', fetch) == 'value'
+    assert started == 2
+
+
+async def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+
+    async def fetch(value):
+        await asyncio.sleep(0)
+        return value
+
+    assert await asyncio.gather(
+        flight.do(1, lambda: fetch('a')),
+        flight.do(2, lambda: fetch('b')),
+    ) == ['a', 'b']
+    assert flight.ratio() == 0.0
+
+
+async def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError('gateway is down')
+
+    results = await asyncio.gather(*(flight.do('key', fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(flight) == 0
+
+
+async def test_cancelled_waiter_does_not_cancel_request():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return 'value'
+
+    first = asyncio.create_task(flight.do('key', fetch))
+    second = asyncio.create_task(flight.do('key', fetch))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    release.set()
+    assert await second == 'value'
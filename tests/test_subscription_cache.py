@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.filters.approved import get_subscription
+from src.services.profile_cache import profile_cache
+from src.services.subscription_cache import Subscription, SubscriptionCache, subscription_cache
+from tests.helpers import wait_for
+
+TOMORROW = (datetime.now() + timedelta(days=1)).isoformat()
+YESTERDAY = (datetime.now() - timedelta(days=1)).isoformat()
+DUE_TO = ('GET', '/api/due_to')
+
+
+@pytest.fixture
+def cache(redis) -> SubscriptionCache:
+    return SubscriptionCache(maxsize=100, local_ttl=60, ttl=3600, negative_ttl=30, stale_ttl=7200)
+
+
+@pytest.fixture
+def shared_cache(redis, gateway):
+    """Кэш, который читает get_subscription"""
+    subscription_cache._local.clear()
+    yield subscription_cache
+    subscription_cache._local.clear()
+    profile_cache._local.clear()
+
+
+@pytest.mark.parametrize('subscription, valid', [
+    (Subscription(until=TOMORROW, is_active=True), True),
+    (Subscription(until=YESTERDAY, is_active=True), False),
+    # Незарегистрированного пользователя не блокируем
+    (Subscription(until=None, is_active=False), True),
+])
+def test_is_valid(subscription, valid):
+    assert subscription.is_valid() is valid
+
+
+async def test_set_then_get(cache, redis):
+    subscription = Subscription(until=TOMORROW, is_active=True)
+    await cache.set(42, subscription)
+
+    assert 3500 < await redis.ttl('subscription:42') <= 3600
+    assert 7100 < await redis.ttl('subscription:stale:42') <= 7200
+    assert await cache.get(42) == subscription
+    # Из Redis, минуя локальную копию
+    assert await SubscriptionCache().get(42) == subscription
+
+
+@pytest.mark.parametrize('until', [None, YESTERDAY])
+async def test_unregistered_or_expired_is_cached_briefly(cache, redis, until):
+    await cache.set(42, Subscription(until=until, is_active=False))
+    assert 0 < await redis.ttl('subscription:42') <= 30
+
+
+async def test_invalidate_keeps_stale_status(cache, redis):
+    subscription = Subscription(until=TOMORROW, is_active=True)
+    await cache.set(42, subscription)
+    await cache.invalidate(42)
+
+    assert await cache.get(42) is None
+    assert await cache.get_stale(42) == subscription
+
+
+async def test_other_instances_drop_local_copy(cache, redis):
+    other = SubscriptionCache()
+    await other.start()
+    try:
+        await cache.set(42, Subscription(until=TOMORROW, is_active=True))
+        assert await other.get(42) is not None
+
+        await cache.invalidate(42)
+        await wait_for(lambda: 42 not in other._local)
+        assert await other.get(42) is None
+    finally:
+        await other.stop()
+
+
+async def test_own_messages_are_skipped(cache):
+    await cache.set(42, Subscription(until=TOMORROW, is_active=True))
+
+    cache._on_message(cache._message(42).encode())
+    assert 42 in cache._local
+
+    cache._on_message(b'another-instance:42')
+    assert 42 not in cache._local
+
+
+async def test_status_is_read_from_gateway_once(shared_cache, gateway):
+    gateway.respond(*DUE_TO, {'until': TOMORROW, 'is_active': 'true'})
+
+    expected = Subscription(until=TOMORROW, is_active=True)
+    assert await get_subscription(42) == expected
+    assert await get_subscription(42) == expected
+    assert len(gateway.sent(*DUE_TO)) == 1
+
+
+async def test_unregistered_user_is_cached(shared_cache, redis, gateway):
+    gateway.respond(*DUE_TO, 404)
+
+    assert await get_subscription(42) == Subscription(until=None, is_active=False)
+    assert await get_subscription(42) == Subscription(until=None, is_active=False)
+    assert len(gateway.sent(*DUE_TO)) == 1
+    assert 0 < await redis.ttl('subscription:42') <= shared_cache.negative_ttl
+
+
+async def test_stale_status_when_gateway_is_down(shared_cache, gateway):
+    subscription = Subscription(until=TOMORROW, is_active=True)
+    await shared_cache.set(42, subscription)
+    await shared_cache.invalidate(42)
+    gateway.respond(*DUE_TO, 503)
+
+    assert await get_subscription(42) == subscription
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import token_bucket
+from src.utils.token_bucket import TokenBuckets
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое time.monotonic внутри модуля token bucket"""
+    now = [1000.0]
+    monkeypatch.setattr(token_bucket, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_new_bucket_is_full(clock):
+    buckets = TokenBuckets(capacity=3, rate=1)
+
+    assert [buckets.consume('a') for _ in range(4)] == [2, 1, 0, -1]
+    # Другой ключ - свое ведро
+    assert buckets.consume('b') == 2
+
+
+def test_refills_at_rate_up_to_capacity(clock):
+    buckets = TokenBuckets(capacity=3, rate=2)
+    for _ in range(3):
+        buckets.consume('a')
+
+    clock[0] += 0.5
+    assert buckets.consume('a') == 0
+    assert buckets.consume('a') == -1
+
+    clock[0] += 100
+    assert buckets.consume('a') == 2
+
+
+def test_wait_time(clock):
+    buckets = TokenBuckets(capacity=2, rate=4)
+    assert buckets.wait_time('a') == 0
+
+    buckets.consume('a', 2)
+    assert buckets.wait_time('a') == pytest.approx(0.25)
+    assert buckets.wait_time('a', 2) == pytest.approx(0.5)
+
+
+def test_pause_blocks_until_it_ends(clock):
+    buckets = TokenBuckets(capacity=3, rate=1)
+    buckets.pause('a', 5)
+
+    assert buckets.consume('a') == -1
+    assert buckets.wait_time('a') == pytest.approx(5)
+
+    clock[0] += 5
+    # После паузы - один токен, а не полное ведро
+    assert buckets.wait_time('a') == 0
+    assert buckets.consume('a') == 0
+    assert buckets.consume('a') == -1
+
+
+def test_full_buckets_are_dropped(clock):
+    buckets = TokenBuckets(capacity=2, rate=1)
+    buckets.consume('a')
+
+    # За capacity / rate секунд ведро 'a' наполнилось и ничем не отличается от нового
+    clock[0] += 2
+    buckets.consume('b')
+    assert len(buckets) == 1
+
+
+def test_paused_bucket_is_not_dropped(clock):
+    buckets = TokenBuckets(capacity=2, rate=1)
+    buckets.pause('a', 10)
+
+    clock[0] += 5
+    buckets.consume('b')
+    assert len(buckets) == 2
+    assert buckets.consume('a') == -1
+
+
+def test_maxsize_evicts_least_recently_used(clock):
+    buckets = TokenBuckets(capacity=2, rate=1, maxsize=2)
+    for key in ('a', 'b', 'c'):
+        buckets.consume(key)
+
+    assert len(buckets) == 2
+    # 'a' вытеснено и снова полное
+    assert buckets.consume('a') == 1
@@ -0,0 +1,92 @@
+import pytest
+
+from src.exc import (
+    AlreadyExistsError, EmojiesNotAllowed, EmptySpaceError, GatewayResponseError,
+    InvalidCharactersError, TooLongError, TooShortError,
+)
+from src.services.nickname_cache import nickname_cache
+from src.validators.validators import check_name_locally, validate_intro, validate_name
+
+NICKNAMES = ('GET', '/api/nicknames')
+
+
+@pytest.fixture
+def nicknames(gateway):
+    nickname_cache._taken.clear()
+    yield gateway
+    nickname_cache._taken.clear()
+
+
+@pytest.mark.parametrize('nickname, error', [
+    ('bob😀smith', EmojiesNotAllowed),
+    # Эмодзи проверяются раньше длины, как в прежней версии
+    ('😀', EmojiesNotAllowed),
+    ('bob', TooShortError),
+    ('bobsmith' * 3, TooLongError),
+    ('bob smith', EmptySpaceError),
+    ('bob_smith', InvalidCharactersError),
+    ('1234567', InvalidCharactersError),
+    ('бобсмит', InvalidCharactersError),
+])
+def test_local_checks(nickname, error):
+    with pytest.raises(error):
+        check_name_locally(nickname)
+
+
+@pytest.mark.parametrize('nickname', ['bobsmith', 'Bob2000', 'a' * 15])
+def test_valid_nicknames_pass_locally(nickname):
+    check_name_locally(nickname)
+
+
+async def test_invalid_nickname_is_not_sent_to_gateway(nicknames):
+    with pytest.raises(TooShortError):
+        await validate_name('bob')
+    assert nicknames.requests == []
+
+
+async def test_free_nickname(nicknames):
+    # GateWay отвечает exists=true, если никнейм можно занять
+    nicknames.respond(*NICKNAMES, {'exists': True})
+
+    assert await validate_name('bobsmith') is True
+    assert await validate_name('bobsmith') is True
+    # Свободный никнейм каждый раз перепроверяется
+    assert len(nicknames.sent(*NICKNAMES)) == 2
+
+
+async def test_taken_nickname_is_remembered(nicknames):
+    nicknames.respond(*NICKNAMES, {'exists': False})
+
+    for _ in range(2):
+        with pytest.raises(AlreadyExistsError):
+            await validate_name('bobsmith')
+    assert len(nicknames.sent(*NICKNAMES)) == 1
+
+
+async def test_released_nickname_is_checked_again(nicknames, redis):
+    nicknames.respond(*NICKNAMES, {'exists': False}, {'exists': True})
+    with pytest.raises(AlreadyExistsError):
+        await validate_name('bobsmith')
+
+    await nickname_cache.forget('bobsmith')
+    assert await validate_name('bobsmith') is True
+
+
+async def test_missing_gateway_answer(nicknames):
+    with pytest.raises(GatewayResponseError):
+        await validate_name('bobsmith')
+
+
+@pytest.mark.parametrize('intro, error', [
+    ('too short', TooShortError),
+    ('a b c d e f g h i', TooShortError),
+    ('x' * 501, TooLongError),
+])
+def test_invalid_intro(intro, error):
+    with pytest.raises(error):
+        validate_intro(intro)
+
+
+def test_intro_length_ignores_spaces():
+    assert validate_intro('Hello, I am Bob') is True
+    assert validate_intro(' '.join('x' * 500)) is True
@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import pytest
+
+from src.server.workers import ShardWorker, UpdateRouter, QUEUE_KEY, PROCESSING_KEY, shard_for
+from tests.helpers import wait_for
+
+
+def update(update_id: int, user_id: int) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 0, 'text': 'hi',
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Bob'},
+        },
+    }
+
+
+def raw(update_id: int, user_id: int = 42) -> str:
+    return json.dumps(update(update_id, user_id))
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.handled: list[int] = []
+        self.slow = asyncio.Event()
+        self.slow.set()
+        self.fail: set[int] = set()
+
+    async def feed_update(self, bot, update):
+        await self.slow.wait()
+        if update.update_id in self.fail:
+            raise RuntimeError('handler failed')
+        self.handled.append(update.update_id)
+
+
+@pytest.fixture
+async def run_worker(redis):
+    tasks = []
+
+    def run(disp, concurrency: int = 10, backlog: int = 100) -> ShardWorker:
+        worker = ShardWorker(0, object(), disp, concurrency, backlog)
+        tasks.append(asyncio.create_task(worker.run()))
+        return worker
+
+    yield run
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def idle(redis) -> bool:
+    return await redis.llen(QUEUE_KEY.format(0)) == 0 and await redis.llen(PROCESSING_KEY.format(0)) == 0
+
+
+async def test_update_is_acked_after_processing(run_worker, redis):
+    disp = FakeDispatcher()
+    disp.slow.clear()
+    await redis.rpush(QUEUE_KEY.format(0), raw(1))
+
+    run_worker(disp)
+    # Пока обработчик работает, обновление лежит в processing
+    await wait_for(lambda: redis.llen(PROCESSING_KEY.format(0)))
+    assert await redis.lrange(PROCESSING_KEY.format(0), 0, -1) == [raw(1).encode()]
+
+    disp.slow.set()
+    await wait_for(lambda: idle(redis))
+    assert disp.handled == [1]
+
+
+async def test_failed_update_is_acked(run_worker, redis):
+    disp = FakeDispatcher()
+    disp.fail.add(1)
+    await redis.rpush(QUEUE_KEY.format(0), raw(1), raw(2))
+
+    run_worker(disp)
+    await wait_for(lambda: idle(redis))
+    assert disp.handled == [2]
+
+
+async def test_unfinished_updates_are_recovered_first(run_worker, redis):
+    # Упавший воркер успел взять 1 и 2, но не обработал их
+    await redis.rpush(PROCESSING_KEY.format(0), raw(1), raw(2))
+    await redis.rpush(QUEUE_KEY.format(0), raw(3))
+
+    disp = FakeDispatcher()
+    run_worker(disp, concurrency=1)
+    await wait_for(lambda: idle(redis))
+    assert disp.handled == [1, 2, 3]
+
+
+async def test_updates_of_one_user_keep_order(run_worker, redis):
+    disp = FakeDispatcher()
+    await redis.rpush(QUEUE_KEY.format(0), *(raw(update_id) for update_id in range(1, 6)))
+
+    worker = run_worker(disp)
+    await wait_for(lambda: len(disp.handled) == 5)
+    assert disp.handled == [1, 2, 3, 4, 5]
+    await wait_for(lambda: not worker._tails)
+
+
+async def test_malformed_update_is_dropped(run_worker, redis):
+    disp = FakeDispatcher()
+    await redis.rpush(QUEUE_KEY.format(0), b'not json', raw(1))
+
+    run_worker(disp)
+    await wait_for(lambda: idle(redis))
+    assert disp.handled == [1]
+
+
+async def test_router_keeps_user_on_one_shard(redis):
+    router = UpdateRouter(shards=4)
+    await router.push([update(1, 42), update(2, 7), update(3, 42)])
+
+    queued = await redis.lrange(QUEUE_KEY.format(shard_for(update(1, 42), 4)), 0, -1)
+    update_ids = [
+        item['update_id'] for item in map(json.loads, queued)
+        if item['message']['from']['id'] == 42
+    ]
+    assert update_ids == [1, 3]